@@ -0,0 +1,95 @@
+"""
+-------------------------------------------------------------------------------
+Benchmark of one collection cycle against the stand-in API (src/mock_api.py).
+
+Compares a serial curl loop (one fresh connection per model, one model after
+the other, no timeout; the former collect.sh) with the concurrent pooled
+collector in src/collect.py, under injected latency and failures:
+
+    python3 benchmarks/bench_collect.py --latency 0.2 --jitter 0.1 --error-rate 0.1
+-------------------------------------------------------------------------------
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from collect import (  # noqa: E402
+    GRAPHIC_CARDS_MODELS,
+    ConnectionPool,
+    collect,
+    http_get,
+)
+from mock_api import MockConfig, start_server  # noqa: E402
+
+
+async def serial_cycle(port: int) -> int:
+    """Query the models one by one with a new connection each, like curl."""
+    collected = 0
+    for model in GRAPHIC_CARDS_MODELS:
+        pool = ConnectionPool("127.0.0.1", port, size=1)
+        status, body = await http_get(pool, f"/{model}")
+        await pool.close()
+        collected += status == 200 and body.strip().isdigit()
+    return collected
+
+
+async def concurrent_cycle(port: int, pool: ConnectionPool, timeout: float) -> int:
+    results = await collect(
+        api_url=f"http://127.0.0.1:{port}/", timeout=timeout, pool=pool
+    )
+    return sum(r.sales is not None for r in results)
+
+
+async def run(args: argparse.Namespace) -> None:
+    config = MockConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        invalid_rate=args.invalid_rate,
+        seed=42,
+    )
+    server = await start_server(config, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    pool = ConnectionPool("127.0.0.1", port, size=len(GRAPHIC_CARDS_MODELS))
+
+    timings = {"serial (curl loop)": [], "concurrent (collect.py)": []}
+    rows = {name: 0 for name in timings}
+    for _ in range(args.cycles):
+        start = time.perf_counter()
+        rows["serial (curl loop)"] += await serial_cycle(port)
+        timings["serial (curl loop)"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        rows["concurrent (collect.py)"] += await concurrent_cycle(
+            port, pool, args.timeout
+        )
+        timings["concurrent (collect.py)"].append(time.perf_counter() - start)
+
+    await pool.close()
+    server.close()
+    await server.wait_closed()
+
+    print(f"  {args.cycles} cycles, {config}")
+    for name, values in timings.items():
+        print(
+            f"    {name:<24} median {statistics.median(values) * 1000:8.1f} ms  "
+            f"max {max(values) * 1000:8.1f} ms  "
+            f"rows {rows[name]}/{args.cycles * len(GRAPHIC_CARDS_MODELS)}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark one collection cycle.")
+    parser.add_argument("--cycles", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--invalid-rate", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=1.0)
+    asyncio.run(run(parser.parse_args()))
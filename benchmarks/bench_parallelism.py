@@ -0,0 +1,119 @@
+"""
+-------------------------------------------------------------------------------
+Benchmark of the core split between concurrent search fits and XGBoost threads.
+
+Runs the nested grid search of src/train.py with every split
+search_jobs x fit_threads that fits into the available cores (see
+src/resources.py) and reports wall-clock time and CPU efficiency
+(CPU time / (wall time x cores used)), on the shipped dataset and on a
+scaled-up synthetic copy of it:
+
+    python3 benchmarks/bench_parallelism.py --scale 20
+-------------------------------------------------------------------------------
+"""
+
+import argparse
+import contextlib
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from preprocessed import transform  # noqa: E402
+from resources import available_cores, plan_parallelism  # noqa: E402
+from search import NestedGridSearchCV, group_candidates  # noqa: E402
+from train import CV_FOLDS, PARAM_GRID, RANDOM_STATE, prepare_data  # noqa: E402
+
+
+def load_shipped_data() -> pd.DataFrame:
+    """Preprocess the shipped raw dataset with a throwaway vocabulary."""
+    raw = pd.read_csv(ROOT / "data/raw/sales_data.csv")
+    with (
+        tempfile.TemporaryDirectory() as tmp,
+        contextlib.redirect_stdout(io.StringIO()),
+    ):
+        return transform(raw, Path(tmp) / "vocabulary.json")
+
+
+def scale_data(df: pd.DataFrame, factor: int, seed: int = 42) -> pd.DataFrame:
+    """Repeat the rows `factor` times with noise on the target."""
+    rng = np.random.default_rng(seed)
+    scaled = pd.concat([df] * factor, ignore_index=True)
+    noise = rng.integers(-2, 3, len(scaled))
+    scaled["sales"] = np.maximum(scaled["sales"].to_numpy() + noise, 0)
+    return scaled
+
+
+def get_splits(cores: int) -> list[tuple[int, int]]:
+    """All (search_jobs, fit_threads) with power-of-two factors within the cores."""
+    powers = [2**i for i in range(cores.bit_length()) if 2**i <= cores]
+    return [
+        (jobs, threads)
+        for jobs in powers
+        for threads in powers
+        if jobs * threads <= cores
+    ]
+
+
+def run_split(
+    X: pd.DataFrame, y: pd.Series, jobs: int, threads: int
+) -> tuple[float, float]:
+    """Run the search once, return (wall seconds, CPU seconds)."""
+    base = xgb.XGBRegressor(
+        random_state=RANDOM_STATE, n_jobs=threads, tree_method="hist"
+    )
+    search = NestedGridSearchCV(base, PARAM_GRID, cv=CV_FOLDS, n_jobs=jobs)
+    wall, cpu = time.perf_counter(), time.process_time()
+    search.fit(X, y)
+    return time.perf_counter() - wall, time.process_time() - cpu
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark search parallelism.")
+    parser.add_argument(
+        "--scale", type=int, default=20, help="row factor of the synthetic dataset"
+    )
+    parser.add_argument(
+        "--cores", type=int, default=None, help="cores to use (default: detected)"
+    )
+    args = parser.parse_args()
+
+    cores = args.cores or available_cores()
+    shipped = load_shipped_data()
+    tasks = len(group_candidates(PARAM_GRID)[1]) * CV_FOLDS
+    print(f"  {cores} usable cores, {tasks} fits per search")
+
+    for name, df in [
+        ("shipped", shipped),
+        (f"x{args.scale}", scale_data(shipped, args.scale)),
+    ]:
+        X, y = prepare_data(df)
+        rows = len(X) * (CV_FOLDS - 1) // CV_FOLDS
+        plan = plan_parallelism(tasks, rows, cores=cores)
+        print(
+            f"\n  dataset {name}: {len(X)} rows, "
+            f"planned split {plan.search_jobs}x{plan.fit_threads}"
+        )
+        print(
+            f"  {'jobs':>5} {'threads':>8} {'wall':>10} {'cpu':>10} {'efficiency':>11}"
+        )
+        for jobs, threads in get_splits(cores):
+            wall, cpu = run_split(X, y, jobs, threads)
+            efficiency = cpu / (wall * jobs * threads)
+            marker = (
+                "  <- plan"
+                if (jobs, threads) == (plan.search_jobs, plan.fit_threads)
+                else ""
+            )
+            print(
+                f"  {jobs:>5} {threads:>8} {wall:>9.2f}s {cpu:>9.2f}s "
+                f"{efficiency:>10.0%}{marker}"
+            )
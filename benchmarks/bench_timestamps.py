@@ -0,0 +1,130 @@
+"""
+-------------------------------------------------------------------------------
+Benchmark of timestamp parsing and temporal feature extraction.
+
+Compares the original implementation (format inference on the full column,
+five .dt accessors on all rows) with the deduplicated fixed-width fast path
+of src/preprocessed.py (parse_timestamps, temporal_features) on raw
+data where every timestamp appears once per model:
+
+    python3 benchmarks/bench_timestamps.py --rows 100000 1000000
+-------------------------------------------------------------------------------
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from collect import GRAPHIC_CARDS_MODELS  # noqa: E402
+from preprocessed import parse_timestamps, temporal_features  # noqa: E402
+
+# malformed values mixed into the raw data: other formats (dropped by the format
+# inferred from the first value), out of range dates, empty and garbage strings
+MALFORMED = [
+    "invalid",
+    "",
+    "2025-01-01 10:00",
+    "01/02/2025",
+    "2025-13-01T00:00:00Z",
+    "2025-02-30T10:00:00Z",
+    "2025-01-01T10:00:00.5Z",
+    "2025-01-01T10:00:00+0000",
+    "2025-1-1T10:00:00Z",
+]
+
+
+def reference_parse(df: pd.DataFrame) -> pd.DataFrame:
+    """Original parsing: format inference on the full column."""
+    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+    return df
+
+
+def reference_extract(df: pd.DataFrame) -> pd.DataFrame:
+    """Original extract_temporal_features: five .dt accessors on all rows."""
+    df["year"] = df["timestamp"].dt.year.astype(int)
+    df["hour"] = df["timestamp"].dt.hour.astype(int)
+    df["day_of_week"] = df["timestamp"].dt.dayofweek.astype(int)
+    df["day_of_month"] = df["timestamp"].dt.day.astype(int)
+    df["month"] = df["timestamp"].dt.month.astype(int)
+    return df
+
+
+def fast_parse(df: pd.DataFrame) -> pd.DataFrame:
+    df["timestamp"] = parse_timestamps(df["timestamp"])
+    return df
+
+
+def fast_extract(df: pd.DataFrame) -> pd.DataFrame:
+    for name, values in temporal_features(df["timestamp"]).items():
+        df[name] = values
+    return df
+
+
+def make_raw_data(
+    rows: int, invalid_rate: float = 0.001, seed: int = 42
+) -> pd.DataFrame:
+    """Raw sales rows with one timestamp per collection cycle and model."""
+    rng = np.random.default_rng(seed)
+    cycles = rows // len(GRAPHIC_CARDS_MODELS) + 1
+    start = pd.Timestamp("2025-04-25T09:00:00Z")
+    stamps = (start + pd.to_timedelta(np.arange(cycles) * 60, unit="s")).strftime(
+        "%Y-%m-%dT%H:%M:%SZ"
+    )
+    timestamps = np.repeat(np.asarray(stamps, dtype=object), len(GRAPHIC_CARDS_MODELS))[
+        :rows
+    ]
+    invalid = rng.random(rows) < invalid_rate
+    invalid[0] = False  # the reference infers the format from the first value
+    timestamps[invalid] = rng.choice(MALFORMED, invalid.sum())
+    return pd.DataFrame(
+        {
+            "timestamp": timestamps,
+            "model": np.tile(GRAPHIC_CARDS_MODELS, cycles)[:rows],
+            "sales": rng.integers(0, 30, rows),
+        }
+    )
+
+
+def best_of(func, df: pd.DataFrame, repeat: int) -> tuple[float, pd.DataFrame]:
+    timings = []
+    for _ in range(repeat):
+        data = df.copy()
+        start = time.perf_counter()
+        result = func(data)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark timestamp parsing.")
+    parser.add_argument(
+        "--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(
+        f"  {'rows':>10} {'stage':<8} {'reference':>12} {'fast path':>12} "
+        f"{'speedup':>8}"
+    )
+    for rows in args.rows:
+        raw = make_raw_data(rows)
+        parsed = reference_parse(raw.dropna().copy()).dropna().reset_index(drop=True)
+
+        for stage, reference, fast, df in [
+            ("parse", reference_parse, fast_parse, raw),
+            ("extract", reference_extract, fast_extract, parsed),
+        ]:
+            reference_time, expected = best_of(reference, df, args.repeat)
+            fast_time, result = best_of(fast, df, args.repeat)
+            pd.testing.assert_frame_equal(result, expected)
+            print(
+                f"  {rows:>10} {stage:<8} {reference_time * 1000:>10.1f}ms "
+                f"{fast_time * 1000:>10.1f}ms {reference_time / fast_time:>7.1f}x"
+            )
@@ -0,0 +1,170 @@
+"""
+-------------------------------------------------------------------------------
+Generator of synthetic raw stores for the benchmark suite.
+
+Writes an append-only raw store like the one scripts/collect.sh builds
+('sales_data.csv' base segment, delta segments 'sales_YYYYMMDD_HHMM.csv',
+'manifest.csv' and the snapshot index 'index.csv') at any size from 10^4 to
+10^8 rows, chunk by chunk so memory stays bounded:
+
+- one collection cycle per minute, each with a row for every SKU;
+- sales with a per-SKU level, a daily and a weekly cycle and Poisson noise;
+- injected invalid timestamps and negative sales;
+- the rows spread over thousands of delta segments.
+
+    python3 benchmarks/generate_data.py /tmp/store --rows 1000000 \
+        --skus 200 --segments 2000
+-------------------------------------------------------------------------------
+"""
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+START = pd.Timestamp("2025-01-01T00:00:00Z")
+SKUS = 100
+SEGMENTS = 1000
+INVALID_RATE = 0.001  # Share of rows with an invalid timestamp
+NEGATIVE_RATE = 0.001  # Share of rows with negative sales
+INVALID_TIMESTAMPS = np.array(
+    ["", "invalid", "2025-02-30T10:00:00Z", "2025-01-01T24:00:00Z", "2025-01-01 10:00"]
+)
+CHUNK_CYCLES = 20_000  # Collection cycles generated at once
+
+
+def sku_names(count: int) -> list[str]:
+    """The collected card models first, then synthetic SKUs."""
+    known = ["rtx3060", "rtx3070", "rtx3080", "rtx3090", "rx6700"]
+    return (known + [f"gpu{i:05d}" for i in range(count)])[:count]
+
+
+def generate_cycles(
+    first: int,
+    count: int,
+    skus: list[str],
+    rng: np.random.Generator,
+    invalid_rate: float,
+    negative_rate: float,
+) -> pd.DataFrame:
+    """Raw rows (timestamp, model, sales) of `count` collection cycles from `first`."""
+    cycle = np.arange(first, first + count)
+    times = START + pd.to_timedelta(cycle * 60 + rng.integers(0, 60, count), unit="s")
+    stamps = np.asarray(times.strftime("%Y-%m-%dT%H:%M:%SZ"), dtype=object)
+
+    levels = 5 + 20 * np.random.default_rng(len(skus)).random(len(skus))
+    hour = times.hour.to_numpy()
+    weekday = times.dayofweek.to_numpy()
+    season = (1 + 0.5 * np.sin(2 * np.pi * (hour - 6) / 24)) * np.where(
+        weekday >= 5, 1.3, 1.0
+    )
+    sales = rng.poisson(np.outer(season, levels)).ravel()
+
+    df = pd.DataFrame(
+        {
+            "timestamp": np.repeat(stamps, len(skus)),
+            "model": np.tile(np.array(skus, dtype=object), count),
+            "sales": sales,
+        }
+    )
+    invalid = rng.random(len(df)) < invalid_rate
+    df.loc[invalid, "timestamp"] = rng.choice(INVALID_TIMESTAMPS, invalid.sum())
+    negative = rng.random(len(df)) < negative_rate
+    df.loc[negative, "sales"] = -df.loc[negative, "sales"] - 1
+    return df
+
+
+def generate_store(
+    raw_dir: str,
+    rows: int,
+    skus: int = SKUS,
+    segments: int = SEGMENTS,
+    invalid_rate: float = INVALID_RATE,
+    negative_rate: float = NEGATIVE_RATE,
+    seed: int = 42,
+) -> int:
+    """Write a raw store with about `rows` rows (whole cycles) in 1 + `segments` files.
+
+    Returns:
+        Number of rows written
+    """
+    raw_dir = Path(raw_dir)
+    raw_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    names = sku_names(skus)
+    cycles = max(1, rows // skus)
+    # cycle boundaries of the base segment and the delta segments
+    bounds = np.linspace(0, cycles, segments + 2).astype(int)
+
+    manifest, index = ["segment,rows\n"], ["timestamp,rows,path\n"]
+    written = 0
+    for segment in range(segments + 1):
+        if segment == 0:
+            name = "sales_data.csv"
+        else:
+            # one minute per segment at least, so names stay unique when segments
+            # outnumber cycles
+            collected_at = START + pd.Timedelta(
+                minutes=int(bounds[segment + 1]) + segment
+            )
+            name = f"sales_{collected_at.strftime('%Y%m%d_%H%M')}.csv"
+        path = raw_dir / name
+        segment_rows = 0
+        for first in range(bounds[segment], bounds[segment + 1], CHUNK_CYCLES):
+            count = min(CHUNK_CYCLES, bounds[segment + 1] - first)
+            chunk = generate_cycles(
+                first, count, names, rng, invalid_rate, negative_rate
+            )
+            chunk.to_csv(
+                path,
+                mode="a" if segment_rows else "w",
+                header=not segment_rows,
+                index=False,
+            )
+            segment_rows += len(chunk)
+        if not segment_rows:
+            pd.DataFrame(columns=["timestamp", "model", "sales"]).to_csv(
+                path, index=False
+            )
+
+        manifest.append(f"{name},{segment_rows}\n")
+        if segment:
+            index.append(f"{name[6:19]},{segment_rows},{name}\n")
+        written += segment_rows
+
+    (raw_dir / "manifest.csv").write_text("".join(manifest))
+    (raw_dir / "index.csv").write_text("".join(index))
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic raw sales store."
+    )
+    parser.add_argument(
+        "raw_dir", help="output directory (e.g. a scratch copy of data/raw)"
+    )
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--skus", type=int, default=SKUS)
+    parser.add_argument(
+        "--segments",
+        type=int,
+        default=SEGMENTS,
+        help="delta segments besides the base file",
+    )
+    parser.add_argument("--invalid-rate", type=float, default=INVALID_RATE)
+    parser.add_argument("--negative-rate", type=float, default=NEGATIVE_RATE)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    written = generate_store(
+        args.raw_dir,
+        args.rows,
+        args.skus,
+        args.segments,
+        args.invalid_rate,
+        args.negative_rate,
+        args.seed,
+    )
+    print(f"  Wrote {written} rows in {args.segments + 1} segments to {args.raw_dir}")
@@ -0,0 +1,198 @@
+"""
+-------------------------------------------------------------------------------
+Load generator for the prediction server (src/serve.py).
+
+Replays the (model, timestamp) queries of a JSONL request log, e.g. one
+recorded with `serve.py --record requests.jsonl`, at a fixed target rate
+over a pool of keep-alive connections and reports p50/p95/p99 latency and
+the achieved throughput. Lines without a model and timestamp are skipped,
+and --synthetic generates queries when there is no log yet.
+
+Requests are sent open-loop: request i is due at start + i / qps whether or
+not earlier requests have returned, and its latency is measured from that
+due time, so a saturated server shows up as growing latency instead of a
+silently lower rate.
+
+    python3 benchmarks/replay.py requests.jsonl --qps 2000 --url http://127.0.0.1:8000
+    python3 benchmarks/replay.py --synthetic 20000 --qps 2000 --local --max-batch 64
+-------------------------------------------------------------------------------
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from collect import GRAPHIC_CARDS_MODELS, ConnectionPool, http_get  # noqa: E402
+from serve import MAX_BATCH, MAX_DELAY, PredictionServer, start_server  # noqa: E402
+
+SERVER_URL = "http://127.0.0.1:8000"
+CONNECTIONS = 64
+
+
+def load_queries(path: str) -> list[tuple[str, str]]:
+    """(model, timestamp) of every prediction record of a JSONL file."""
+    queries = []
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if (
+                isinstance(record, dict)
+                and isinstance(record.get("model"), str)
+                and isinstance(record.get("timestamp"), str)
+            ):
+                queries.append((record["model"], record["timestamp"]))
+    return queries
+
+
+def synthetic_queries(count: int, seed: int = 42) -> list[tuple[str, str]]:
+    """Random queries over the collected models and the next 30 days."""
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp.now(tz="UTC").floor("h")
+    offsets = pd.to_timedelta(rng.integers(0, 30 * 24 * 60, count), unit="min")
+    timestamps = (start + offsets).strftime("%Y-%m-%dT%H:%M:%SZ")
+    models = rng.choice(GRAPHIC_CARDS_MODELS, count)
+    return list(zip(models.tolist(), timestamps.tolist()))
+
+
+async def replay(
+    pool: ConnectionPool, queries: list[tuple[str, str]], qps: float
+) -> tuple[np.ndarray, int, float]:
+    """Send the queries at the target rate.
+
+    Returns:
+        Tuple of (latencies in seconds of successful requests, errors, wall seconds)
+    """
+    loop = asyncio.get_running_loop()
+    latencies = []
+    errors = 0
+
+    async def send(due: float, model: str, timestamp: str) -> None:
+        nonlocal errors
+        await asyncio.sleep(max(0.0, due - loop.time()))
+        try:
+            status, _ = await http_get(
+                pool, "/predict?" + urlencode({"model": model, "timestamp": timestamp})
+            )
+        except (OSError, EOFError, ValueError, IndexError):
+            status = None
+        if status == 200:
+            latencies.append(loop.time() - due)
+        else:
+            errors += 1
+
+    start = loop.time()
+    await asyncio.gather(
+        *(
+            send(start + i / qps, model, timestamp)
+            for i, (model, timestamp) in enumerate(queries)
+        )
+    )
+    return np.array(latencies), errors, loop.time() - start
+
+
+def report(latencies: np.ndarray, errors: int, elapsed: float, qps: float) -> None:
+    print(f"  target rate:  {qps:,.0f} req/s")
+    print(
+        f"  throughput:   {len(latencies) / elapsed:,.0f} req/s "
+        f"({len(latencies)} ok, {errors} errors, {elapsed:.2f}s)"
+    )
+    if len(latencies):
+        p50, p95, p99 = np.percentile(latencies * 1000, [50, 95, 99])
+        print(
+            f"  latency:      p50 {p50:.2f} ms, p95 {p95:.2f} ms, p99 {p99:.2f} ms, "
+            f"max {latencies.max() * 1000:.2f} ms"
+        )
+
+
+async def run(args: argparse.Namespace, queries: list[tuple[str, str]]) -> None:
+    if args.local:
+        server = PredictionServer(
+            max_batch=args.max_batch, max_delay=args.max_delay_ms / 1000
+        )
+        http_server = await start_server(server, "127.0.0.1", 0)
+        host, port = "127.0.0.1", http_server.sockets[0].getsockname()[1]
+    else:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+
+    pool = ConnectionPool(host, port, size=args.connections)
+    latencies, errors, elapsed = await replay(pool, queries, args.qps)
+    await pool.close()
+    report(latencies, errors, elapsed, args.qps)
+
+    if args.local:
+        print(
+            f"  batches:      {server.batches} "
+            f"(mean size {server.requests / max(server.batches, 1):.1f})"
+        )
+        http_server.close()
+        for task in server.tasks:
+            task.cancel()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Replay prediction requests at a target rate."
+    )
+    parser.add_argument(
+        "log", nargs="?", default="requests.jsonl", help="JSONL request log"
+    )
+    parser.add_argument(
+        "--qps", type=float, default=1000.0, help="target requests per second"
+    )
+    parser.add_argument(
+        "--limit", type=int, default=None, help="replay at most this many queries"
+    )
+    parser.add_argument(
+        "--synthetic",
+        type=int,
+        default=None,
+        help="generate this many queries instead of reading the log",
+    )
+    parser.add_argument("--url", default=SERVER_URL)
+    parser.add_argument("--connections", type=int, default=CONNECTIONS)
+    parser.add_argument(
+        "--local",
+        action="store_true",
+        help="start an in-process server on the registry champion",
+    )
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH, help="with --local")
+    parser.add_argument(
+        "--max-delay-ms", type=float, default=MAX_DELAY * 1000, help="with --local"
+    )
+    args = parser.parse_args()
+
+    try:
+        queries = (
+            synthetic_queries(args.synthetic)
+            if args.synthetic
+            else load_queries(args.log)
+        )
+        if not queries:
+            raise ValueError(
+                f"No prediction records (model, timestamp) in {args.log}. "
+                f"Record some with serve.py --record or use --synthetic."
+            )
+        queries = queries[: args.limit]
+        print(f"  Replaying {len(queries)} queries")
+        asyncio.run(run(args, queries))
+
+    except FileNotFoundError as e:
+        print(f"  ERROR: File not found during replay - {str(e)}")
+        raise
+    except ValueError as e:
+        print(f"  ERROR: Validation error in replay - {str(e)}")
+        raise
@@ -0,0 +1,292 @@
+"""
+-------------------------------------------------------------------------------
+Benchmark suite of every pipeline stage on synthetic data.
+
+For every size in --rows, a raw store is generated (benchmarks/generate_data.py:
+many SKUs, invalid timestamps, negative sales, thousands of segments) in a
+scratch directory, and each stage is timed (best of --repeat) and profiled
+for its peak traced memory (tracemalloc: Python objects and NumPy/pandas
+buffers, not XGBoost's native memory):
+
+- find_latest_csv_file (snapshot index) and rebuild_index (directory scan);
+- load_data of the raw store (all segments) and of the processed dataset;
+- the preprocessing as a whole (transform), per pipeline stage and end to end
+  with CSV and columnar output (run_full);
+- train_model on up to --train-rows rows and evaluate_model on all rows.
+
+The results are written as JSON. With --save-baseline they become the
+baseline ('benchmarks/baseline.json'), with --compare they are checked
+against it: a stage regresses if it is slower or uses more memory than the
+baseline by more than the thresholds stored in the baseline (the exit code
+is then 1).
+
+    python3 benchmarks/run_suite.py --rows 10000 100000 --save-baseline
+    python3 benchmarks/run_suite.py --rows 10000 100000 --compare
+    python3 benchmarks/run_suite.py --rows 1000000 10000000 --no-memory \
+        --output results.json
+-------------------------------------------------------------------------------
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT.parent / "src"))
+sys.path.insert(0, str(ROOT))
+
+from generate_data import SEGMENTS, SKUS, generate_store  # noqa: E402
+from helper import find_latest_csv_file, load_data, rebuild_index  # noqa: E402
+from preprocessed import build_pipeline, run_full, transform  # noqa: E402
+from resources import available_cores  # noqa: E402
+from train import (  # noqa: E402
+    evaluate_model,
+    prepare_data,
+    split_train_test,
+    train_model,
+)
+from vocabulary import update_vocabulary  # noqa: E402
+
+BASELINE_PATH = ROOT / "baseline.json"
+SIZES = [10_000, 100_000]
+TRAIN_ROWS = 100_000  # Rows train_model is benchmarked on (the search dominates beyond)
+# a stage regresses if it exceeds the baseline by these factors and by the absolute
+# noise floors
+THRESHOLDS = {"seconds": 1.5, "peak_mb": 1.25, "min_seconds": 0.05, "min_mb": 5.0}
+
+
+def measure(step: Callable, repeat: int = 1, memory: bool = True):
+    """Run a step `repeat` times for the best time and once more under tracemalloc.
+
+    Returns:
+        Tuple of (return value, {"seconds": ..., "peak_mb": ...})
+    """
+    times = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = step()
+            times.append(time.perf_counter() - start)
+    metrics = {"seconds": round(min(times), 5)}
+
+    if memory:
+        tracemalloc.start()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                step()
+            metrics["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+        finally:
+            tracemalloc.stop()
+    return result, metrics
+
+
+def preprocess_stages(df: pd.DataFrame, vocabulary_path: Path) -> dict:
+    """Seconds of every stage of the preprocessing pipeline."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        update_vocabulary(df["model"], vocabulary_path)
+        pipeline = build_pipeline(vocabulary_path)
+        pipeline.run(df)
+    return {name: round(stats.seconds, 5) for name, stats in pipeline.stats.items()}
+
+
+def run_size(rows: int, args: argparse.Namespace, work_dir: Path) -> dict:
+    """Generate a raw store with `rows` rows and benchmark every stage on it."""
+    raw_dir, processed_dir = work_dir / "raw", work_dir / "processed"
+    processed_dir.mkdir(parents=True)
+    start = time.perf_counter()
+    generated = generate_store(raw_dir, rows, args.skus, args.segments)
+    print(
+        f"\n  {generated} rows, {args.skus} SKUs, {args.segments + 1} segments "
+        f"(generated in {time.perf_counter() - start:.1f}s)"
+    )
+
+    results = {}
+
+    def run(
+        name: str,
+        step: Callable,
+        stage_rows: Optional[int] = None,
+        memory: bool = not args.no_memory,
+    ):
+        result, metrics = measure(step, args.repeat, memory)
+        results[name] = {
+            "rows": stage_rows if stage_rows is not None else generated,
+            **metrics,
+        }
+        peak = f"{metrics['peak_mb']:>10.1f} MB" if "peak_mb" in metrics else ""
+        print(f"  {name:<42} {metrics['seconds']:>10.4f}s {peak}")
+        return result
+
+    run("find_latest_csv_file", lambda: find_latest_csv_file(raw_dir))
+    run("rebuild_index", lambda: rebuild_index(raw_dir))
+    latest = find_latest_csv_file(raw_dir)
+    raw = run("load_data.raw", lambda: load_data(latest))
+
+    run(
+        "preprocess.transform",
+        lambda: transform(raw.copy(), work_dir / "vocabulary.json"),
+    )
+    for name, seconds in preprocess_stages(
+        raw.copy(), work_dir / "vocabulary.json"
+    ).items():
+        results[f"preprocess.{name}"] = {"rows": generated, "seconds": seconds}
+        print(f"  {'preprocess.' + name:<42} {seconds:>10.4f}s")
+    run("preprocess.run_full", lambda: run_full(raw_dir, processed_dir))
+
+    processed_file = find_latest_csv_file(processed_dir)
+    processed = run("load_data.processed", lambda: load_data(processed_file), len(raw))
+
+    X, y = prepare_data(processed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        X_train, _, y_train, _ = split_train_test(
+            X.iloc[: args.train_rows], y.iloc[: args.train_rows]
+        )
+    model = run(
+        "train_model",
+        lambda: train_model(X_train, y_train, cache_path=None),
+        len(X_train),
+        memory=not args.no_memory and not args.no_train_memory,
+    )
+    run("evaluate_model", lambda: evaluate_model(model, X, y), len(X))
+    return results
+
+
+def compare(results: dict, baseline: dict) -> list[tuple]:
+    """Compare results with a baseline.
+
+    Returns:
+        Rows of (size, stage, metric, value, baseline value, ratio, regressed)
+    """
+    thresholds = baseline.get("thresholds", THRESHOLDS)
+    rows = []
+    for size, stages in results.items():
+        for stage, metrics in stages.items():
+            reference = baseline["results"].get(size, {}).get(stage)
+            if reference is None:
+                continue
+            for metric, floor in [
+                ("seconds", thresholds["min_seconds"]),
+                ("peak_mb", thresholds["min_mb"]),
+            ]:
+                if metric not in metrics or metric not in reference:
+                    continue
+                value, base = metrics[metric], reference[metric]
+                ratio = value / base if base else float("inf")
+                regressed = ratio > thresholds[metric] and value - base > floor
+                rows.append((size, stage, metric, value, base, ratio, regressed))
+    return rows
+
+
+def get_meta(args: argparse.Namespace) -> dict:
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cores": available_cores(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "xgboost": xgb.__version__,
+        "skus": args.skus,
+        "segments": args.segments,
+        "train_rows": args.train_rows,
+        "repeat": args.repeat,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark every pipeline stage on synthetic data."
+    )
+    parser.add_argument(
+        "--rows",
+        type=int,
+        nargs="+",
+        default=SIZES,
+        help="raw rows per dataset (10^4 to 10^8)",
+    )
+    parser.add_argument("--skus", type=int, default=SKUS)
+    parser.add_argument("--segments", type=int, default=SEGMENTS)
+    parser.add_argument("--train-rows", type=int, default=TRAIN_ROWS)
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="timed runs per stage (best is kept)"
+    )
+    parser.add_argument(
+        "--no-memory", action="store_true", help="skip the tracemalloc runs"
+    )
+    parser.add_argument(
+        "--no-train-memory",
+        action="store_true",
+        help="skip the tracemalloc run of train_model",
+    )
+    parser.add_argument(
+        "--work-dir", default=None, help="scratch directory (default: a temporary one)"
+    )
+    parser.add_argument(
+        "--output", default=None, help="write the results to this JSON file"
+    )
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="write the results as the new baseline",
+    )
+    parser.add_argument(
+        "--compare", action="store_true", help="check the results against the baseline"
+    )
+    args = parser.parse_args()
+
+    report = {"meta": get_meta(args), "thresholds": THRESHOLDS, "results": {}}
+    print(f"  {report['meta']['cores']} cores, python {report['meta']['python']}")
+    with tempfile.TemporaryDirectory(dir=args.work_dir) as tmp:
+        for rows in args.rows:
+            report["results"][str(rows)] = run_size(rows, args, Path(tmp) / str(rows))
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"\n  Results written to {args.output}")
+
+    if args.compare:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for key in ["skus", "segments", "train_rows", "cores"]:
+            if baseline["meta"].get(key) != report["meta"][key]:
+                print(
+                    f"  WARNING: {key} differs from the baseline "
+                    f"({baseline['meta'].get(key)} vs {report['meta'][key]})"
+                )
+        rows = compare(report["results"], baseline)
+        print(
+            f"\n  {'rows':>10} {'stage':<42} {'metric':<8} {'value':>10} "
+            f"{'baseline':>10} {'ratio':>7}"
+        )
+        for size, stage, metric, value, base, ratio, regressed in rows:
+            flag = "  REGRESSION" if regressed else ""
+            print(
+                f"  {size:>10} {stage:<42} {metric:<8} {value:>10.4f} "
+                f"{base:>10.4f} {ratio:>6.2f}x{flag}"
+            )
+        regressions = sum(row[-1] for row in rows)
+        print(
+            f"\n  {regressions} regression(s) in {len(rows)} comparisons "
+            f"against {args.baseline}"
+        )
+
+    if args.save_baseline:
+        Path(args.baseline).write_text(json.dumps(report, indent=2) + "\n")
+        print(f"  Baseline written to {args.baseline}")
+
+    if args.compare and regressions:
+        sys.exit(1)
@@ -11,25 +11,13 @@ log_message() {
     echo "[$(date '+%Y-%m-%d %H:%M:%S')] $1" >> "$LOG_FILE"
 }
 
-log_message "================================"
-log_message "=== Starting model training ==="
-log_message "================================"
-log_message "Python script: $PYTHON_SCRIPT"
-
-# run and capture stdout and stderr - and also add timestamps to python outputs
-if python3 "$PYTHON_SCRIPT" 2>&1 | while IFS= read -r line; do
-    log_message "$line"
-done; then
-    log_message "  SUCCESS: Model training completed!"
-    log_message "=== Training completed ==="
-    log_message "==============================="
-    log_message ""
-    exit 0
-else
-    EXIT_CODE=$?
+# the Python stage writes its own log lines in buffered blocks and appends its
+# metrics to logs/runs.jsonl (see src/runlog.py) - no fork per output line;
+# tracebacks on stderr are appended to the same log
+python3 "$PYTHON_SCRIPT" --log-file "$LOG_FILE" 2>> "$LOG_FILE"
+EXIT_CODE=$?
+if [ $EXIT_CODE -ne 0 ]; then
     log_message "  ERROR  : Model training failed! Exit code: $EXIT_CODE"
-    log_message "=== Training failed ==="
-    log_message "============================"
     log_message ""
-    exit $EXIT_CODE
 fi
+exit $EXIT_CODE
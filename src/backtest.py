@@ -0,0 +1,501 @@
+"""
+-------------------------------------------------------------------------------
+Rolling-origin backtesting of candidate models.
+
+train.py scores a model on one random train/test split. The sales are a time
+series, so that split trains on rows after the ones it tests and gives one
+noisy number. The backtest orders the rows by time (stable within an hour, so
+collection order is kept) and evaluates every candidate at --folds origins:
+train on the rows before the origin (expanding window, or the last --window
+rows) and test on the --horizon rows after it (sklearn's TimeSeriesSplit).
+
+- The time-ordered feature matrix and target are copied once into a shared
+  memory block (multiprocessing.shared_memory). The worker processes of the
+  pool map it as numpy arrays, so no task pickles or copies a fold; training
+  windows are contiguous row slices of it.
+- refit="full": every fold is fitted from scratch. Candidates that only
+  differ in n_estimators share one booster per fold, whose prefixes are
+  scored (like search.py), and all (parameter group, fold) pairs run in
+  parallel.
+- refit="warm" (expanding windows only): the booster of the previous origin
+  is continued for WARM_START_ROUNDS rounds on the rows added since, which is
+  how train.py updates the champion between full retrains. The folds of a
+  candidate are one chain of fits, the chains of the candidates run in
+  parallel.
+
+Candidates are the models of the registry (default) or the grid of train.py
+(--grid). Prints a per-fold and an aggregate metrics table:
+
+    python3 src/backtest.py --folds 5 --refit warm --output backtest.csv
+-------------------------------------------------------------------------------
+"""
+
+import argparse
+import contextlib
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.metrics import mean_absolute_error, r2_score, root_mean_squared_error
+from sklearn.model_selection import ParameterGrid, TimeSeriesSplit
+
+from helper import find_latest_csv_file, load_data
+from registry import load_registry
+from resources import describe_plan, plan_parallelism
+from runlog import record_metrics, stage_run
+from search import group_by_rounds
+from train import (
+    PARAM_GRID,
+    PROCESSED_DIR,
+    RANDOM_STATE,
+    WARM_START_ROUNDS,
+    prepare_data,
+)
+
+BACKTEST_FOLDS = 5  # Rolling origins per candidate
+# Features that order the rows in time
+TIME_COLUMNS = ["year", "month", "day_of_month", "hour"]
+
+# Shared memory block of the current backtest and the arrays mapped from it
+_shared: dict = {}
+
+
+@dataclass
+class BacktestResult:
+    """Metrics of every candidate and fold, and per candidate over all folds."""
+
+    folds: pd.DataFrame
+    summary: pd.DataFrame
+
+    @property
+    def best(self) -> str:
+        """Candidate with the lowest mean RMSE"""
+        return self.summary.index[0]
+
+
+def time_order(X: pd.DataFrame) -> np.ndarray:
+    """Row order by hour, stable so rows of an hour keep their collection order."""
+    if not set(TIME_COLUMNS).issubset(X.columns):
+        return np.arange(len(X))
+    year, month, day, hour = (X[name].to_numpy(dtype=np.int64) for name in TIME_COLUMNS)
+    return np.argsort(((year * 12 + month) * 31 + day) * 24 + hour, kind="stable")
+
+
+def attach_dataset(
+    name: str, rows: int, features: int, shm: Optional[SharedMemory] = None
+) -> None:
+    """Map the shared feature matrix and target into this process (pool initializer).
+
+    Args:
+        name: Name of the shared memory block
+        rows: Rows of the dataset
+        features: Feature columns
+        shm: Block already opened by this process, attached by name if None
+    """
+    if shm is None:
+        # the creating process unlinks the block, workers must not track it.
+        # Before Python 3.13 (no track argument) attaching registers it with the
+        # resource tracker the pool shares with its parent, a duplicate of the
+        # parent's registration that its unlink removes
+        if sys.version_info >= (3, 13):
+            shm = SharedMemory(name=name, track=False)
+        else:
+            shm = SharedMemory(name=name)
+    X = np.ndarray((rows, features), dtype=np.float32, buffer=shm.buf)
+    y = np.ndarray((rows,), dtype=np.float32, buffer=shm.buf, offset=X.nbytes)
+    _shared.update(shm=shm, X=X, y=y)
+
+
+@contextlib.contextmanager
+def share_dataset(X: np.ndarray, y: np.ndarray, order: np.ndarray) -> Iterator[str]:
+    """Copy the rows of X and y in the given order into a shared memory block.
+
+    The block is unlinked on exit. XGBoost trains on float32, so the matrix is
+    stored as float32 and fits do not convert it again.
+
+    Yields:
+        Name of the block (see attach_dataset)
+    """
+    rows, features = X.shape
+    shm = SharedMemory(create=True, size=max(1, 4 * rows * (features + 1)))
+    try:
+        attach_dataset(shm.name, rows, features, shm)
+        np.take(X, order, axis=0, out=_shared["X"])
+        np.take(y, order, out=_shared["y"])
+        yield shm.name
+    finally:
+        # the arrays have to be released before the buffer can be closed
+        _shared.clear()
+        shm.close()
+        shm.unlink()
+
+
+def score_predictions(y_true: np.ndarray, y_pred: np.ndarray) -> dict:
+    return {
+        "rmse": float(root_mean_squared_error(y_true, y_pred)),
+        "mae": float(mean_absolute_error(y_true, y_pred)),
+        "r2": float(r2_score(y_true, y_pred)) if len(y_true) > 1 else float("nan"),
+    }
+
+
+def run_chain(
+    booster_params: dict,
+    rounds: list[int],
+    bounds: list[tuple[int, int, int, int]],
+    warm: bool,
+    max_bin: int,
+) -> list[list[dict]]:
+    """Fit and score one parameter group on a sequence of folds of the shared dataset.
+
+    Args:
+        booster_params: XGBoost parameters of the group (without n_estimators)
+        rounds: n_estimators values of the group's candidates
+        bounds: (fold, train start, origin, test end) row bounds of the folds
+        warm: Continue the booster of the previous fold on the added rows
+            instead of fitting every fold from scratch (one round count only)
+        max_bin: Histogram bins of the training matrices
+
+    Returns:
+        Per fold, the metrics of every round count
+    """
+    X, y = _shared["X"], _shared["y"]
+    nthread = booster_params["n_jobs"]
+    booster, trained_until, results = None, 0, []
+    for fold, start, origin, end in bounds:
+        started = time.perf_counter()
+        if warm and booster is not None:
+            dtrain = xgb.QuantileDMatrix(
+                X[trained_until:origin],
+                y[trained_until:origin],
+                max_bin=max_bin,
+                nthread=nthread,
+            )
+            booster = xgb.train(
+                booster_params,
+                dtrain,
+                num_boost_round=WARM_START_ROUNDS,
+                xgb_model=booster,
+            )
+        else:
+            dtrain = xgb.QuantileDMatrix(
+                X[start:origin], y[start:origin], max_bin=max_bin, nthread=nthread
+            )
+            booster = xgb.train(booster_params, dtrain, num_boost_round=max(rounds))
+        trained_until = origin
+        fit_seconds = time.perf_counter() - started
+
+        dtest = xgb.DMatrix(X[origin:end], nthread=nthread)
+        # a warm chain is scored with all its trees, a fresh booster at every prefix
+        ranges = [(0, 0)] if warm else [(0, n) for n in rounds]
+        results.append(
+            [
+                {
+                    "fold": fold,
+                    "train_rows": origin - start,
+                    "test_rows": end - origin,
+                    **score_predictions(
+                        y[origin:end],
+                        booster.predict(dtest, iteration_range=iteration_range),
+                    ),
+                    "fit_seconds": round(fit_seconds, 4),
+                }
+                for iteration_range in ranges
+            ]
+        )
+    return results
+
+
+def run_backtest(
+    X: pd.DataFrame,
+    y: pd.Series,
+    candidates: dict[str, dict],
+    folds: int = BACKTEST_FOLDS,
+    horizon: Optional[int] = None,
+    window: Optional[int] = None,
+    refit: str = "full",
+    jobs: Optional[int] = None,
+    fit_threads: Optional[int] = None,
+) -> BacktestResult:
+    """Evaluate candidate parameters at rolling time-based origins.
+
+    Args:
+        X: Feature dataframe (rows in any order, sorted by TIME_COLUMNS)
+        y: Target series
+        candidates: Parameters of every candidate by label, with n_estimators
+        folds: Number of origins
+        horizon: Test rows after every origin, len(X) // (folds + 1) if None
+        window: Train on at most this many rows before the origin, all if None
+        refit: "full" to fit every fold from scratch, "warm" to continue the
+            booster of the previous origin (expanding windows only)
+        jobs: Worker processes, derived from the available cores if None
+        fit_threads: XGBoost threads per fit, derived if None
+
+    Returns:
+        BacktestResult with the per-fold and aggregate metrics
+    """
+    if refit not in ("full", "warm"):
+        raise ValueError(f"Unknown refit mode '{refit}'. Expected 'full' or 'warm'.")
+    if refit == "warm" and window is not None:
+        raise ValueError(
+            "Warm refits extend the previous training window and need expanding "
+            "windows (no --window)."
+        )
+    if not candidates:
+        raise ValueError("No candidates to backtest.")
+
+    labels = list(candidates)
+    splitter = TimeSeriesSplit(n_splits=folds, test_size=horizon, max_train_size=window)
+    # rows are time-ordered, so every fold is a contiguous range:
+    # (fold, start, origin, end)
+    bounds = [
+        (fold, int(train[0]), int(test[0]), int(test[-1]) + 1)
+        for fold, (train, test) in enumerate(splitter.split(np.empty((len(X), 1))))
+    ]
+
+    if refit == "full":
+        tasks = [
+            (
+                indices,
+                params,
+                [candidates[labels[i]]["n_estimators"] for i in indices],
+                [fold],
+            )
+            for params, indices in group_by_rounds(list(candidates.values()))
+            for fold in bounds
+        ]
+    else:
+        tasks = [
+            (
+                [i],
+                {k: v for k, v in params.items() if k != "n_estimators"},
+                [params["n_estimators"]],
+                bounds,
+            )
+            for i, params in enumerate(candidates.values())
+        ]
+    largest_window = max(origin - start for _, start, origin, _ in bounds)
+    plan = plan_parallelism(
+        len(tasks), largest_window, search_jobs=jobs, fit_threads=fit_threads
+    )
+    print(
+        f"  Backtesting {len(candidates)} candidates at {len(bounds)} origins "
+        f"({refit} refits, {len(tasks)} tasks): {describe_plan(plan)}"
+    )
+
+    arguments = [
+        (
+            xgb.XGBRegressor(
+                random_state=RANDOM_STATE, **plan.xgb_params(), **params
+            ).get_xgb_params(),
+            rounds,
+            task_bounds,
+            refit == "warm",
+            plan.max_bin,
+        )
+        for _, params, rounds, task_bounds in tasks
+    ]
+
+    order = time_order(X)
+    started = time.perf_counter()
+    with share_dataset(
+        X.to_numpy(dtype=np.float32), y.to_numpy(dtype=np.float32), order
+    ) as name:
+        origins = [describe_origin(X.iloc[order[origin]]) for _, _, origin, _ in bounds]
+        if plan.search_jobs == 1:
+            results = [run_chain(*task) for task in arguments]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=plan.search_jobs,
+                initializer=attach_dataset,
+                initargs=(name, *X.shape),
+            ) as pool:
+                results = list(pool.map(run_chain, *zip(*arguments)))
+    seconds = time.perf_counter() - started
+
+    rows = [
+        {"candidate": labels[index], "origin": origins[metrics["fold"]], **metrics}
+        for (indices, *_), task_results in zip(tasks, results)
+        for fold_results in task_results
+        for index, metrics in zip(indices, fold_results)
+    ]
+    rows.sort(key=lambda row: (labels.index(row["candidate"]), row["fold"]))
+    table = pd.DataFrame(rows)
+    summary = (
+        table.groupby("candidate", sort=False)
+        .agg(
+            rmse_mean=("rmse", "mean"),
+            rmse_std=("rmse", "std"),
+            mae_mean=("mae", "mean"),
+            r2_mean=("r2", "mean"),
+            folds=("fold", "count"),
+        )
+        .sort_values("rmse_mean", kind="stable")
+    )
+    result = BacktestResult(table, summary)
+    record_metrics(
+        candidates=len(candidates),
+        folds=len(bounds),
+        refit=refit,
+        backtest_seconds=round(seconds, 4),
+        best=result.best,
+        best_rmse=float(summary["rmse_mean"].iloc[0]),
+    )
+    return result
+
+
+def describe_origin(row: pd.Series) -> str:
+    """Hour of the first test row of a fold"""
+    if not set(TIME_COLUMNS).issubset(row.index):
+        return str(row.name)
+    year, month, day, hour = (int(row[name]) for name in TIME_COLUMNS)
+    return f"{year:04d}-{month:02d}-{day:02d} {hour:02d}:00"
+
+
+def registry_candidates() -> dict[str, dict]:
+    """Distinct parameters of the registered models, champion first."""
+    registry = load_registry()
+    versions = sorted(
+        registry["versions"], key=lambda entry: entry["version"] != registry["champion"]
+    )
+    candidates = {}
+    for entry in versions:
+        if entry["params"] not in candidates.values():
+            suffix = " (champion)" if entry["version"] == registry["champion"] else ""
+            candidates[f"v{entry['version']}{suffix}"] = entry["params"]
+    return candidates
+
+
+def grid_candidates(param_grid: dict = PARAM_GRID) -> dict[str, dict]:
+    return {
+        ", ".join(f"{name}={value}" for name, value in params.items()): params
+        for params in ParameterGrid(param_grid)
+    }
+
+
+def print_result(result: BacktestResult, show_folds: bool = True) -> None:
+    with pd.option_context(
+        "display.width",
+        160,
+        "display.max_columns",
+        20,
+        "display.float_format",
+        "{:.4f}".format,
+    ):
+        if show_folds:
+            print(result.folds.to_string(index=False))
+        print(result.summary.to_string())
+    print(f"  Best candidate: {result.best}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Backtest candidate models at rolling time-based origins."
+    )
+    parser.add_argument(
+        "--grid",
+        action="store_true",
+        help="backtest the parameter grid of train.py instead of the registered models",
+    )
+    parser.add_argument(
+        "--folds",
+        type=int,
+        default=BACKTEST_FOLDS,
+        help="rolling origins per candidate",
+    )
+    parser.add_argument(
+        "--horizon",
+        type=int,
+        default=None,
+        help="test rows after every origin (default: rows / (folds + 1))",
+    )
+    parser.add_argument(
+        "--window",
+        type=int,
+        default=None,
+        help="train on at most this many rows before the origin (default: expanding)",
+    )
+    parser.add_argument(
+        "--refit",
+        choices=["full", "warm"],
+        default="full",
+        help=(
+            "full: fit every fold from scratch, warm: continue the previous "
+            "origin's booster like train.py's warm starts"
+        ),
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="worker processes (default: derived from the available cores)",
+    )
+    parser.add_argument(
+        "--fit-threads",
+        type=int,
+        default=None,
+        help="XGBoost threads per fit (default: derived)",
+    )
+    parser.add_argument(
+        "--output", default=None, help="write the per-fold metrics to this CSV file"
+    )
+    parser.add_argument(
+        "--summary-only", action="store_true", help="only print the aggregate metrics"
+    )
+    parser.add_argument(
+        "--log-file",
+        default=None,
+        help="write the output to this log file instead of stdout (see src/runlog.py)",
+    )
+    args = parser.parse_args()
+
+    with stage_run("backtest", "backtest", args.log_file):
+        try:
+            latest_file = find_latest_csv_file(PROCESSED_DIR)
+            if not latest_file:
+                raise FileNotFoundError(
+                    f"No processed CSV files found in {PROCESSED_DIR}. "
+                    f"Run preprocessing first."
+                )
+            X, y = prepare_data(load_data(latest_file))
+            candidates = grid_candidates() if args.grid else registry_candidates()
+            if not candidates:
+                raise ValueError(
+                    "No registered models to backtest. "
+                    "Train a model first or use --grid."
+                )
+
+            result = run_backtest(
+                X,
+                y,
+                candidates,
+                folds=args.folds,
+                horizon=args.horizon,
+                window=args.window,
+                refit=args.refit,
+                jobs=args.jobs,
+                fit_threads=args.fit_threads,
+            )
+            print_result(result, show_folds=not args.summary_only)
+            if args.output:
+                result.folds.to_csv(args.output, index=False)
+                print(f"  Per-fold metrics saved to {args.output}")
+
+        except FileNotFoundError as e:
+            print(f"  ERROR: File not found - {str(e)}")
+            raise
+        except ValueError as e:
+            print(f"  ERROR: Validation error in backtest - {str(e)}")
+            raise
+        except Exception as e:
+            print(
+                f"  ERROR: Unexpected error during backtest. "
+                f"Error type: {type(e).__name__}. "
+                f"Details: {str(e)}"
+            )
+            raise
@@ -0,0 +1,387 @@
+"""
+-------------------------------------------------------------------------------
+This script `collect.py` collects the sales of all graphics card models
+(scripts/collect.sh runs it).
+
+1. It queries the API for all graphics card models at the same time over one
+   pool of keep-alive HTTP connections, so a cycle takes as long as the
+   slowest model instead of the sum of all models.
+
+2. Every request has a timeout and is retried a bounded number of times with
+   exponential backoff.
+
+3. Responses are validated (digits only) and the valid
+   rows are written as a delta segment 'data/raw/sales_YYYYMMDD_HHMM.csv'
+   that is registered in 'data/raw/manifest.csv'.
+
+4. Requests, results and errors are logged in 'logs/collect.logs' in the
+   human-readable '[YYYY-mm-dd HH:MM:SS] message' format of the shell scripts.
+
+For offline benchmarks, point it to the stand-in API in src/mock_api.py.
+-------------------------------------------------------------------------------
+"""
+
+import argparse
+import asyncio
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlsplit
+
+import pandas as pd
+from helper import append_segment
+from runlog import record_metrics, stage_run
+
+# Configuration constants
+API_URL = "http://0.0.0.0:5000/"
+LOG_FILE = "logs/collect.logs"
+DATA_DIR = "data/raw"
+GRAPHIC_CARDS_MODELS = ["rtx3060", "rtx3070", "rtx3080", "rtx3090", "rx6700"]
+REQUEST_TIMEOUT = 2.0  # Seconds per attempt (connect + response)
+MAX_RETRIES = 2  # Retries after the first attempt
+BACKOFF_BASE = 0.1  # Seconds, doubled after every failed attempt
+
+SALES_PATTERN = re.compile(r"^[0-9]+$")
+
+
+@dataclass
+class QueryResult:
+    """Outcome of querying the API for one model."""
+
+    model: str
+    timestamp: str
+    sales: Optional[int] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    latency: float = 0.0
+
+
+class ConnectionPool:
+    """Pool of keep-alive HTTP/1.1 connections to a single host.
+
+    Connections are handed out with `acquire` and given back with `release`.
+    Idle connections are reused, so repeated cycles (daemon mode, retries)
+    skip the TCP handshake.
+    """
+
+    def __init__(self, host: str, port: int, size: int):
+        self.host = host
+        self.port = port
+        self._slots = asyncio.Semaphore(size)
+        self._idle: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    async def acquire(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        await self._slots.acquire()
+        while self._idle:
+            reader, writer = self._idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer
+            writer.close()
+        try:
+            return await asyncio.open_connection(self.host, self.port)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(
+        self,
+        connection: tuple[asyncio.StreamReader, asyncio.StreamWriter],
+        reusable: bool,
+    ) -> None:
+        if reusable:
+            self._idle.append(connection)
+        else:
+            connection[1].close()
+        self._slots.release()
+
+    async def close(self) -> None:
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+
+async def read_chunked(reader: asyncio.StreamReader) -> bytes:
+    """Read a body with chunked transfer encoding (trailers are skipped).
+
+    Raises:
+        ValueError: If a chunk size line is not hexadecimal
+        asyncio.IncompleteReadError: If the connection closes within the body
+    """
+    chunks = []
+    while True:
+        size_line = await reader.readline()
+        if not size_line:
+            raise asyncio.IncompleteReadError(b"".join(chunks), None)
+        size = int(size_line.split(b";")[0].strip(), 16)
+        if size == 0:
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            return b"".join(chunks)
+        chunks.append(await reader.readexactly(size))
+        await reader.readexactly(2)  # CRLF after the chunk data
+
+
+async def http_get(pool: ConnectionPool, path: str) -> tuple[int, str]:
+    """Send a GET request over a pooled connection.
+
+    Args:
+        pool: Connection pool for the API host
+        path: Request path, e.g. /rtx3060
+
+    Returns:
+        Tuple of (status code, response body)
+    """
+    connection = await pool.acquire()
+    reader, writer = connection
+    reusable = False
+    try:
+        writer.write(
+            f"GET {path} HTTP/1.1\r\n"
+            f"Host: {pool.host}:{pool.port}\r\n"
+            f"Connection: keep-alive\r\n\r\n".encode()
+        )
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("Connection closed by server")
+        status = int(status_line.split()[1])
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        # the body is delimited by its length, by chunks, or (HTTP/1.0 style)
+        # by the server closing the connection; 1xx, 204 and 304 have none
+        keep_alive = headers.get("connection", "").lower() != "close"
+        if status < 200 or status in (204, 304):
+            body, reusable = b"", keep_alive
+        elif "chunked" in headers.get("transfer-encoding", "").lower():
+            body = await read_chunked(reader)
+            reusable = keep_alive
+        elif "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+            reusable = keep_alive
+        else:
+            body = await reader.read()
+
+        return status, body.decode(errors="replace")
+    finally:
+        pool.release(connection, reusable)
+
+
+async def query_model(
+    pool: ConnectionPool,
+    base_path: str,
+    model: str,
+    timeout: float = REQUEST_TIMEOUT,
+    max_retries: int = MAX_RETRIES,
+    backoff: float = BACKOFF_BASE,
+) -> QueryResult:
+    """Query the sales of one model with timeout, retries and validation.
+
+    Args:
+        pool: Connection pool for the API host
+        base_path: Path prefix of the API
+        model: Graphics card model, e.g. rtx3060
+        timeout: Seconds per attempt
+        max_retries: Retries after the first attempt
+        backoff: Initial backoff in seconds, doubled after every attempt
+
+    Returns:
+        QueryResult with either sales or error set
+    """
+    path = f"{base_path.rstrip('/')}/{model}"
+    start = time.perf_counter()
+    result = QueryResult(model=model, timestamp="")
+
+    for attempt in range(max_retries + 1):
+        result.attempts = attempt + 1
+        result.timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        try:
+            status, body = await asyncio.wait_for(http_get(pool, path), timeout)
+        except asyncio.TimeoutError:
+            result.error = f"Timeout after {timeout:.1f}s"
+        except (OSError, EOFError, ValueError, IndexError) as e:
+            result.error = f"{type(e).__name__}: {e}"
+        else:
+            body = body.strip()
+            if status != 200:
+                result.error = f"HTTP {status}: '{body}'"
+            elif SALES_PATTERN.match(body):
+                result.sales = int(body)
+                result.error = None
+                break
+            else:
+                # an invalid payload is an answer of the API, it is not retried
+                result.error = f"Invalid response: '{body}' - not a number"
+                break
+
+        if attempt < max_retries:
+            await asyncio.sleep(backoff * 2**attempt)
+
+    result.latency = time.perf_counter() - start
+    return result
+
+
+async def collect(
+    models: list[str] = GRAPHIC_CARDS_MODELS,
+    api_url: str = API_URL,
+    timeout: float = REQUEST_TIMEOUT,
+    max_retries: int = MAX_RETRIES,
+    backoff: float = BACKOFF_BASE,
+    pool: Optional[ConnectionPool] = None,
+) -> list[QueryResult]:
+    """Query all models concurrently.
+
+    Args:
+        models: Graphics card models to query
+        api_url: Base URL of the API
+        timeout: Seconds per attempt
+        max_retries: Retries after the first attempt
+        backoff: Initial backoff in seconds
+        pool: Existing connection pool to reuse (a new one is created otherwise)
+
+    Returns:
+        One QueryResult per model, in the order of `models`
+    """
+    url = urlsplit(api_url)
+    own_pool = pool is None
+    if own_pool:
+        pool = ConnectionPool(url.hostname, url.port or 80, size=len(models))
+
+    try:
+        return await asyncio.gather(
+            *(
+                query_model(pool, url.path, model, timeout, max_retries, backoff)
+                for model in models
+            )
+        )
+    finally:
+        if own_pool:
+            await pool.close()
+
+
+def results_to_frame(results: list[QueryResult]) -> pd.DataFrame:
+    """Convert the valid query results into raw sales rows.
+
+    Args:
+        results: Query results of one cycle
+
+    Returns:
+        Dataframe with columns timestamp, model, sales
+    """
+    rows = [(r.timestamp, r.model, r.sales) for r in results if r.sales is not None]
+    return pd.DataFrame(rows, columns=["timestamp", "model", "sales"])
+
+
+def write_log(log_file: str, lines: list[str]) -> None:
+    """Append lines to the log file in the format of the shell scripts."""
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with open(log_file, "a") as f:
+        f.writelines(f"[{now}] {line}\n" for line in lines)
+
+
+def run_collection(
+    api_url: str = API_URL,
+    data_dir: str = DATA_DIR,
+    log_file: str = LOG_FILE,
+    models: list[str] = GRAPHIC_CARDS_MODELS,
+    timeout: float = REQUEST_TIMEOUT,
+    max_retries: int = MAX_RETRIES,
+) -> pd.DataFrame:
+    """Run one collection cycle and store the new rows as a delta segment.
+
+    Args:
+        api_url: Base URL of the API
+        data_dir: Directory of the append-only raw store
+        log_file: Collection log file
+        models: Graphics card models to query
+        timeout: Seconds per attempt
+        max_retries: Retries after the first attempt
+
+    Returns:
+        Dataframe with the rows collected in this cycle
+    """
+    segment_name = f"sales_{datetime.now().strftime('%Y%m%d_%H%M')}.csv"
+    lines = [
+        "================================",
+        "=== Starting data collection ===",
+        "================================",
+        f"Output file: {Path(data_dir) / segment_name}",
+        f"  INFO   : Querying {len(models)} models concurrently at {api_url}",
+    ]
+
+    start = time.perf_counter()
+    results = asyncio.run(collect(models, api_url, timeout, max_retries))
+    elapsed = time.perf_counter() - start
+
+    for r in results:
+        if r.sales is not None:
+            lines.append(
+                f"  SUCCESS: {r.model}: {r.sales} sales "
+                f"({r.latency * 1000:.0f} ms, {r.attempts} attempt(s))"
+            )
+        else:
+            lines.append(
+                f"  ERROR  : Failed to query API for {r.model} after "
+                f"{r.attempts} attempt(s): {r.error}"
+            )
+
+    df = results_to_frame(results)
+    try:
+        segment_path = append_segment(data_dir, df, segment_name)
+        lines.append(f"Registered {segment_path.name} ({len(df)} rows) in manifest")
+    except FileExistsError as e:
+        lines.append(f"  ERROR  : {e}")
+        write_log(log_file, lines)
+        raise
+
+    lines += [
+        "=================================",
+        f"Total models queried: {len(models)} in {elapsed:.3f}s",
+        "=== Data collection completed ===",
+        "=================================",
+        "",
+    ]
+    write_log(log_file, lines)
+    record_metrics(
+        models=len(models),
+        failed_models=sum(r.sales is None for r in results),
+        rows_out=len(df),
+        query_seconds=round(elapsed, 4),
+    )
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Collect graphics card sales concurrently."
+    )
+    parser.add_argument("--api-url", default=API_URL)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--log-file", default=LOG_FILE)
+    parser.add_argument("--timeout", type=float, default=REQUEST_TIMEOUT)
+    parser.add_argument("--retries", type=int, default=MAX_RETRIES)
+    args = parser.parse_args()
+
+    with stage_run("collect", "data collection"):
+        df = run_collection(
+            api_url=args.api_url,
+            data_dir=args.data_dir,
+            log_file=args.log_file,
+            timeout=args.timeout,
+            max_retries=args.retries,
+        )
+        print(f"  Collected {len(df)} rows")
@@ -0,0 +1,197 @@
+"""
+-------------------------------------------------------------------------------
+Binary columnar storage for the processed dataset.
+
+A dataset is a directory 'sales_processed_YYYYMMDD_HHMM.cols/' containing
+one raw little-endian array per column ('<column>.bin') and a 'schema.json'
+with the column order, the dtype (and file) of every column and the row count.
+
+- Every integer column is stored with the smallest dtype that fits its
+  values (e.g. uint8 for hour), so the data is several times smaller than CSV.
+- Columns are opened with numpy.memmap, so loading does not parse or copy.
+- Rows can be appended in place; a column is rewritten only if new values no
+  longer fit its dtype, into a new file ('<column>.<dtype>.bin'). The schema is
+  updated last and atomically, so readers never see rows that are not
+  completely written or a column file that does not match its dtype.
+-------------------------------------------------------------------------------
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+COLUMNAR_SUFFIX = ".cols"
+SCHEMA_FILENAME = "schema.json"
+FORMAT_VERSION = "columnar-v1"
+
+# candidate integer widths, smallest first
+INTEGER_DTYPES = ["uint8", "int8", "uint16", "int16", "uint32", "int32", "int64"]
+
+
+def smallest_dtype(values: np.ndarray) -> np.dtype:
+    """Return the smallest dtype that can hold all values of a column.
+
+    Args:
+        values: Column values
+
+    Returns:
+        Compact integer dtype, or the original dtype for non-integer columns
+    """
+    if not np.issubdtype(values.dtype, np.integer):
+        return values.dtype.newbyteorder("<")
+    if len(values) == 0:
+        return np.dtype("uint8")
+
+    low, high = int(values.min()), int(values.max())
+    for name in INTEGER_DTYPES:
+        info = np.iinfo(name)
+        if info.min <= low and high <= info.max:
+            return np.dtype(name).newbyteorder("<")
+    return np.dtype("<i8")
+
+
+def is_columnar(path: Path) -> bool:
+    """Check if a path is a columnar dataset directory."""
+    return path.is_dir() and (path / SCHEMA_FILENAME).exists()
+
+
+def read_schema(path: Path) -> dict:
+    with open(path / SCHEMA_FILENAME) as f:
+        return json.load(f)
+
+
+def column_file(path: Path, column: dict) -> Path:
+    """Return the file of a schema column (widened columns name their file)."""
+    return path / column.get("file", f"{column['name']}.bin")
+
+
+def write_schema(path: Path, schema: dict) -> None:
+    tmp_path = path / f".{SCHEMA_FILENAME}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(schema, f, indent=2)
+    os.replace(tmp_path, path / SCHEMA_FILENAME)
+
+
+def save_columnar(df: pd.DataFrame, path: Path) -> None:
+    """Write a dataframe as a columnar dataset, replacing existing columns.
+
+    Args:
+        df: Dataframe with numeric columns
+        path: Target directory (created if missing)
+    """
+    path.mkdir(parents=True, exist_ok=True)
+    widened = []  # files of columns widened by appends to the replaced dataset
+    if is_columnar(path):
+        previous = read_schema(path)["columns"]
+        widened = [column_file(path, c) for c in previous if "file" in c]
+    columns = []
+    for name in df.columns:
+        values = df[name].to_numpy()
+        dtype = smallest_dtype(values)
+        values.astype(dtype).tofile(path / f"{name}.bin")
+        columns.append({"name": name, "dtype": dtype.str})
+
+    write_schema(path, {"format": FORMAT_VERSION, "rows": len(df), "columns": columns})
+    for file_path in widened:
+        file_path.unlink(missing_ok=True)
+
+
+def append_columnar(df: pd.DataFrame, path: Path) -> int:
+    """Append rows to an existing columnar dataset.
+
+    Args:
+        df: New rows with the same columns as the dataset
+        path: Dataset directory
+
+    Returns:
+        Total number of rows after the append
+
+    Raises:
+        ValueError: If the columns do not match the schema
+    """
+    schema = read_schema(path)
+    names = [column["name"] for column in schema["columns"]]
+    if list(df.columns) != names:
+        raise ValueError(
+            f"Columns {list(df.columns)} do not match columnar schema {names} "
+            f"of {path}."
+        )
+
+    rows = schema["rows"]
+    replaced = []
+    for column in schema["columns"]:
+        file_path = column_file(path, column)
+        dtype = np.dtype(column["dtype"])
+        values = df[column["name"]].to_numpy()
+
+        if len(values) and np.issubdtype(dtype, np.integer):
+            info = np.iinfo(dtype)
+            if values.min() < info.min or values.max() > info.max:
+                # widen: write old and new values with a dtype fitting both to a
+                # new file, the schema still refers to the old one until the end
+                old = np.fromfile(file_path, dtype=dtype, count=rows)
+                dtype = smallest_dtype(np.concatenate([old.astype("int64"), values]))
+                widened_path = path / f"{column['name']}.{dtype.name}.bin"
+                tmp_path = path / f".{widened_path.name}.tmp"
+                np.concatenate([old, values]).astype(dtype).tofile(tmp_path)
+                os.replace(tmp_path, widened_path)
+                column["dtype"] = dtype.str
+                column["file"] = widened_path.name
+                replaced.append(file_path)
+                continue
+
+        # truncate bytes of an interrupted append beyond the schema row count
+        with open(file_path, "r+b") as f:
+            f.truncate(rows * dtype.itemsize)
+            f.seek(0, os.SEEK_END)
+            f.write(values.astype(dtype).tobytes())
+
+    schema["rows"] = rows + len(df)
+    write_schema(path, schema)
+    # open memory maps keep the data of removed files
+    for file_path in replaced:
+        file_path.unlink()
+    return schema["rows"]
+
+
+def truncate_columnar(path: Path, rows: int) -> None:
+    """Drop the rows after the first `rows` of a columnar dataset.
+
+    Only the schema row count is lowered; the bytes beyond it are cut by the
+    next append.
+    """
+    schema = read_schema(path)
+    if schema["rows"] > rows:
+        schema["rows"] = rows
+        write_schema(path, schema)
+
+
+def load_columnar(path: Path) -> pd.DataFrame:
+    """Open a columnar dataset as a dataframe backed by memory-mapped arrays.
+
+    Args:
+        path: Dataset directory
+
+    Returns:
+        Dataframe whose columns are read-only views on the column files
+    """
+    schema = read_schema(path)
+    rows = schema["rows"]
+    data = {}
+    for column in schema["columns"]:
+        dtype = np.dtype(column["dtype"])
+        if rows == 0:
+            data[column["name"]] = np.empty(0, dtype=dtype)
+        else:
+            data[column["name"]] = np.memmap(
+                column_file(path, column), dtype=dtype, mode="r", shape=(rows,)
+            )
+    return pd.DataFrame(data, copy=False)
+
+
+def export_csv(path: Path, csv_path: Path) -> None:
+    """Export a columnar dataset to CSV."""
+    load_columnar(path).to_csv(csv_path, index=False)
@@ -0,0 +1,530 @@
+"""
+-------------------------------------------------------------------------------
+This script `compact.py` bounds the number of files the pipeline leaves
+behind. Every run adds a raw delta segment, processed snapshots after full
+rebuilds, a timestamped 'model/model_YYYYMMDD_HHMM.pkl' and a registered
+booster, and nothing removes them.
+
+1. Raw store ('data/raw/'): the delta segments of every day, except the
+   newest --keep-segments, are merged into one gzip-compressed segment
+   'sales_compacted_YYYYMMDD_HHMM.csv.gz' (named after the last merged delta)
+   without exact duplicate rows, and the manifest lists it in their place.
+   Loaders read it through the manifest like any other segment. The base file
+   'sales_data.csv' is never touched, and as compacted segments do not match
+   'sales_*.csv', the newest delta stays the latest file for
+   find_latest_csv_file and tests/test_collect.py.
+
+2. Processed snapshots ('data/processed/'): the current outputs (watermark
+   and stage stamp) are kept, plus the newest --keep-last snapshots and the
+   newest snapshot of each of the last --keep-daily days.
+
+3. Models ('model/'): 'model.pkl', the champion and the version of the
+   training state are kept, the timestamped pickles and the registered
+   boosters with the same policy as the processed snapshots. Pruned versions
+   are moved to the 'archived' list of the registry with their metrics.
+
+A compaction that removes no rows keeps the stage stamps valid (see
+src/stage_cache.py), so the next pipeline run is still a cache hit. If
+duplicates were removed, the preprocessing watermark is dropped and the next
+run rebuilds the processed dataset.
+
+The manifest is rewritten, so run it after the pipeline rather than next to
+a collection (`make bash compact`, or `python3 -m src.pipeline --compact`):
+
+    python3 src/compact.py --dry-run
+    python3 src/compact.py --keep-last 12 --keep-daily 7
+-------------------------------------------------------------------------------
+"""
+
+import argparse
+import gzip
+import os
+import shutil
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from helper import (
+    MANIFEST_FILENAME,
+    parse_snapshot_timestamp,
+    prune_index,
+    read_manifest,
+)
+from preprocessed import WATERMARK_FILENAME, load_watermark
+from registry import REGISTRY_DIR, REGISTRY_FILENAME, load_registry, save_registry
+from runlog import record_metrics, stage_run
+from stage_cache import hash_raw_data, load_stamp, rebase_stamp
+from train import PROCESSED_DIR, TRAINING_STATE_PATH, load_training_state
+
+RAW_DIR = "data/raw"
+COMPACTED_PREFIX = "sales_compacted_"
+COMPACTED_SUFFIX = ".csv.gz"
+KEEP_SEGMENTS = 12  # Newest raw segments left uncompressed (one hour of */5 collection)
+KEEP_LAST = 12  # Newest processed snapshots and models kept
+KEEP_DAILY = 7  # Days whose newest processed snapshot and model are kept as checkpoints
+COMPRESS_LEVEL = 6
+
+
+@dataclass
+class RetentionPolicy:
+    """Which timestamped files are kept besides the protected ones."""
+
+    keep_last: int = KEEP_LAST
+    keep_daily: int = KEEP_DAILY
+
+    def select(self, stamps: list[str]) -> set[str]:
+        """Timestamps (YYYYMMDD_HHMM) to keep: the newest keep_last and the
+        newest of each of the last keep_daily days"""
+        ordered = sorted(set(stamps))
+        keep = set(ordered[-self.keep_last :]) if self.keep_last > 0 else set()
+        newest_of_day = {stamp[:8]: stamp for stamp in ordered}
+        if self.keep_daily > 0:
+            keep.update(list(newest_of_day.values())[-self.keep_daily :])
+        return keep
+
+
+def segment_timestamp(name: str) -> Optional[str]:
+    """YYYYMMDD_HHMM of a delta or compacted segment, None for the base file"""
+    if name.startswith(COMPACTED_PREFIX) and name.endswith(COMPACTED_SUFFIX):
+        return name[len(COMPACTED_PREFIX) : -len(COMPACTED_SUFFIX)]
+    return parse_snapshot_timestamp(name)
+
+
+def is_compacted(path: Path) -> bool:
+    return path.name.startswith(COMPACTED_PREFIX) and path.name.endswith(
+        COMPACTED_SUFFIX
+    )
+
+
+def plan_compaction(
+    manifest: list[tuple[Path, int]], keep_segments: int = KEEP_SEGMENTS
+) -> list[list[int]]:
+    """Group the manifest positions of the segments to merge.
+
+    Every group is a run of at least two consecutive segments of the same day
+    (a compacted segment of that day included) with at least one delta
+    segment; rewriting a single segment would not reduce the file count. The
+    newest keep_segments segments, at least one, are left alone.
+
+    Returns:
+        Lists of manifest positions, one per compacted segment to write
+    """
+    groups, current, current_day = [], [], None
+    for position, (path, _) in enumerate(
+        manifest[: len(manifest) - max(keep_segments, 1)]
+    ):
+        stamp = segment_timestamp(path.name)
+        day = stamp[:8] if stamp else None
+        if day is None or day != current_day:
+            groups.append(current)
+            current, current_day = [], day
+        if day is not None:
+            current.append(position)
+    groups.append(current)
+    return [
+        group
+        for group in groups
+        if len(group) > 1 and any(not is_compacted(manifest[i][0]) for i in group)
+    ]
+
+
+def read_lines(path: Path) -> list[str]:
+    opener = gzip.open if path.name.endswith(".gz") else open
+    with opener(path, "rt", newline="") as f:
+        return f.read().splitlines()
+
+
+def write_compacted(paths: list[Path], output_path: Path) -> tuple[int, int]:
+    """Merge segments into one gzip-compressed CSV without exact duplicate rows.
+
+    Rows are compared as lines, so the written rows are byte-identical to the
+    collected ones and keep their order.
+
+    Returns:
+        Tuple of (rows read, rows written)
+    """
+    header, rows, seen = None, [], set()
+    rows_read = 0
+    for path in paths:
+        lines = read_lines(path)
+        if not lines:
+            continue
+        if header is None:
+            header = lines[0]
+        elif lines[0] != header:
+            raise ValueError(
+                f"Header of segment {path} differs from the other segments: "
+                f"'{lines[0]}' != '{header}'. "
+                f"Segments with different columns cannot be compacted."
+            )
+        for line in lines[1:]:
+            if not line:
+                continue
+            rows_read += 1
+            if line not in seen:
+                seen.add(line)
+                rows.append(line)
+
+    tmp_path = output_path.with_name(f".{output_path.name}.tmp")
+    with gzip.open(tmp_path, "wt", compresslevel=COMPRESS_LEVEL, newline="") as f:
+        f.write("\n".join([header or "timestamp,model,sales", *rows]) + "\n")
+    os.replace(tmp_path, output_path)
+    return rows_read, len(rows)
+
+
+def get_size(path: Path) -> int:
+    if path.is_dir():
+        return sum(child.stat().st_size for child in path.rglob("*") if child.is_file())
+    return path.stat().st_size
+
+
+def remove_path(path: Path, dry_run: bool = False) -> int:
+    """Delete a file or columnar dataset directory, returns the bytes freed"""
+    size = get_size(path)
+    if not dry_run:
+        if path.is_dir():
+            shutil.rmtree(path)
+        else:
+            path.unlink()
+    return size
+
+
+def compact_raw(
+    raw_dir: str = RAW_DIR,
+    processed_dir: str = PROCESSED_DIR,
+    keep_segments: int = KEEP_SEGMENTS,
+    dry_run: bool = False,
+) -> dict:
+    """Merge the older delta segments of every day into compressed segments.
+
+    Exact duplicate rows are dropped while merging.
+
+    Args:
+        raw_dir: Directory of the append-only raw store
+        processed_dir: Directory of the processed dataset (watermark and stage stamp)
+        keep_segments: Newest segments left uncompressed
+        dry_run: Only report what would be merged
+
+    Returns:
+        Dict with segments_merged, segments_written, duplicates_removed and bytes_freed
+    """
+    raw_dir = Path(raw_dir)
+    manifest_path = raw_dir / MANIFEST_FILENAME
+    manifest = read_manifest(raw_dir)
+    summary = {
+        "segments_merged": 0,
+        "segments_written": 0,
+        "duplicates_removed": 0,
+        "bytes_freed": 0,
+    }
+    groups = plan_compaction(manifest, keep_segments)
+    if not groups:
+        print(f"  Raw store: nothing to compact ({len(manifest)} segments)")
+        return summary
+
+    if dry_run:
+        for group in groups:
+            paths = [manifest[i][0] for i in group]
+            size = sum(path.stat().st_size for path in paths)
+            print(
+                f"  Would merge {len(paths)} segments "
+                f"({paths[0].name} .. {paths[-1].name}, {size / 2**20:.2f} MB)"
+            )
+            summary["segments_merged"] += len(paths)
+            summary["segments_written"] += 1
+        return summary
+
+    stamp = load_stamp(processed_dir)
+    old_hash, _ = hash_raw_data(raw_dir, stamp.get("segments") if stamp else None)
+    manifest_stat = manifest_path.stat()
+
+    entries, merged, written = [], [], []
+    starts = {group[0]: group for group in groups}
+    position = 0
+    while position < len(manifest):
+        if position not in starts:
+            path, rows = manifest[position]
+            entries.append((path.name, rows))
+            position += 1
+            continue
+        group = starts[position]
+        paths = [manifest[i][0] for i in group]
+        output_path = (
+            raw_dir
+            / f"{COMPACTED_PREFIX}{segment_timestamp(paths[-1].name)}{COMPACTED_SUFFIX}"
+        )
+        rows_read, rows_written = write_compacted(paths, output_path)
+        print(
+            f"  Merged {len(paths)} segments ({paths[0].name} .. {paths[-1].name}) "
+            f"into {output_path.name}: {rows_written} rows, "
+            f"{rows_read - rows_written} duplicates removed"
+        )
+        entries.append((output_path.name, rows_written))
+        merged.extend(paths)
+        written.append(output_path)
+        summary["duplicates_removed"] += rows_read - rows_written
+        position = group[-1] + 1
+
+    # collect.sh appends to the manifest: never overwrite rows registered meanwhile
+    current_stat = manifest_path.stat()
+    if (current_stat.st_size, current_stat.st_mtime_ns) != (
+        manifest_stat.st_size,
+        manifest_stat.st_mtime_ns,
+    ):
+        for path in written:
+            path.unlink()
+        raise RuntimeError(
+            f"Manifest {manifest_path} changed during compaction "
+            f"(concurrent collection?). "
+            f"Compaction aborted, no segment was removed."
+        )
+
+    tmp_path = raw_dir / f".{MANIFEST_FILENAME}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write("segment,rows\n")
+        f.writelines(f"{name},{rows}\n" for name, rows in entries)
+    os.replace(tmp_path, manifest_path)
+
+    listed = {name for name, _ in entries}
+    for path in merged:
+        if path.name not in listed:
+            summary["bytes_freed"] += remove_path(path)
+    for path in written:
+        summary["bytes_freed"] -= path.stat().st_size
+    # compacted segments of an interrupted run that never made it into the manifest
+    for path in raw_dir.glob(f"{COMPACTED_PREFIX}*{COMPACTED_SUFFIX}"):
+        if path.name not in listed:
+            summary["bytes_freed"] += remove_path(path)
+    prune_index(raw_dir)
+
+    summary["segments_merged"] = len(merged)
+    summary["segments_written"] = len(written)
+    if summary["duplicates_removed"]:
+        # row offsets of the watermark no longer match the raw store
+        watermark_path = Path(processed_dir) / WATERMARK_FILENAME
+        if watermark_path.exists():
+            watermark_path.unlink()
+            print(
+                "  Duplicates removed: watermark dropped, "
+                "the next preprocessing run rebuilds the dataset"
+            )
+    else:
+        new_hash, segments = hash_raw_data(
+            raw_dir, stamp.get("segments") if stamp else None
+        )
+        if rebase_stamp(processed_dir, old_hash, new_hash, segments=segments):
+            print("  Preprocessing stage stamp moved to the compacted segments")
+    return summary
+
+
+def prune_processed(
+    processed_dir: str = PROCESSED_DIR,
+    policy: Optional[RetentionPolicy] = None,
+    dry_run: bool = False,
+) -> dict:
+    """Remove processed snapshots outside the retention policy.
+
+    Returns:
+        Dict with files_removed and bytes_freed
+    """
+    policy = policy or RetentionPolicy()
+    processed_dir = Path(processed_dir)
+    protected = set()
+    state = load_watermark(processed_dir)
+    if state:
+        protected.update(state["outputs"])
+    stamp = load_stamp(processed_dir)
+    if stamp:
+        protected.update(Path(path).name for path in stamp["outputs"])
+
+    snapshots: dict[str, list[Path]] = {}
+    for path in processed_dir.iterdir() if processed_dir.exists() else []:
+        stamp_ts = parse_snapshot_timestamp(path.name)
+        if stamp_ts is not None:
+            snapshots.setdefault(stamp_ts, []).append(path)
+
+    keep = policy.select(list(snapshots))
+    summary = {"files_removed": 0, "bytes_freed": 0}
+    for stamp_ts, paths in sorted(snapshots.items()):
+        if stamp_ts in keep or any(path.name in protected for path in paths):
+            continue
+        for path in paths:
+            summary["bytes_freed"] += remove_path(path, dry_run)
+            summary["files_removed"] += 1
+            print(f"  {'Would remove' if dry_run else 'Removed'} {path}")
+
+    if not dry_run and processed_dir.exists():
+        prune_index(processed_dir)
+    return summary
+
+
+def prune_models(
+    model_dir: str = REGISTRY_DIR,
+    policy: Optional[RetentionPolicy] = None,
+    state_path: str = TRAINING_STATE_PATH,
+    dry_run: bool = False,
+) -> dict:
+    """Remove timestamped pickles and registered boosters outside the retention policy.
+
+    'model.pkl', the champion, the version of the training state and the
+    newest version are always kept.
+
+    Returns:
+        Dict with files_removed, bytes_freed and versions_archived
+    """
+    policy = policy or RetentionPolicy()
+    model_dir = Path(model_dir)
+    summary = {"files_removed": 0, "bytes_freed": 0, "versions_archived": 0}
+
+    pickles = {}
+    for path in model_dir.glob("model_*.pkl"):
+        stamp_ts = path.stem.removeprefix("model_")
+        if len(stamp_ts) == 13 and stamp_ts[8] == "_":
+            pickles[path] = stamp_ts
+    keep = policy.select(list(pickles.values()))
+    for path, stamp_ts in sorted(pickles.items(), key=lambda item: item[1]):
+        if stamp_ts not in keep:
+            summary["bytes_freed"] += remove_path(path, dry_run)
+            summary["files_removed"] += 1
+            print(f"  {'Would remove' if dry_run else 'Removed'} {path}")
+
+    index_path = str(model_dir / REGISTRY_FILENAME)
+    registry = load_registry(index_path)
+    if not registry["versions"]:
+        return summary
+    state = load_training_state(state_path)
+    protected = {
+        registry["champion"],
+        registry["versions"][-1]["version"],
+        (state or {}).get("version"),
+    }
+    stamps = {
+        entry["version"]: datetime.fromisoformat(entry["timestamp"]).strftime(
+            "%Y%m%d_%H%M"
+        )
+        for entry in registry["versions"]
+    }
+    keep = policy.select(list(stamps.values()))
+
+    retained, archived = [], []
+    for entry in registry["versions"]:
+        if entry["version"] in protected or stamps[entry["version"]] in keep:
+            retained.append(entry)
+            continue
+        path = Path(entry["path"])
+        if path.exists():
+            summary["bytes_freed"] += remove_path(path, dry_run)
+            summary["files_removed"] += 1
+        action = "Would archive" if dry_run else "Archived"
+        print(f"  {action} version {entry['version']} ({path})")
+        archived_entry = {key: value for key, value in entry.items() if key != "path"}
+        archived.append(
+            {
+                **archived_entry,
+                "archived_at": datetime.now().isoformat(timespec="seconds"),
+            }
+        )
+
+    summary["versions_archived"] = len(archived)
+    if archived and not dry_run:
+        registry["versions"] = retained
+        registry["archived"] = registry.get("archived", []) + archived
+        save_registry(registry, index_path)
+    return summary
+
+
+def run_compaction(
+    raw_dir: str = RAW_DIR,
+    processed_dir: str = PROCESSED_DIR,
+    model_dir: str = REGISTRY_DIR,
+    policy: Optional[RetentionPolicy] = None,
+    keep_segments: int = KEEP_SEGMENTS,
+    dry_run: bool = False,
+) -> dict:
+    """Compact the raw store and apply the retention policy to processed
+    snapshots and models.
+
+    Returns:
+        Summary of all steps
+    """
+    print("Step 1: Raw segment compaction")
+    raw = compact_raw(raw_dir, processed_dir, keep_segments, dry_run)
+    print("Step 2: Processed snapshot retention")
+    processed = prune_processed(processed_dir, policy, dry_run)
+    print("Step 3: Model retention")
+    models = prune_models(model_dir, policy, dry_run=dry_run)
+
+    segments_removed = raw["segments_merged"] - raw["segments_written"]
+    bytes_freed = raw["bytes_freed"] + processed["bytes_freed"] + models["bytes_freed"]
+    summary = {
+        **raw,
+        "files_removed": segments_removed
+        + processed["files_removed"]
+        + models["files_removed"],
+        "versions_archived": models["versions_archived"],
+        "mb_freed": round(bytes_freed / 2**20, 3),
+    }
+    del summary["bytes_freed"]
+    print(
+        f"  {'Dry run: ' if dry_run else ''}{summary['files_removed']} files removed, "
+        f"{summary['duplicates_removed']} duplicate rows, "
+        f"{summary['mb_freed']:.2f} MB freed"
+    )
+    record_metrics(dry_run=dry_run, **summary)
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compact raw segments and prune old processed snapshots and models."
+    )
+    parser.add_argument(
+        "--keep-segments",
+        type=int,
+        default=KEEP_SEGMENTS,
+        help="newest raw segments left uncompressed",
+    )
+    parser.add_argument(
+        "--keep-last",
+        type=int,
+        default=KEEP_LAST,
+        help="newest processed snapshots and models kept",
+    )
+    parser.add_argument(
+        "--keep-daily",
+        type=int,
+        default=KEEP_DAILY,
+        help="days with one kept checkpoint",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="only report what would be removed"
+    )
+    parser.add_argument(
+        "--log-file",
+        default=None,
+        help="write the output to this log file instead of stdout (see src/runlog.py)",
+    )
+    args = parser.parse_args()
+
+    with stage_run("compact", "compaction", args.log_file):
+        try:
+            run_compaction(
+                policy=RetentionPolicy(args.keep_last, args.keep_daily),
+                keep_segments=args.keep_segments,
+                dry_run=args.dry_run,
+            )
+
+        except FileNotFoundError as e:
+            print(f"  ERROR: File not found - {str(e)}")
+            raise
+        except ValueError as e:
+            print(f"  ERROR: Validation error in compaction - {str(e)}")
+            raise
+        except Exception as e:
+            print(
+                f"  ERROR: Unexpected error during compaction. "
+                f"Error type: {type(e).__name__}. "
+                f"Details: {str(e)}"
+            )
+            raise
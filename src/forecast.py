@@ -0,0 +1,221 @@
+"""
+-------------------------------------------------------------------------------
+Precomputed forecast lookup table.
+
+The features of the model (model_encoded, year, month, day_of_week,
+day_of_month, hour) only change once per hour, so for a horizon of N days
+every possible query is one of (number of models) x (N x 24) inputs. After
+a champion is registered, train.py scores this whole grid with one predict
+call and stores it as
+
+- 'model/forecast_vN_<start>.npy': float32 array of shape (models, hours),
+  row i is the i-th model of the vocabulary, column j the hour start + j;
+- 'model/forecast.json': start hour (UTC), hours, row of every model,
+  champion version and the name of the .npy file.
+
+The .npy file is written under a new name and the JSON is replaced
+atomically afterwards, so readers always see a complete table. The table of
+the previous generation is only deleted by the next build, so readers that
+loaded the old JSON can still open it. Readers memory-map the array, so a
+forecast is an O(1) array read without loading a booster:
+
+    python3 src/forecast.py rtx3060 2025-05-01T10:00:00Z
+
+The horizon is counted from the build, so train.py also rebuilds the table of
+a kept champion once less than FORECAST_MARGIN_HOURS of it are left.
+-------------------------------------------------------------------------------
+"""
+
+import argparse
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from preprocessed import FEATURE_COLUMNS, temporal_features
+
+FORECAST_DIR = "model"
+FORECAST_META_PATH = f"{FORECAST_DIR}/forecast.json"
+FORECAST_DAYS = 7  # Horizon of the table
+FORECAST_MARGIN_HOURS = 24  # Rebuild when less of the horizon is left
+
+
+def build_forecast_grid(codes: dict, start: pd.Timestamp, hours: int) -> pd.DataFrame:
+    """Feature matrix of every (model, hour) of the horizon, model-major.
+
+    Args:
+        codes: Model name -> code (see vocabulary.load_vocabulary)
+        start: First hour of the horizon (UTC)
+        hours: Number of hours
+
+    Returns:
+        Dataframe with FEATURE_COLUMNS and len(codes) x hours rows
+    """
+    timestamps = pd.Series(pd.date_range(start, periods=hours, freq="h"))
+    features = {
+        name: np.tile(values, len(codes))
+        for name, values in temporal_features(timestamps).items()
+    }
+    features["model_encoded"] = np.repeat(
+        np.fromiter(codes.values(), dtype=np.int64), hours
+    )
+    return pd.DataFrame(features)[FEATURE_COLUMNS]
+
+
+def build_forecast_table(
+    model: xgb.XGBRegressor,
+    codes: dict,
+    version: int,
+    days: int = FORECAST_DAYS,
+    start: Optional[pd.Timestamp] = None,
+    meta_path: str = FORECAST_META_PATH,
+) -> dict:
+    """Score the next `days` days for all models and store the table atomically.
+
+    Args:
+        model: Champion model
+        codes: Model name -> code (see vocabulary.load_vocabulary)
+        version: Registry version of the champion
+        days: Horizon in days
+        start: First hour of the table, the current UTC hour if None
+        meta_path: Path to forecast.json (the array is stored next to it)
+
+    Returns:
+        Metadata of the new table
+    """
+    if start is None:
+        start = pd.Timestamp.now(tz="UTC").floor("h")
+    hours = days * 24
+    grid = build_forecast_grid(codes, start, hours)
+    table = model.predict(grid).astype(np.float32).reshape(len(codes), hours)
+
+    directory = Path(meta_path).parent
+    directory.mkdir(parents=True, exist_ok=True)
+    previous = load_forecast_meta(meta_path)
+    table_name = f"forecast_v{version}_{start.strftime('%Y%m%d%H')}.npy"
+    tmp_path = directory / f"{table_name}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, table)
+    os.replace(tmp_path, directory / table_name)
+
+    meta = {
+        "version": version,
+        "start": start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "hours": hours,
+        "models": {name: row for row, name in enumerate(codes)},
+        "table": table_name,
+    }
+    tmp_path = f"{meta_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, meta_path)
+
+    # readers may still hold the previous JSON, so only older tables are removed
+    keep = {table_name, previous["table"] if previous is not None else None}
+    for path in directory.glob("forecast_v*.npy"):
+        if path.name not in keep:
+            path.unlink(missing_ok=True)
+
+    print(
+        f"    Forecast table {table.shape[0]} models x {hours} hours "
+        f"from {meta['start']} ({table_name})"
+    )
+    return meta
+
+
+def load_forecast_meta(meta_path: str = FORECAST_META_PATH) -> Optional[dict]:
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        return json.load(f)
+
+
+def forecast_expires(
+    meta: Optional[dict],
+    margin_hours: int = FORECAST_MARGIN_HOURS,
+    now: Optional[pd.Timestamp] = None,
+) -> bool:
+    """Whether the table is missing or less than margin_hours of it are left.
+
+    Args:
+        meta: Metadata of the table (see load_forecast_meta)
+        margin_hours: Hours of the horizon that must be left
+        now: Current time (UTC), pd.Timestamp.now if None
+
+    Returns:
+        True if the table must be rebuilt
+    """
+    if meta is None:
+        return True
+    if now is None:
+        now = pd.Timestamp.now(tz="UTC")
+    end = pd.Timestamp(meta["start"]) + pd.Timedelta(hours=meta["hours"])
+    return now + pd.Timedelta(hours=margin_hours) >= end
+
+
+class ForecastTable:
+    """Memory-mapped forecast table.
+
+    Args:
+        meta_path: Path to forecast.json
+
+    Raises:
+        FileNotFoundError: If no table has been built yet
+    """
+
+    def __init__(self, meta_path: str = FORECAST_META_PATH):
+        self.meta = load_forecast_meta(meta_path)
+        if self.meta is None:
+            raise FileNotFoundError(
+                f"No forecast table at {meta_path}. Please run train.py first."
+            )
+        self.table = np.load(Path(meta_path).parent / self.meta["table"], mmap_mode="r")
+        # hours since epoch
+        self.start = pd.Timestamp(self.meta["start"]).value // 3_600_000_000_000
+        self.rows = self.meta["models"]
+
+    def lookup(self, model: str, timestamp: str) -> Optional[float]:
+        """Forecast of one query, None for unknown models or hours off the horizon."""
+        row = self.rows.get(model)
+        if row is None:
+            return None
+        parsed = pd.Timestamp(timestamp)
+        if parsed.tzinfo is not None:
+            parsed = parsed.tz_convert(None)
+        offset = parsed.value // 3_600_000_000_000 - self.start
+        if not 0 <= offset < self.meta["hours"]:
+            return None
+        return float(self.table[row, offset])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Look up precomputed sales forecasts.")
+    parser.add_argument("model", help="graphics card model, e.g. rtx3060")
+    parser.add_argument(
+        "timestamps", nargs="+", help="ISO timestamps within the horizon"
+    )
+    parser.add_argument("--meta", default=FORECAST_META_PATH)
+    args = parser.parse_args()
+
+    try:
+        table = ForecastTable(args.meta)
+        for timestamp in args.timestamps:
+            forecast = table.lookup(args.model, timestamp)
+            if forecast is None:
+                raise ValueError(
+                    f"No forecast for {args.model} at {timestamp}. The table covers "
+                    f"{list(table.rows)} for {table.meta['hours']} hours "
+                    f"from {table.meta['start']}."
+                )
+            print(f"{args.model},{timestamp},{forecast}")
+
+    except FileNotFoundError as e:
+        print(f"  ERROR: File not found during forecast lookup - {str(e)}")
+        raise
+    except ValueError as e:
+        print(f"  ERROR: Validation error in forecast lookup - {str(e)}")
+        raise
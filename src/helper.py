@@ -1,36 +1,53 @@
 import os
 from pathlib import Path
+from typing import Iterator, Optional
 import pandas as pd
+from columnar import COLUMNAR_SUFFIX, is_columnar, load_columnar, read_schema
 
+# manifest of the append-only raw store (see scripts/collect.sh)
+MANIFEST_FILENAME = "manifest.csv"
+# snapshot index (timestamp, rows, path) kept by all writers, newest last
+INDEX_FILENAME = "index.csv"
+
+
+def parse_snapshot_timestamp(filename: str) -> Optional[str]:
+    """Extract the YYYYMMDD_HHMM timestamp of a snapshot file name.
+
+    Args:
+        filename: File name such as sales_YYYYMMDD_HHMM.csv,
+            sales_processed_YYYYMMDD_HHMM.csv or the columnar dataset
+            sales_processed_YYYYMMDD_HHMM.cols
+
+    Returns:
+        The timestamp string, or None if the name does not match the pattern
+    """
+    # accepts format "sales_YYYYMMDD_HHmm.csv" or "sales_processed_YYYYMMDD_HHmm.csv"
+    parts = filename.split("_")
+    if (
+        len(parts) in [3, 4]
+        and parts[0] == "sales"
+        and filename.endswith((".csv", COLUMNAR_SUFFIX))
+    ):  # now also checking for these formats
+        ts_parts = "_".join(parts[-2:])
+        ts = ts_parts.replace(".csv", "").replace(COLUMNAR_SUFFIX, "")
+        if len(ts) == 13 and "_" in ts:
+            return ts
+    return None
+
+
+def scan_snapshots(dir_path: Path) -> list[tuple[str, Path]]:
+    """Scan a directory for snapshot files (slow path of the index).
 
-def find_latest_csv_file(dir_path: str) -> Path:
-    """Find the latest CSV file matching the pattern sales_YYYYMMDD_HHMM.csv.
-    
     Args:
         dir_path: Directory path to search for CSV files
-        
+
     Returns:
-        Path to the latest CSV file matching the expected pattern
-        
+        List of (timestamp, path) tuples sorted by timestamp
+
     Raises:
-        FileNotFoundError: If directory doesn't exist or no CSV files found
+        FileNotFoundError: If no CSV files found
         ValueError: If no files match the expected pattern
     """
-    dir_path = Path(dir_path)
-    
-    # Check if directory exists
-    if not dir_path.exists():
-        raise FileNotFoundError(
-            f"Directory not found: {dir_path}. "
-            f"Please ensure the directory exists before running preprocessing/training."
-        )
-    
-    if not dir_path.is_dir():
-        raise ValueError(
-            f"Path is not a directory: {dir_path}. "
-            f"Expected a directory path containing CSV files."
-        )
-    
     try:
         files = os.listdir(dir_path)
     except PermissionError as e:
@@ -38,10 +55,12 @@ def find_latest_csv_file(dir_path: str) -> Path:
             f"Permission denied accessing directory {dir_path}. "
             f"Please check directory permissions. Original error: {e}"
         )
-    
-    csv_files = [dir_path / f for f in files if f.endswith(".csv")]
+
+    csv_files = [dir_path / f for f in files if f.endswith((".csv", COLUMNAR_SUFFIX))]
     if not csv_files:
-        available_files = [f for f in files if not f.startswith('.')][:5]  # Show first 5 non-hidden files
+        available_files = [f for f in files if not f.startswith(".")][
+            :5
+        ]  # Show first 5 non-hidden files
         raise FileNotFoundError(
             f"No CSV files found in directory: {dir_path}. "
             f"Expected CSV files matching pattern 'sales_YYYYMMDD_HHMM.csv'. "
@@ -51,61 +70,308 @@ def find_latest_csv_file(dir_path: str) -> Path:
 
     ts_files = []
     for f in csv_files:
-        # accepts format "sales_YYYYMMDD_HHmm.csv" or "sales_processed_YYYYMMDD_HHmm.csv"
-        parts = f.name.split("_")
-        if (
-            len(parts) in [3, 4] and parts[0] == "sales"
-        ):  # now also checking for these formats
-            ts_parts = "_".join(parts[-2:])
-            ts = ts_parts.replace(".csv", "")
-            if len(ts) == 13 and "_" in ts:
-                ts_files.append(f)
+        ts = parse_snapshot_timestamp(f.name)
+        if ts is not None:
+            ts_files.append((ts, f))
 
     if not ts_files:
         found_csv_names = [f.name for f in csv_files[:5]]  # Show first 5 CSV files
         raise ValueError(
             f"No CSV files matching expected pattern found in {dir_path}. "
-            f"Expected pattern: 'sales_YYYYMMDD_HHMM.csv' or 'sales_processed_YYYYMMDD_HHMM.csv'. "
+            f"Expected pattern: 'sales_YYYYMMDD_HHMM.csv' or "
+            f"'sales_processed_YYYYMMDD_HHMM.csv'. "
             f"Found CSV files (sample): {found_csv_names}. "
             f"Please ensure files follow the expected naming convention."
         )
 
-    latest_ts = ""
-    latest_file = None
-    for f in ts_files:
-        ts = "_".join(f.name.split("_")[-2:])
-        ts = ts.replace(".csv", "")
-        if ts > latest_ts:
-            latest_ts = ts
-            latest_file = f
+    # on equal timestamps the columnar dataset sorts after (wins over) its CSV export
+    return sorted(ts_files, key=lambda item: (item[0], is_columnar(item[1])))
 
-    return latest_file
 
+def count_rows(file_path: Path) -> int:
+    """Count the data rows of a CSV file (or columnar dataset) without parsing it."""
+    if is_columnar(file_path):
+        return read_schema(file_path)["rows"]
+    with open(file_path, "rb") as f:
+        return max(sum(1 for _ in f) - 1, 0)
+
+
+def rebuild_index(dir_path: str) -> list[tuple[str, int, Path]]:
+    """Rebuild the snapshot index of a directory from a full scan.
+
+    The index is written to a temporary file and swapped in atomically, so
+    concurrent readers always see a complete index.
 
-def load_data(file_path: Path) -> pd.DataFrame:
-    """Load CSV data and return dataframe.
-    
     Args:
-        file_path: Path to the CSV file to load
-        
+        dir_path: Directory containing the snapshots
+
     Returns:
-        Loaded dataframe
-        
+        List of (timestamp, rows, path) entries sorted by timestamp
+    """
+    dir_path = Path(dir_path)
+    entries = [(ts, count_rows(path), path) for ts, path in scan_snapshots(dir_path)]
+
+    tmp_path = dir_path / f".{INDEX_FILENAME}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write("timestamp,rows,path\n")
+        f.writelines(f"{ts},{rows},{path.name}\n" for ts, rows, path in entries)
+    os.replace(tmp_path, dir_path / INDEX_FILENAME)
+
+    return entries
+
+
+def prune_index(dir_path: str) -> int:
+    """Drop the index entries of removed or renamed snapshots.
+
+    Only the last entry of every existing file is kept, in write order, so
+    the newest snapshot stays on the last line. Row counts are taken over
+    from the index instead of counting them again as rebuild_index does.
+
+    Args:
+        dir_path: Directory containing the snapshots
+
+    Returns:
+        Number of entries kept
+    """
+    dir_path = Path(dir_path)
+    index_path = dir_path / INDEX_FILENAME
+    if not index_path.exists():
+        return len(rebuild_index(dir_path))
+
+    index = pd.read_csv(index_path, dtype={"timestamp": str, "path": str})
+    index = index[[(dir_path / name).exists() for name in index["path"]]]
+    index = index.drop_duplicates("path", keep="last")
+
+    tmp_path = dir_path / f".{INDEX_FILENAME}.tmp"
+    index.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, index_path)
+    return len(index)
+
+
+def register_snapshot(dir_path: str, file_path: Path, rows: int) -> None:
+    """Record a newly written snapshot in the index of its directory.
+
+    Appending keeps the newest snapshot on the last line. Without an index
+    the directory is scanned once, which also picks up the new snapshot.
+
+    Args:
+        dir_path: Directory containing the snapshots
+        file_path: Path of the new snapshot
+        rows: Number of data rows in the snapshot
+    """
+    index_path = Path(dir_path) / INDEX_FILENAME
+    if not index_path.exists():
+        rebuild_index(dir_path)
+        return
+
+    ts = parse_snapshot_timestamp(file_path.name)
+    with open(index_path, "a") as f:
+        f.write(f"{ts},{rows},{file_path.name}\n")
+
+
+def read_latest_index_entry(dir_path: Path) -> Optional[tuple[str, int, Path]]:
+    """Read the last entry of the snapshot index in constant time.
+
+    Args:
+        dir_path: Directory containing the index
+
+    Returns:
+        Tuple of (timestamp, rows, path), or None without a usable index
+    """
+    index_path = dir_path / INDEX_FILENAME
+    if not index_path.exists():
+        return None
+
+    with open(index_path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(size - 4096, 0))
+        lines = f.read().splitlines()
+
+    if not lines or lines[-1].startswith(b"timestamp,"):
+        return None
+    try:
+        ts, rows, name = lines[-1].decode().split(",", 2)
+        return ts, int(rows), dir_path / name
+    except ValueError:
+        return None
+
+
+def find_snapshots_since(dir_path: str, since: str = "") -> list[tuple[str, int, Path]]:
+    """List the snapshots newer than a timestamp, for incremental consumers.
+
+    Args:
+        dir_path: Directory containing the snapshots
+        since: Exclusive lower bound in YYYYMMDD_HHMM format ("" returns all)
+
+    Returns:
+        List of (timestamp, rows, path) entries sorted by timestamp
+    """
+    dir_path = Path(dir_path)
+    index_path = dir_path / INDEX_FILENAME
+    if not index_path.exists():
+        entries = rebuild_index(dir_path)
+    else:
+        index = pd.read_csv(index_path, dtype={"timestamp": str})
+        entries = [
+            (ts, int(rows), dir_path / name)
+            for ts, rows, name in zip(index["timestamp"], index["rows"], index["path"])
+        ]
+
+    return [entry for entry in entries if entry[0] > since and entry[2].exists()]
+
+
+def find_latest_csv_file(dir_path: str) -> Path:
+    """Find the latest CSV file matching the pattern sales_YYYYMMDD_HHMM.csv.
+
+    The last entry of the snapshot index (index.csv) is used when it points
+    to an existing file. Otherwise the directory is scanned and the index is
+    rebuilt.
+
+    Args:
+        dir_path: Directory path to search for CSV files
+
+    Returns:
+        Path to the latest CSV file matching the expected pattern
+
+    Raises:
+        FileNotFoundError: If directory doesn't exist or no CSV files found
+        ValueError: If no files match the expected pattern
+    """
+    dir_path = Path(dir_path)
+
+    # Check if directory exists
+    if not dir_path.exists():
+        raise FileNotFoundError(
+            f"Directory not found: {dir_path}. "
+            f"Please ensure the directory exists before running preprocessing/training."
+        )
+
+    if not dir_path.is_dir():
+        raise ValueError(
+            f"Path is not a directory: {dir_path}. "
+            f"Expected a directory path containing CSV files."
+        )
+
+    entry = read_latest_index_entry(dir_path)
+    if entry is not None and entry[2].exists():
+        return entry[2]
+
+    print(f"  Snapshot index of {dir_path} missing or stale, rebuilding...")
+    entries = rebuild_index(dir_path)
+    return entries[-1][2]
+
+
+def read_manifest(dir_path: str) -> list[tuple[Path, int]]:
+    """Read the segment manifest of an append-only data directory.
+
+    Args:
+        dir_path: Directory containing the segments and manifest.csv
+
+    Returns:
+        List of (segment path, row count) tuples in write order, empty if the
+        directory has no manifest
+    """
+    manifest_path = Path(dir_path) / MANIFEST_FILENAME
+    if not manifest_path.exists():
+        return []
+
+    manifest = pd.read_csv(manifest_path)
+    return [
+        (Path(dir_path) / name, int(rows))
+        for name, rows in zip(manifest["segment"], manifest["rows"])
+    ]
+
+
+def append_segment(
+    dir_path: str,
+    df: pd.DataFrame,
+    segment_name: str,
+    base_name: str = "sales_data.csv",
+) -> Path:
+    """Write a delta segment and register it in the manifest.
+
+    The manifest is bootstrapped with the base file on first use and the
+    segment is registered only once fully written.
+
+    Args:
+        dir_path: Directory of the append-only store
+        df: New rows (timestamp, model, sales) of this run
+        segment_name: File name of the segment, e.g. sales_YYYYMMDD_HHMM.csv
+        base_name: Base file registered as first segment
+
+    Returns:
+        Path to the written segment
+
+    Raises:
+        FileExistsError: If the segment already exists
+    """
+    dir_path = Path(dir_path)
+    manifest_path = dir_path / MANIFEST_FILENAME
+    segment_path = dir_path / segment_name
+
+    if segment_path.exists():
+        raise FileExistsError(
+            f"Segment already exists: {segment_path}. "
+            f"Segments of the append-only store are never rewritten."
+        )
+
+    if not manifest_path.exists():
+        base_rows = len(pd.read_csv(dir_path / base_name))
+        pd.DataFrame({"segment": [base_name], "rows": [base_rows]}).to_csv(
+            manifest_path, index=False
+        )
+
+    df.to_csv(segment_path, index=False)
+    with open(manifest_path, "a") as f:
+        f.write(f"{segment_name},{len(df)}\n")
+    register_snapshot(dir_path, segment_path, len(df))
+
+    return segment_path
+
+
+def resolve_segments(file_path: Path) -> list[Path]:
+    """Resolve a file into the segments making up its logical dataset.
+
+    If the file is listed as a segment in the manifest of its directory, the
+    logical dataset is every segment up to and including it. Otherwise the
+    file is a standalone snapshot.
+
+    Args:
+        file_path: Path to a segment or standalone CSV file
+
+    Returns:
+        Ordered list of files to concatenate
+    """
+    segments = [path for path, _ in read_manifest(file_path.parent)]
+    names = [path.name for path in segments]
+    if file_path.name not in names:
+        return [file_path]
+    return segments[: names.index(file_path.name) + 1]
+
+
+def read_csv_file(file_path: Path) -> pd.DataFrame:
+    """Read a single CSV file with descriptive errors.
+
+    Args:
+        file_path: Path to the CSV file to read
+
+    Returns:
+        Loaded dataframe (may be empty)
+
     Raises:
         FileNotFoundError: If the file doesn't exist
         pd.errors.EmptyDataError: If the file is empty
         pd.errors.ParserError: If the file cannot be parsed as CSV
     """
-    print(f"  Loading: {file_path}")
-    
     if not file_path.exists():
         raise FileNotFoundError(
             f"CSV file not found: {file_path}. "
             f"Please ensure the file exists and the path is correct."
         )
-    
+
     try:
-        df = pd.read_csv(file_path)
+        return pd.read_csv(file_path)
     except pd.errors.EmptyDataError:
         raise pd.errors.EmptyDataError(
             f"CSV file is empty: {file_path}. "
@@ -122,12 +388,154 @@ def load_data(file_path: Path) -> pd.DataFrame:
             f"Unexpected error loading CSV file: {file_path}. "
             f"Original error: {type(e).__name__}: {e}"
         )
-    
+
+
+def load_data(file_path: Path) -> pd.DataFrame:
+    """Load CSV data and return dataframe.
+
+    Segments of an append-only store are expanded through the manifest, so
+    the returned dataframe is the logical full dataset up to that segment.
+    Columnar datasets (.cols directories) are opened zero-copy.
+
+    Args:
+        file_path: Path to the CSV file (or delta segment) to load
+
+    Returns:
+        Loaded dataframe
+
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+        pd.errors.EmptyDataError: If the file is empty
+        pd.errors.ParserError: If the file cannot be parsed as CSV
+    """
+    print(f"  Loading: {file_path}")
+
+    if is_columnar(file_path):
+        df = load_columnar(file_path)
+        print(
+            f"  Data Loaded (memory-mapped): {len(df)} rows, {len(df.columns)} columns"
+        )
+        return df
+
+    segments = resolve_segments(file_path)
+    if len(segments) > 1:
+        print(f"  Resolved {len(segments)} segments through {MANIFEST_FILENAME}")
+        frames = [read_csv_file(path) for path in segments]
+        # header-only segments (all API calls failed) would make columns object dtype
+        frames = [frame for frame in frames if not frame.empty] or frames[:1]
+        df = pd.concat(frames, ignore_index=True)
+    else:
+        df = read_csv_file(file_path)
+
     if df.empty:
         raise ValueError(
             f"Loaded CSV file is empty (0 rows): {file_path}. "
             f"Please ensure the file contains data before processing."
         )
-    
+
     print(f"  Data Loaded: {len(df)} rows, {len(df.columns)} columns")
     return df
+
+
+def count_logical_rows(file_path: Path) -> int:
+    """Count the rows of the logical dataset of a segment without reading it.
+
+    Args:
+        file_path: Path to a segment (or a standalone CSV file)
+
+    Returns:
+        Sum of the manifest row counts up to the segment, or the row count of
+        a standalone file
+    """
+    manifest = read_manifest(file_path.parent)
+    names = [path.name for path, _ in manifest]
+    if file_path.name not in names:
+        return count_rows(file_path)
+    return sum(rows for _, rows in manifest[: names.index(file_path.name) + 1])
+
+
+def load_data_since(file_path: Path, offset: int) -> tuple[pd.DataFrame, int]:
+    """Load only the rows of the logical dataset after a row offset.
+
+    Whole segments before the offset are skipped using the row counts of the
+    manifest, so the cost scales with the new data only.
+
+    Args:
+        file_path: Path to the latest segment (or a standalone CSV file)
+        offset: Number of leading rows already consumed
+
+    Returns:
+        Tuple of (new rows, total rows of the logical dataset)
+    """
+    print(f"  Loading rows after offset {offset}: {file_path}")
+
+    manifest = read_manifest(file_path.parent)
+    names = [path.name for path, _ in manifest]
+    if file_path.name not in names:
+        df = read_csv_file(file_path)
+        return df.iloc[offset:].reset_index(drop=True), len(df)
+
+    frames = []
+    start = 0
+    for path, rows in manifest[: names.index(file_path.name) + 1]:
+        end = start + rows
+        if end > offset and rows > 0:
+            frames.append(read_csv_file(path).iloc[max(offset - start, 0) :])
+        start = end
+
+    if frames:
+        df = pd.concat(frames, ignore_index=True)
+    else:
+        df = read_csv_file(file_path).iloc[0:0]
+
+    print(f"  Data Loaded: {len(df)} new rows of {start} total")
+    return df, start
+
+
+def iter_data_chunks(
+    file_path: Path,
+    chunksize: int,
+    offset: int = 0,
+    usecols: Optional[list[str]] = None,
+) -> Iterator[pd.DataFrame]:
+    """Stream the logical dataset after a row offset in chunks.
+
+    Memory stays bounded by the chunk size: segments are read one after the
+    other with read_csv(chunksize=...), segments before the offset are
+    skipped using the row counts of the manifest.
+
+    Args:
+        file_path: Path to the latest segment (or a standalone CSV file)
+        chunksize: Maximum number of rows per chunk
+        offset: Number of leading rows to skip
+        usecols: Columns to read (all columns if None)
+
+    Yields:
+        Dataframe chunks in row order
+    """
+    manifest = read_manifest(file_path.parent)
+    names = [path.name for path, _ in manifest]
+    if file_path.name in names:
+        segments = manifest[: names.index(file_path.name) + 1]
+    else:
+        segments = [(file_path, None)]
+
+    start = 0
+    for path, rows in segments:
+        if rows is not None and start + rows <= offset:
+            start += rows
+            continue
+        if not path.exists():
+            raise FileNotFoundError(
+                f"CSV file not found: {path}. "
+                f"Please ensure the file exists and the path is correct."
+            )
+        # skip the remaining rows of the offset, keep the header line
+        skip = max(offset - start, 0)
+        reader = pd.read_csv(
+            path, chunksize=chunksize, usecols=usecols, skiprows=range(1, skip + 1)
+        )
+        for chunk in reader:
+            if not chunk.empty:
+                yield chunk
+        start += rows if rows is not None else 0
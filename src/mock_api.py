@@ -0,0 +1,136 @@
+"""
+-------------------------------------------------------------------------------
+This script `mock_api.py` is a local stand-in for the sales API.
+
+It answers GET /<model> (e.g. /rtx3060) with a random number of sales, like
+the exam API on port 5000, and supports HTTP/1.1 keep-alive. Latency and
+failures can be injected so collectors can be benchmarked offline:
+
+    python3 src/mock_api.py --port 5001 --latency 0.2 --jitter 0.1 \
+        --error-rate 0.1 --invalid-rate 0.05 --hang-rate 0.01
+-------------------------------------------------------------------------------
+"""
+
+import argparse
+import asyncio
+import random
+from dataclasses import dataclass
+from typing import Optional
+
+from collect import GRAPHIC_CARDS_MODELS
+
+HOST = "0.0.0.0"
+PORT = 5000
+
+
+@dataclass
+class MockConfig:
+    """Behaviour of the stand-in API."""
+
+    latency: float = 0.0  # Base response delay in seconds
+    jitter: float = 0.0  # Additional uniform random delay in seconds
+    error_rate: float = 0.0  # Share of requests answered with HTTP 500
+    invalid_rate: float = 0.0  # Share of requests answered with a non-number
+    hang_rate: float = 0.0  # Share of requests that never get an answer
+    max_sales: int = 30
+    seed: Optional[int] = None
+
+
+def respond(status: int, body: str) -> bytes:
+    """Build an HTTP/1.1 keep-alive response."""
+    reason = {200: "OK", 404: "Not Found", 500: "Internal Server Error"}[status]
+    payload = body.encode()
+    return (
+        f"HTTP/1.1 {status} {reason}\r\n"
+        f"Content-Type: text/plain\r\n"
+        f"Content-Length: {len(payload)}\r\n"
+        f"Connection: keep-alive\r\n\r\n"
+    ).encode() + payload
+
+
+def make_handler(config: MockConfig):
+    """Create the connection handler for the given behaviour."""
+    rng = random.Random(config.seed)
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                # skip headers, requests have no body
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+
+                parts = request_line.decode("latin-1").split()
+                model = parts[1].strip("/") if len(parts) > 1 else ""
+
+                await asyncio.sleep(config.latency + rng.uniform(0, config.jitter))
+
+                draw = rng.random()
+                if draw < config.hang_rate:
+                    await asyncio.sleep(3600)
+                elif model not in GRAPHIC_CARDS_MODELS:
+                    writer.write(respond(404, f"Unknown model: {model}"))
+                elif draw < config.hang_rate + config.error_rate:
+                    writer.write(respond(500, "Internal Server Error"))
+                elif draw < config.hang_rate + config.error_rate + config.invalid_rate:
+                    writer.write(respond(200, "error"))
+                else:
+                    writer.write(respond(200, str(rng.randint(0, config.max_sales))))
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    return handle
+
+
+async def start_server(
+    config: MockConfig, host: str = HOST, port: int = PORT
+) -> asyncio.Server:
+    """Start the stand-in API on the running event loop.
+
+    Args:
+        config: Latency and failure injection settings
+        host: Interface to bind
+        port: Port to bind, 0 picks a free port
+
+    Returns:
+        The started asyncio server
+    """
+    return await asyncio.start_server(make_handler(config), host, port)
+
+
+async def serve_forever(config: MockConfig, host: str, port: int) -> None:
+    server = await start_server(config, host, port)
+    print(f"  Mock API listening on {host}:{port} with {config}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the sales API.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--invalid-rate", type=float, default=0.0)
+    parser.add_argument("--hang-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    config = MockConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        invalid_rate=args.invalid_rate,
+        hang_rate=args.hang_rate,
+        seed=args.seed,
+    )
+    try:
+        asyncio.run(serve_forever(config, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
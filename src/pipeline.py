@@ -0,0 +1,248 @@
+"""
+-------------------------------------------------------------------------------
+This script `pipeline.py` runs collect -> preprocess -> train in one Python
+process, as an alternative to `make bash` (collect.sh, preprocessed.sh and
+train.sh), which starts a new interpreter and imports pandas, scikit-learn
+and XGBoost again for every step.
+
+1. The steps are function calls: run_collection (src/collect.py),
+   run_preprocessing (src/preprocessed.py) and run_training (src/train.py).
+
+2. DataFrames are handed over in memory: the collected rows are preprocessed
+   without reading the new segment back, and the processed dataset is kept
+   between cycles and extended with the new rows instead of being reloaded.
+   Everything is still written to data/ and model/ as before.
+
+3. The output of every step is logged to the same files as the bash scripts
+   (logs/collect.logs, logs/preprocessed.logs, logs/train.logs) and every
+   step adds its metrics to the run history logs/runs.jsonl (src/runlog.py).
+
+4. With --daemon the process stays resident and runs a cycle every
+   --interval seconds, so the imports are paid once. Segments are named per
+   minute, so the interval is at least MIN_CYCLE_INTERVAL seconds and slots
+   missed by a slow cycle are skipped instead of run back to back.
+
+5. With --compact every cycle ends with the compaction and retention of
+   src/compact.py, logged to logs/compact.logs.
+
+    python3 -m src.pipeline
+    python3 -m src.pipeline --daemon --interval 300 --compact
+-------------------------------------------------------------------------------
+"""
+
+import argparse
+import contextlib
+import io
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import pandas as pd  # noqa: E402
+
+from collect import API_URL, DATA_DIR  # noqa: E402
+from collect import LOG_FILE as COLLECT_LOG_FILE  # noqa: E402
+from collect import run_collection  # noqa: E402
+from compact import run_compaction  # noqa: E402
+from helper import find_latest_csv_file, load_data  # noqa: E402
+from preprocessed import DEFAULT_FORMATS, run_preprocessing  # noqa: E402
+from runlog import stage_run  # noqa: E402
+from train import PROCESSED_DIR, run_training  # noqa: E402
+
+PREPROCESSED_LOG_FILE = "logs/preprocessed.logs"
+TRAIN_LOG_FILE = "logs/train.logs"
+COMPACT_LOG_FILE = "logs/compact.logs"
+CYCLE_INTERVAL = 300  # Seconds between cycles in daemon mode, like the cron schedule
+MIN_CYCLE_INTERVAL = 60  # Segments are named per minute (sales_YYYYMMDD_HHMM.csv)
+
+
+class PipelineRunner:
+    """Runs pipeline cycles in the current process.
+
+    The processed dataset is kept in memory between cycles.
+
+    Args:
+        api_url: Base URL of the sales API
+        raw_dir: Directory of the append-only raw store
+        processed_dir: Directory of the processed dataset
+        chunksize: Stream the preprocessing in chunks of this many rows
+        collect: Query the API (False: only preprocess and train what is in raw_dir)
+        compact: Compact the raw store and prune old snapshots and models after
+            every cycle
+        **train_options: Keyword arguments of train.run_training
+    """
+
+    def __init__(
+        self,
+        api_url: str = API_URL,
+        raw_dir: str = DATA_DIR,
+        processed_dir: str = PROCESSED_DIR,
+        chunksize: Optional[int] = None,
+        collect: bool = True,
+        compact: bool = False,
+        **train_options,
+    ):
+        self.api_url = api_url
+        self.raw_dir = raw_dir
+        self.processed_dir = processed_dir
+        self.chunksize = chunksize
+        self.collect = collect
+        self.compact = compact
+        self.train_options = train_options
+        self.processed: Optional[pd.DataFrame] = None
+
+    def update_processed(self, result) -> pd.DataFrame:
+        """Processed dataset after a preprocessing run, from memory where possible."""
+        if result.rows is not None and result.full:
+            self.processed = result.rows.reset_index(drop=True)
+        elif result.rows is not None and self.processed is not None:
+            if len(result.rows):
+                self.processed = pd.concat(
+                    [self.processed, result.rows], ignore_index=True
+                )
+        else:
+            # first cycle or streamed preprocessing: (re)load the memory-mapped dataset
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.processed = load_data(find_latest_csv_file(self.processed_dir))
+        return self.processed
+
+    def run_cycle(self) -> Optional[dict]:
+        """Run collect -> preprocess -> train once.
+
+        Returns:
+            Registry entry of the new model, None if the champion was kept
+        """
+        start = time.perf_counter()
+        new_rows = None
+        if self.collect:
+            print("Step 1: Data Collection")
+            with stage_run("collect", "data collection"):
+                new_rows = run_collection(
+                    api_url=self.api_url,
+                    data_dir=self.raw_dir,
+                    log_file=COLLECT_LOG_FILE,
+                )
+                print(f"  Collected {len(new_rows)} rows")
+
+        print("Step 2: Data Pre-Processing")
+        with stage_run("preprocess", "data preprocessing", PREPROCESSED_LOG_FILE):
+            result = run_preprocessing(
+                self.raw_dir,
+                self.processed_dir,
+                DEFAULT_FORMATS,
+                self.chunksize,
+                new_rows=new_rows,
+            )
+        df = self.update_processed(result)
+        print(f"  Processed dataset: {len(df)} rows")
+
+        print("Step 3: Model Training")
+        with stage_run("train", "model training", TRAIN_LOG_FILE):
+            entry = run_training(
+                df=df, processed_path=self.processed_dir, **self.train_options
+            )
+        if entry is None:
+            print("  Champion kept")
+        else:
+            rmse = entry["metrics"]["rmse"]
+            print(f"  Registered version {entry['version']} (RMSE {rmse:.4f})")
+
+        if self.compact:
+            print("Step 4: Compaction")
+            with stage_run("compact", "compaction", COMPACT_LOG_FILE):
+                run_compaction(self.raw_dir, self.processed_dir)
+        print(f"  Cycle completed in {time.perf_counter() - start:.2f}s")
+        return entry
+
+    def run_forever(
+        self, interval: float = CYCLE_INTERVAL, cycles: Optional[int] = None
+    ) -> None:
+        """Run a cycle every `interval` seconds.
+
+        A failed cycle is reported and the next one runs on schedule. Slots that
+        passed while a cycle ran are skipped.
+
+        Raises:
+            ValueError: If interval is shorter than MIN_CYCLE_INTERVAL
+        """
+        if interval < MIN_CYCLE_INTERVAL:
+            raise ValueError(
+                f"Interval of {interval}s is too short. Segments are named per "
+                f"minute, so cycles must be at least {MIN_CYCLE_INTERVAL}s apart."
+            )
+        completed = 0
+        next_start = time.monotonic()
+        while cycles is None or completed < cycles:
+            try:
+                self.run_cycle()
+            except Exception as e:
+                print(f"  ERROR: Pipeline cycle failed - {type(e).__name__}: {e}")
+                # the in-memory dataset may be stale after a partial cycle
+                self.processed = None
+            completed += 1
+            next_start += interval
+            missed = (time.monotonic() - next_start) // interval + 1
+            if missed > 0:
+                next_start += missed * interval
+            time.sleep(max(0.0, next_start - time.monotonic()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run collect -> preprocess -> train in one process."
+    )
+    parser.add_argument("--api-url", default=API_URL)
+    parser.add_argument(
+        "--skip-collect",
+        action="store_true",
+        help="only preprocess and train the raw data on disk",
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=None,
+        help="stream the preprocessing in chunks of this many rows",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="stay resident and run a cycle every --interval seconds",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=CYCLE_INTERVAL,
+        help=f"seconds between cycles, at least {MIN_CYCLE_INTERVAL}",
+    )
+    parser.add_argument(
+        "--cycles",
+        type=int,
+        default=None,
+        help="stop the daemon after this many cycles",
+    )
+    parser.add_argument("--search-jobs", type=int, default=None)
+    parser.add_argument("--fit-threads", type=int, default=None)
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="compact and prune old files after every cycle",
+    )
+    args = parser.parse_args()
+
+    runner = PipelineRunner(
+        api_url=args.api_url,
+        chunksize=args.chunksize,
+        collect=not args.skip_collect,
+        compact=args.compact,
+        search_jobs=args.search_jobs,
+        fit_threads=args.fit_threads,
+    )
+    try:
+        if args.daemon:
+            runner.run_forever(args.interval, args.cycles)
+        else:
+            runner.run_cycle()
+    except KeyboardInterrupt:
+        pass
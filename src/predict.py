@@ -0,0 +1,175 @@
+"""
+-------------------------------------------------------------------------------
+This script `predict.py` forecasts graphics card sales for batches of
+(model, timestamp) queries.
+
+1. It loads the model once: by default the champion of the model registry
+   (see src/registry.py), or a given .ubj/.pkl file.
+
+2. It reads the queries as CSV with the columns model and timestamp from a
+   file or from stdin, optionally in chunks.
+
+3. The feature matrix (model_encoded, year, month, day_of_week, day_of_month,
+   hour) of a whole batch is built in one vectorized pass with the transforms
+   of preprocessed.py and the persisted vocabulary, and scored with one
+   predict call.
+
+4. The predictions are written as CSV (model, timestamp, prediction,
+   unknown_model) to a file or stdout; queries with invalid timestamps are
+   skipped. Card models missing from the vocabulary are not scored: their
+   prediction is empty and unknown_model is True.
+
+    python3 src/predict.py queries.csv --output predictions.csv
+    cat queries.csv | python3 src/predict.py > predictions.csv
+-------------------------------------------------------------------------------
+"""
+
+import argparse
+import pickle
+import sys
+import time
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from preprocessed import build_feature_pipeline
+from registry import get_champion, load_model
+from transform import Pipeline
+from vocabulary import UNKNOWN_CODE, VOCABULARY_PATH, load_vocabulary
+
+QUERY_COLUMNS = ["model", "timestamp"]
+
+
+def load_predictor(model_path: Optional[str] = None) -> xgb.XGBRegressor:
+    """Load the model used for predictions.
+
+    Args:
+        model_path: .ubj booster or .pkl model, None for the registry champion
+
+    Returns:
+        Loaded model (registry models are cached in-process)
+
+    Raises:
+        FileNotFoundError: If there is no champion and no model path is given
+    """
+    if model_path is None:
+        entry = get_champion()
+        if entry is None:
+            raise FileNotFoundError(
+                "No champion in the model registry. Please run train.py first "
+                "or pass a model file with --model."
+            )
+        return load_model(entry)
+
+    if model_path.endswith(".pkl"):
+        with open(model_path, "rb") as f:
+            return pickle.load(f)
+    model = xgb.XGBRegressor()
+    model.load_model(model_path)
+    return model
+
+
+def validate_queries(queries: pd.DataFrame) -> None:
+    missing = set(QUERY_COLUMNS) - set(queries.columns)
+    if missing:
+        raise ValueError(
+            f"Missing query columns: {missing}. "
+            f"Available columns: {list(queries.columns)}. "
+            f"Please provide a CSV with the columns: {QUERY_COLUMNS}"
+        )
+
+
+def predict_batch(
+    model: xgb.XGBRegressor, queries: pd.DataFrame, pipeline: Pipeline
+) -> pd.DataFrame:
+    """Predict the sales of a batch of queries with one predict call.
+
+    Args:
+        model: Loaded model
+        queries: Dataframe with model and timestamp columns
+        pipeline: Feature pipeline (see preprocessed.build_feature_pipeline)
+
+    Returns:
+        Dataframe with model, timestamp, prediction and unknown_model of every
+        query with a valid timestamp; the prediction is NaN for card models
+        missing from the vocabulary
+    """
+    features = pipeline.run(queries)
+    kept = queries if pipeline.mask is None else queries[pipeline.mask]
+    unknown = features["model_encoded"].to_numpy() == UNKNOWN_CODE
+    predictions = np.full(len(features), np.nan, dtype=np.float32)
+    if not unknown.all():
+        predictions[~unknown] = model.predict(
+            features[~unknown] if unknown.any() else features
+        )
+    return pd.DataFrame(
+        {
+            "model": kept["model"].to_numpy(),
+            "timestamp": kept["timestamp"].to_numpy(),
+            "prediction": predictions,
+            "unknown_model": unknown,
+        }
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Predict graphics card sales for (model, timestamp) queries."
+    )
+    parser.add_argument(
+        "input", nargs="?", default="-", help="query CSV file, - for stdin (default)"
+    )
+    parser.add_argument(
+        "--output", default="-", help="prediction CSV file, - for stdout (default)"
+    )
+    parser.add_argument(
+        "--model", default=None, help="model file (default: registry champion)"
+    )
+    parser.add_argument("--vocabulary", default=VOCABULARY_PATH)
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=None,
+        help="process the queries in chunks of this many rows",
+    )
+    args = parser.parse_args()
+
+    try:
+        model = load_predictor(args.model)
+        pipeline = build_feature_pipeline(load_vocabulary(args.vocabulary)["codes"])
+
+        source = sys.stdin if args.input == "-" else args.input
+        output = sys.stdout if args.output == "-" else args.output
+        reader = pd.read_csv(
+            source, dtype={"model": str, "timestamp": str}, chunksize=args.chunksize
+        )
+        batches = [reader] if args.chunksize is None else reader
+
+        start = time.perf_counter()
+        rows = valid = unknown = 0
+        for queries in batches:
+            validate_queries(queries)
+            predictions = predict_batch(model, queries, pipeline)
+            predictions.to_csv(
+                output, mode="a" if rows else "w", header=not rows, index=False
+            )
+            rows += len(queries)
+            valid += len(predictions)
+            unknown += int(predictions["unknown_model"].sum())
+        elapsed = time.perf_counter() - start
+
+        print(
+            f"  Predicted {valid - unknown} of {rows} queries "
+            f"({rows - valid} invalid timestamps, {unknown} unknown models) "
+            f"in {elapsed:.3f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s)",
+            file=sys.stderr,
+        )
+
+    except FileNotFoundError as e:
+        print(f"  ERROR: File not found during prediction - {str(e)}", file=sys.stderr)
+        raise
+    except ValueError as e:
+        print(f"  ERROR: Validation error in prediction - {str(e)}", file=sys.stderr)
+        raise
@@ -3,35 +3,160 @@
 This script `preprocessed.py` retrieves data from the latest CSV file created
 in the 'data/raw/' directory.
 
-1. It applies preprocessing to the data.
+1. It applies preprocessing to the data. The steps are stages of a fused
+   pipeline (see src/transform.py): the row filters are combined into one
+   mask and the output frame is materialized once.
 
 2. The results of the preprocessing are saved in a new CSV file
    in the 'data/processed/' directory, with a name formatted as
-   'sales_processed_YYYYMMDD_HHMM.csv'.
+   'sales_processed_YYYYMMDD_HHMM.csv', and as a binary columnar dataset
+   'sales_processed_YYYYMMDD_HHMM.cols/' (see src/columnar.py) that
+   train.py memory-maps instead of parsing CSV.
 
 3. All preprocessing steps are logged in the
-   'logs/preprocessed.logs' file to ensure detailed tracking of the process.
+   'logs/preprocessed.logs' file to ensure detailed tracking of the process,
+   and rows in/out, wall time and peak memory of every run are appended to
+   the run history 'logs/runs.jsonl' (see src/runlog.py).
+
+Card models are encoded with the persistent vocabulary in
+'data/processed/vocabulary.json' (see src/vocabulary.py), so codes stay stable
+across runs. By default only the raw rows added since the last run are
+processed: a watermark ('data/processed/watermark.json') records how many raw
+rows were already consumed, and the new rows are appended to the growing processed
+dataset, which is then renamed to the current timestamp. The watermark also
+records the size of every output (CSV bytes, columnar rows), and the outputs
+are cut back to it before appending, so the rows of an interrupted run are
+never appended twice. Use `--full` to
+rebuild the processed dataset from the whole raw history. With `--chunksize N`
+the raw data is streamed in chunks of N rows, so memory stays bounded no
+matter how large the raw store grows. A run whose raw data, formats and code
+are unchanged since the last one is skipped (see src/stage_cache.py).
+
+The data quality checks compare the new rows with running sales statistics
+per card model ('data/processed/sales_stats.json', see src/sales_stats.py),
+which are saved with the watermark and only updated with the new rows.
 
 Any errors or anomalies are also logged to ensure traceability.
 -------------------------------------------------------------------------------
 """
 
+import argparse
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+import numpy as np
 import pandas as pd
 from pathlib import Path
-from sklearn.preprocessing import LabelEncoder
-from helper import find_latest_csv_file, load_data
+from columnar import (
+    COLUMNAR_SUFFIX,
+    append_columnar,
+    read_schema,
+    save_columnar,
+    truncate_columnar,
+)
+from runlog import record_metrics, stage_run
+from sales_stats import (
+    MIN_REFERENCE_ROWS,
+    SALES_STATS_FILENAME,
+    count_extremes,
+    empty_sales_stats,
+    extreme_thresholds,
+    load_sales_stats,
+    save_sales_stats,
+    update_sales_stats,
+)
+from stage_cache import (
+    changed_hashes,
+    hash_code,
+    hash_json,
+    hash_raw_data,
+    is_cache_hit,
+    load_stamp,
+    save_stamp,
+)
+from transform import Pipeline, Stage
+from vocabulary import (
+    VOCABULARY_FILENAME,
+    VOCABULARY_PATH,
+    encode_models,
+    load_vocabulary,
+    update_vocabulary,
+)
+from helper import (
+    count_logical_rows,
+    count_rows,
+    find_latest_csv_file,
+    iter_data_chunks,
+    load_data,
+    load_data_since,
+    register_snapshot,
+)
+
+# incremental state: raw rows already processed, output file and model encoding
+WATERMARK_FILENAME = "watermark.json"
+# output formats of the processed dataset; the columnar one is written last,
+# so it is the latest snapshot in the index and the one train.py loads
+PROCESSED_FORMATS = {"csv": ".csv", "columnar": COLUMNAR_SUFFIX}
+DEFAULT_FORMATS = ["csv", "columnar"]
+# modules whose code determines the processed dataset (see src/stage_cache.py)
+PREPROCESS_MODULES = [
+    "preprocessed",
+    "transform",
+    "vocabulary",
+    "helper",
+    "columnar",
+    "sales_stats",
+]
+# columns of the processed dataset, target last
+OUTPUT_COLUMNS = [
+    "model_encoded",
+    "year",
+    "month",
+    "day_of_week",
+    "day_of_month",
+    "hour",
+    "sales",
+]
+FEATURE_COLUMNS = OUTPUT_COLUMNS[:-1]
+STATS_CHUNKSIZE = 1_000_000  # Raw rows per chunk when the sales statistics are rebuilt
+# timestamp format returned by the API (see scripts/collect.sh): YYYY-MM-DDTHH:MM:SSZ
+TIMESTAMP_WIDTH = 20
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S%z"  # format pd.to_datetime infers for it
+TIMESTAMP_SEPARATORS = {
+    4: ord("-"),
+    7: ord("-"),
+    10: ord("T"),
+    13: ord(":"),
+    16: ord(":"),
+    19: ord("Z"),
+}
+TIMESTAMP_DIGITS = [
+    i for i in range(TIMESTAMP_WIDTH - 1) if i not in TIMESTAMP_SEPARATORS
+]
+DAYS_IN_MONTH = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+
+@dataclass
+class PreprocessResult:
+    """Outcome of a preprocessing run."""
+
+    output_paths: list[Path]
+    rows: Optional[pd.DataFrame]  # processed rows of this run, None when streamed
+    full: bool  # rows are the whole processed dataset instead of an extension
 
 
 def validate_required_columns(df: pd.DataFrame) -> None:
     """Validate that required columns exist in the dataframe.
-    
+
     Args:
         df: Input dataframe to validate
-        
+
     Raises:
         ValueError: If any required columns are missing
     """
-    required_columns = ['timestamp', 'model', 'sales']
+    required_columns = ["timestamp", "model", "sales"]
     missing = set(required_columns) - set(df.columns)
     if missing:
         raise ValueError(
@@ -41,174 +166,986 @@ def validate_required_columns(df: pd.DataFrame) -> None:
         )
 
 
-def check_data_quality(df: pd.DataFrame) -> None:
-    """Perform data quality checks and warn on potential issues.
-    
-    Args:
-        df: Input dataframe to check
-    """
+def report_data_quality(
+    rows: int, max_sales: Optional[float], extremes: dict, thresholds: dict
+) -> None:
+    """Print the data quality warnings of a batch of raw rows"""
     MIN_ROWS_THRESHOLD = 10  # Minimum expected rows for meaningful analysis
-    
+
     # Check input volume
-    if len(df) < MIN_ROWS_THRESHOLD:
+    if rows < MIN_ROWS_THRESHOLD:
         print(
-            f"  WARNING: Low input volume detected ({len(df)} rows). "
+            f"  WARNING: Low input volume detected ({rows} rows). "
             f"Expected at least {MIN_ROWS_THRESHOLD} rows for reliable preprocessing."
         )
-    
-    # Check for extreme sales values if sales column exists
-    if 'sales' in df.columns:
-        sales_mean = df['sales'].mean()
-        sales_std = df['sales'].std()
-        sales_max = df['sales'].max()
-        
-        # Warn if there are extreme outliers (beyond 5 standard deviations)
-        if sales_std > 0:
-            extreme_threshold = sales_mean + (5 * sales_std)
-            extreme_count = (df['sales'] > extreme_threshold).sum()
-            if extreme_count > 0:
-                print(
-                    f"  WARNING: {extreme_count} extreme sales values detected "
-                    f"(> {extreme_threshold:.2f}). This may indicate data quality issues."
-                )
-        
-        # Warn if sales values are unusually high
-        if sales_max > 1000000:  # Arbitrary threshold for "unusually high"
-            print(
-                f"  WARNING: Maximum sales value is very high ({sales_max:.2f}). "
-                f"Please verify data correctness."
-            )
 
+    # Warn if there are extreme outliers (EXTREME_SIGMAS std above their card model)
+    if extremes:
+        details = ", ".join(
+            f"{model}: {count} > {thresholds[model]:.2f}"
+            for model, count in sorted(extremes.items())
+        )
+        print(
+            f"  WARNING: {sum(extremes.values())} extreme sales values detected "
+            f"({details}). This may indicate data quality issues."
+        )
 
-def convert_timestamps(df: pd.DataFrame) -> pd.DataFrame:
-    """Convert timestamp column to datetime and remove invalid entries"""
-    print("  Converting timestamp column...")
-    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
-    invalid_count = df["timestamp"].isna().sum()
+    # Warn if sales values are unusually high
+    if (
+        max_sales is not None and max_sales > 1000000
+    ):  # Arbitrary threshold for "unusually high"
+        print(
+            f"  WARNING: Maximum sales value is very high ({max_sales:.2f}). "
+            f"Please verify data correctness."
+        )
 
-    if invalid_count > 0:
-        print(f"    Removing {invalid_count} rows with invalid timestamps")
-        df = df.dropna(subset=["timestamp"]).reset_index(drop=True)
-    else:
-        print("    No invalid timestamps found!")
-    print("  Timestamps successfully converted.")
 
-    return df
+def check_data_quality(df: pd.DataFrame, stats: Optional[dict] = None) -> None:
+    """Perform data quality checks and warn on potential issues.
 
+    Extreme sales are evaluated against the running statistics per card
+    model, which are updated with the rows of df in place.
 
-def extract_temporal_features(df: pd.DataFrame) -> pd.DataFrame:
-    """Extract hour, day_of_week, day_of_month, and month from timestamp"""
-    print("  Extracting temporal features...")
-    df["year"] = df["timestamp"].dt.year.astype(int)
-    df["hour"] = df["timestamp"].dt.hour.astype(int)
-    df["day_of_week"] = df["timestamp"].dt.dayofweek.astype(int)
-    df["day_of_month"] = df["timestamp"].dt.day.astype(int)
-    df["month"] = df["timestamp"].dt.month.astype(int)
-    return df
+    Args:
+        df: Input dataframe to check
+        stats: Running sales statistics of the rows processed before
+            (see src/sales_stats.py), None to check df on its own
+    """
+    stats = stats if stats is not None else empty_sales_stats()
+    # card models with enough history are checked against the rows processed before
+    history = extreme_thresholds(stats["models"], MIN_REFERENCE_ROWS)
+    update_sales_stats(stats, df["model"], df["sales"])
+    thresholds = {**extreme_thresholds(stats["models"]), **history}
+    extremes = count_extremes(df["model"], df["sales"], thresholds)
+    max_sales = float(df["sales"].max()) if df["sales"].count() else None
+    report_data_quality(len(df), max_sales, extremes, thresholds)
+    record_metrics(extreme_sales=sum(extremes.values()))
 
 
-def clean_sales_data(df: pd.DataFrame) -> pd.DataFrame:
-    """Remove rows with negative sales values"""
-    print("  Cleaning sales data...")
-    negative_count = (df["sales"] < 0).sum()
+def load_running_stats(
+    processed_dir: str,
+    latest_file: Path,
+    raw_rows: int,
+    chunksize: Optional[int] = None,
+) -> dict:
+    """Running sales statistics of the first raw_rows raw rows.
 
-    if negative_count > 0:
-        print(f"Removing {negative_count} rows with negative sales")
-        df = df[df["sales"] >= 0].reset_index(drop=True)
+    Statistics that do not cover exactly these rows (none yet, or a run
+    failed between saving them and the watermark) are rebuilt in one
+    streaming pass over model and sales.
+    """
+    stats = load_sales_stats(Path(processed_dir) / SALES_STATS_FILENAME)
+    if stats["raw_rows"] == raw_rows:
+        return stats
 
-    return df
+    print(
+        f"  Sales statistics cover {stats['raw_rows']} raw rows instead of "
+        f"{raw_rows}, rebuilding them..."
+    )
+    stats = empty_sales_stats()
+    remaining = raw_rows
+    for chunk in iter_data_chunks(
+        latest_file, chunksize or STATS_CHUNKSIZE, usecols=["model", "sales"]
+    ):
+        if remaining <= 0:
+            break
+        chunk = chunk.iloc[:remaining]
+        update_sales_stats(stats, chunk["model"], chunk["sales"])
+        remaining -= len(chunk)
+    stats["raw_rows"] = raw_rows
+    return stats
+
+
+def find_runs(values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Split an array into runs of equal consecutive values.
+
+    The raw data holds one timestamp per collection cycle, repeated once per
+    card model on consecutive rows, so runs deduplicate it with a single
+    vectorized comparison (much cheaper than hashing every value).
+
+    Returns:
+        Tuple of (first value of every run, run lengths)
+    """
+    if len(values) == 0:
+        return values[:0], np.zeros(0, dtype=np.int64)
+    starts = np.empty(len(values), dtype=bool)
+    starts[0] = True
+    np.not_equal(values[1:], values[:-1], out=starts[1:])
+    positions = np.flatnonzero(starts)
+    return values[positions], np.diff(np.append(positions, len(values)))
+
+
+def parse_iso_timestamps(values: np.ndarray) -> np.ndarray:
+    """Vectorized parser for the fixed-width API format YYYY-MM-DDTHH:MM:SSZ.
+
+    The strings are viewed as a byte matrix and the date parts are computed
+    with integer arithmetic, without per-element Python or strptime calls.
+
+    Args:
+        values: Object array of timestamp strings (other objects never match)
+
+    Returns:
+        datetime64[ns] array (UTC), NaT where a value does not match the format
+    """
+    result = np.full(len(values), np.datetime64("NaT"), dtype="datetime64[ns]")
+    try:
+        # one extra byte: longer strings are truncated but keep it non-zero
+        raw = values.astype(f"S{TIMESTAMP_WIDTH + 1}")
+    except UnicodeEncodeError:
+        return result
+
+    chars = raw.view(np.uint8).reshape(len(values), TIMESTAMP_WIDTH + 1)
+    digits = chars[:, TIMESTAMP_DIGITS] - np.uint8(ord("0"))  # non-digits wrap above 9
+    valid = (
+        (chars[:, TIMESTAMP_WIDTH] == 0)
+        & (
+            chars[:, list(TIMESTAMP_SEPARATORS)] == list(TIMESTAMP_SEPARATORS.values())
+        ).all(axis=1)
+        & (digits <= 9).all(axis=1)
+    )
+
+    digits = digits[valid].astype(np.int64)
+    year = digits[:, :4] @ np.array([1000, 100, 10, 1])
+    month, day, hour, minute, second = (
+        digits[:, 4:].reshape(-1, 5, 2) @ np.array([10, 1])
+    ).T
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    days_in_month = DAYS_IN_MONTH[np.clip(month, 1, 12)] + (leap & (month == 2))
+    in_range = (
+        (month >= 1)
+        & (month <= 12)
+        & (day >= 1)
+        & (day <= days_in_month)
+        & (hour < 24)
+        & (minute < 60)
+        & (second < 60)
+        & (year >= 1678)
+        & (year <= 2261)  # bounds of datetime64[ns]
+    )
+
+    # days since 1970-01-01 of a proleptic Gregorian date (civil calendar algorithm)
+    y = year - (month <= 2)
+    era = y // 400
+    year_of_era = y - era * 400
+    day_of_year = (153 * ((month + 9) % 12) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    days = era * 146097 + day_of_era - 719468
+
+    seconds = days * 86400 + hour * 3600 + minute * 60 + second
+    parsed = (seconds * 1_000_000_000).view("datetime64[ns]")
+    parsed[~in_range] = np.datetime64("NaT")
+
+    result[valid] = parsed
+    return result
+
+
+def civil_from_days(days: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Convert days since 1970-01-01 into (year, month, day) arrays.
+
+    Inverse of the civil calendar computation in parse_iso_timestamps.
+    """
+    days = days + 719468
+    era = days // 146097
+    day_of_era = days - era * 146097
+    year_of_era = (
+        day_of_era - day_of_era // 1460 + day_of_era // 36524 - day_of_era // 146096
+    ) // 365
+    day_of_year = day_of_era - (
+        365 * year_of_era + year_of_era // 4 - year_of_era // 100
+    )
+    shifted_month = (5 * day_of_year + 2) // 153
+    day = day_of_year - (153 * shifted_month + 2) // 5 + 1
+    month = np.where(shifted_month < 10, shifted_month + 3, shifted_month - 9)
+    year = year_of_era + era * 400 + (month <= 2)
+    return year, month, day
+
+
+def coerce_timestamps(values: np.ndarray) -> pd.DatetimeIndex:
+    """Coerce timestamp strings like the original convert_timestamps.
+
+    pd.to_datetime infers one format from the first value and turns every value
+    not matching it into NaT. The result is returned as UTC, keeping the wall
+    time the .dt accessors read on the original column.
+    """
+    parsed = pd.to_datetime(values, errors="coerce")
+    if not isinstance(parsed, pd.DatetimeIndex):
+        # mixed UTC offsets give an object column, convert them to UTC instead
+        return pd.to_datetime(values, errors="coerce", utc=True)
+    if parsed.tz is not None:
+        parsed = parsed.tz_localize(None)
+    return parsed.tz_localize("UTC")
+
+
+def format_source(values: np.ndarray) -> Optional[str]:
+    """Return the value pd.to_datetime infers the format from, None if there is
+    none (the inference skips missing values and empty strings)."""
+    present = pd.notna(values) & (values != "")
+    return values[present.argmax()] if present.any() else None
+
+
+def coerce_unmatched(
+    parsed: pd.arrays.DatetimeArray,
+    uniques: np.ndarray,
+    unmatched: np.ndarray,
+    source: Optional[str],
+) -> pd.arrays.DatetimeArray:
+    """Coerce the values the fast path did not match like the original call.
+
+    With the API format when it was inferred from a fast path value, otherwise
+    by coercing all distinct values (in order of appearance, so the format is
+    inferred from the same value).
+    """
+    leading = np.array([] if source is None else [source], dtype=object)
+    if source is None and unmatched.any():
+        source = format_source(uniques)
+    inferred_api = source is None or not np.isnat(
+        parse_iso_timestamps(np.array([source], dtype=object))[0]
+    )
+    if not inferred_api:
+        # another format was inferred, coerce all values like the original call
+        parsed = coerce_timestamps(np.concatenate([leading, uniques]))
+        return parsed[len(leading) :].array
+    if unmatched.any():
+        parsed = parsed.copy()
+        parsed[unmatched] = pd.to_datetime(
+            uniques[unmatched], format=TIMESTAMP_FORMAT, errors="coerce", utc=True
+        )
+    return parsed
 
 
-def encode_model_column(df: pd.DataFrame) -> pd.DataFrame:
-    """Encode model column using LabelEncoder"""
-    print("  Encoding model column...")
-    le = LabelEncoder()
-    df["model_encoded"] = le.fit_transform(df["model"]).astype(int)
+def parse_timestamps(
+    values: pd.Series, source: Optional[str] = None, per_value: bool = False
+) -> pd.Series:
+    """Parse timestamp strings, each distinct timestamp only once.
+
+    Every timestamp appears once per card model, so the distinct values are
+    parsed with the fixed-width fast path for the API format and broadcast
+    back. Values not matching it are coerced as the original pd.to_datetime
+    call did (see coerce_unmatched).
+    Unordered input (e.g. prediction queries) is deduplicated by hashing.
+
+    Args:
+        values: Timestamp strings
+        source: Value the format is inferred from when it precedes `values`
+            in the same input (earlier chunk of a stream), see format_source
+        per_value: Parse every value not in the API format on its own and convert
+            it to UTC instead of inferring one format (independent queries)
+    """
+    values_array = values.to_numpy(dtype=object)
+    uniques, run_lengths = find_runs(values_array)
+    codes = None
+    if len(uniques) > len(values_array) // 2:
+        codes, uniques = pd.factorize(values_array, use_na_sentinel=False)
+    parsed = pd.DatetimeIndex(parse_iso_timestamps(uniques)).tz_localize("UTC").array
+
+    unmatched = parsed.isna() & pd.notna(uniques)
+    if per_value:
+        if unmatched.any():
+            parsed = parsed.copy()
+            parsed[unmatched] = pd.to_datetime(
+                uniques[unmatched], format="mixed", errors="coerce", utc=True
+            )
+    else:
+        parsed = coerce_unmatched(parsed, uniques, unmatched, source)
+
+    parsed = parsed.repeat(run_lengths) if codes is None else parsed.take(codes)
+    return pd.Series(parsed, index=values.index, name=values.name)
+
+
+def temporal_features(timestamps: pd.Series) -> dict[str, np.ndarray]:
+    """Compute year, hour, day_of_week, day_of_month and month of timestamps.
+
+    The features are computed on the distinct timestamps and broadcast back.
+    """
+    if timestamps.dt.tz is not None:
+        # UTC wall time, like the .dt accessors on UTC data
+        timestamps = timestamps.dt.tz_convert(None)
+    values, run_lengths = find_runs(timestamps.array.asi8)
+    seconds = values // 1_000_000_000
+    days = seconds // 86400
+    year, month, day = civil_from_days(days)
 
-    mapping = {
-        cls: int(code) for cls, code in zip(le.classes_, le.transform(le.classes_))
+    return {
+        "year": year.repeat(run_lengths),
+        "hour": (seconds // 3600 % 24).repeat(run_lengths),
+        # 1970-01-01 was a Thursday
+        "day_of_week": ((days + 3) % 7).repeat(run_lengths),
+        "day_of_month": day.repeat(run_lengths),
+        "month": month.repeat(run_lengths),
     }
 
-    print(f"    Model encoding: {mapping}")
-    return df
 
+def timestamp_stages(stream: bool = False, per_value: bool = False) -> list[Stage]:
+    """Stages parsing the timestamp (invalid ones are filtered) and extracting
+    the temporal features.
 
-def drop_original_columns(df: pd.DataFrame) -> pd.DataFrame:
-    """Drop timestamp and model columns"""
-    print("  Dropping original timestamp and model columns...")
-    df = df.drop(columns=["timestamp", "model"])
-    return df
+    With `stream`, the runs of the pipeline are chunks of one input: every
+    chunk is parsed with the format inferred from the first value of the input,
+    like the input as a whole. With `per_value`, the rows are independent
+    queries: no format is inferred, so a malformed query never invalidates the
+    others (see parse_timestamps).
+    """
+    sources = [] if stream else None
 
+    def parse(values: pd.Series) -> pd.Series:
+        if sources is None:
+            return parse_timestamps(values, per_value=per_value)
+        parsed = parse_timestamps(values, sources[0] if sources else None)
+        if not sources:
+            source = format_source(values.to_numpy(dtype=object))
+            if source is not None:
+                sources.append(source)
+        return parsed
+
+    return [
+        Stage(
+            "convert_timestamps",
+            reads=["timestamp"],
+            writes=["timestamp"],
+            compute=lambda c: {"timestamp": parse(c["timestamp"])},
+            keep=lambda c: c["timestamp"].notna().to_numpy(),
+        ),
+        Stage(
+            "extract_temporal_features",
+            reads=["timestamp"],
+            writes=["year", "hour", "day_of_week", "day_of_month", "month"],
+            compute=lambda c: temporal_features(c["timestamp"]),
+        ),
+    ]
+
+
+def build_pipeline(vocabulary_path: str = VOCABULARY_PATH) -> Pipeline:
+    """Declare the preprocessing steps as stages of a fused pipeline.
+
+    Invalid timestamps and negative sales are row filters, combined into one
+    mask; timestamp and model are read but not part of the output, so they
+    are never copied. The runs of the pipeline are chunks of one input.
+    """
+    return Pipeline(
+        timestamp_stages(stream=True)
+        + [
+            Stage(
+                "clean_sales_data",
+                reads=["sales"],
+                keep=lambda c: (c["sales"] >= 0).to_numpy(),
+            ),
+            Stage(
+                "encode_model_column",
+                reads=["model"],
+                writes=["model_encoded"],
+                compute=lambda c: {
+                    "model_encoded": encode_models(
+                        c["model"],
+                        update_vocabulary(c["model"], vocabulary_path)["codes"],
+                    )
+                },
+            ),
+        ],
+        OUTPUT_COLUMNS,
+    )
+
+
+def build_feature_pipeline(codes: dict) -> Pipeline:
+    """Pipeline building the model features of (model, timestamp) queries.
+
+    Same transforms as build_pipeline, but the vocabulary is only read (unseen
+    models are encoded as -1), there is no target and every timestamp is parsed
+    on its own, so the result of a query does not depend on the other queries.
+    """
+    return Pipeline(
+        timestamp_stages(per_value=True)
+        + [
+            Stage(
+                "encode_model_column",
+                reads=["model"],
+                writes=["model_encoded"],
+                compute=lambda c: {"model_encoded": encode_models(c["model"], codes)},
+            ),
+        ],
+        FEATURE_COLUMNS,
+    )
 
-def reorder_columns(df: pd.DataFrame) -> pd.DataFrame:
-    """Reorder into a meaningful order, target last."""
-    print("  Reordering columns...")
-    df = df[["model_encoded", "year", "month", "day_of_week", "day_of_month", "hour", "sales"]]
-    return df
+
+def get_output_paths(
+    target_dir: str, original_path: Path, formats: list[str]
+) -> list[Path]:
+    """Build the output paths of a raw segment, one per output format"""
+    stem = original_path.name.replace("sales_", "sales_processed_").removesuffix(".csv")
+    return [Path(target_dir) / f"{stem}{PROCESSED_FORMATS[fmt]}" for fmt in formats]
 
 
 def save_processed_data(
-    target_dir: str, df: pd.DataFrame, initial_rows: int, original_path: Path
-):
-    """Save processed dataframe to CSV file"""
+    target_dir: str,
+    df: pd.DataFrame,
+    initial_rows: int,
+    original_path: Path,
+    formats: list[str] = DEFAULT_FORMATS,
+) -> list[Path]:
+    """Save processed dataframe as CSV file and/or binary columnar dataset"""
     processed_dir_path = Path(target_dir)
 
-    output_filename = original_path.name.replace("sales_", "sales_processed_")
-
-    output_path = processed_dir_path / output_filename
+    output_paths = get_output_paths(target_dir, original_path, formats)
 
-    df.to_csv(output_path, index=False)
+    for output_path in output_paths:
+        if output_path.suffix == COLUMNAR_SUFFIX:
+            save_columnar(df, output_path)
+        else:
+            df.to_csv(output_path, index=False)
+        register_snapshot(processed_dir_path, output_path, len(df))
 
     final_rows = len(df)
 
     print(f"  Final preprocessed data: {final_rows} rows, {len(df.columns)} columns")
     print(f"  Rows removed: {initial_rows - final_rows}")
-    print(f"  Preprocessed data saved to {output_path}")
+    for output_path in output_paths:
+        print(f"  Preprocessed data saved to {output_path}")
 
+    return output_paths
 
-if __name__ == "__main__":
-    raw_dir = "data/raw"
-    processed_dir = "data/processed"
 
-    try:
-        latest_file = find_latest_csv_file(raw_dir)
-        df = load_data(latest_file)
-        initial_rows = len(df)
+def rename_processed_outputs(
+    target_dir: str, previous_paths: list[Path], original_path: Path
+) -> list[Path]:
+    """Rename extended outputs to the name of the current raw segment and index them"""
+    suffix_formats = {suffix: fmt for fmt, suffix in PROCESSED_FORMATS.items()}
+    formats = [suffix_formats[path.suffix] for path in previous_paths]
+    output_paths = get_output_paths(target_dir, original_path, formats)
 
-        # Validate required columns exist before processing
-        print("  Validating input data columns...")
-        validate_required_columns(df)
-        print("  Input validation passed: all required columns present")
+    for previous_path, output_path in zip(previous_paths, output_paths):
+        os.replace(previous_path, output_path)
+        register_snapshot(Path(target_dir), output_path, count_rows(output_path))
 
-        # Perform data quality checks
-        print("  Performing data quality checks...")
-        check_data_quality(df)
+    return output_paths
 
-        df = convert_timestamps(df)
 
-        df = extract_temporal_features(df)
+def append_processed_data(
+    target_dir: str,
+    df: pd.DataFrame,
+    initial_rows: int,
+    previous_paths: list[Path],
+    original_path: Path,
+) -> list[Path]:
+    """Append new processed rows to the growing processed dataset.
 
-        df = clean_sales_data(df)
+    Every previous output is extended in place and renamed to the name of the
+    current raw segment, so the newest output always holds the full dataset.
+    """
+    write_processed_chunks([df], previous_paths, append=True)
+    output_paths = rename_processed_outputs(target_dir, previous_paths, original_path)
+    total_rows = count_rows(output_paths[-1])
+
+    print(
+        f"  Appended {len(df)} rows ({initial_rows - len(df)} removed), "
+        f"{total_rows} rows in total"
+    )
+    for output_path in output_paths:
+        print(f"  Preprocessed data saved to {output_path}")
+
+    return output_paths
 
-        df = encode_model_column(df)
 
-        df = drop_original_columns(df)
+def write_processed_chunks(
+    chunks: Iterable[pd.DataFrame], output_paths: list[Path], append: bool
+) -> int:
+    """Write processed chunks to every output as they arrive.
 
-        df = reorder_columns(df)
+    Args:
+        chunks: Processed dataframes with OUTPUT_COLUMNS
+        output_paths: CSV files and/or columnar datasets to write
+        append: Extend existing outputs instead of creating new ones
 
-        save_processed_data(processed_dir, df, initial_rows, latest_file)
+    Returns:
+        Number of rows written
+    """
+    written = 0
+    started = append
+    for chunk in chunks:
+        if chunk.empty and started:
+            continue
+        for path in output_paths:
+            if path.suffix == COLUMNAR_SUFFIX:
+                if started:
+                    append_columnar(chunk, path)
+                else:
+                    save_columnar(chunk, path)
+            else:
+                chunk.to_csv(
+                    path, mode="a" if started else "w", header=not started, index=False
+                )
+        started = True
+        written += len(chunk)
 
-    except FileNotFoundError as e:
-        print(f"  ERROR: File not found - {str(e)}")
-        raise
-    except ValueError as e:
-        print(f"  ERROR: Validation error in preprocessing - {str(e)}")
-        raise
-    except Exception as e:
+    if not started:
+        # no rows at all: still create the (empty) outputs
+        write_processed_chunks(
+            [pd.DataFrame(columns=OUTPUT_COLUMNS, dtype="int64")],
+            output_paths,
+            append=False,
+        )
+    return written
+
+
+def output_size(path: Path) -> int:
+    """Size of a processed output recorded in the watermark: bytes of a CSV file,
+    rows of a columnar dataset"""
+    if path.suffix == COLUMNAR_SUFFIX:
+        return read_schema(path)["rows"]
+    return path.stat().st_size
+
+
+def truncate_outputs(output_paths: list[Path], sizes: list[int]) -> None:
+    """Cut the outputs back to the sizes recorded in the watermark.
+
+    An interrupted incremental run may have extended them without saving the
+    watermark; these rows are appended again by the next run.
+    """
+    for path, size in zip(output_paths, sizes):
+        if output_size(path) > size:
+            print(f"  Removing rows of an interrupted run from {path.name}")
+            if path.suffix == COLUMNAR_SUFFIX:
+                truncate_columnar(path, size)
+            else:
+                os.truncate(path, size)
+
+
+def load_watermark(target_dir: str) -> Optional[dict]:
+    """Load the incremental preprocessing state, None if there is none"""
+    state_path = Path(target_dir) / WATERMARK_FILENAME
+    if not state_path.exists():
+        return None
+    with open(state_path) as f:
+        return json.load(f)
+
+
+def save_watermark(
+    target_dir: str,
+    raw_rows: int,
+    output_paths: list[Path],
+    stats: Optional[dict] = None,
+) -> None:
+    """Persist how many raw rows were processed and where they were written.
+
+    The running sales statistics of these rows are saved first, so they
+    never cover rows the watermark does not (see load_running_stats).
+    """
+    if stats is not None:
+        save_sales_stats(stats, Path(target_dir) / SALES_STATS_FILENAME)
+    state = {
+        "raw_rows": raw_rows,
+        "outputs": [path.name for path in output_paths],
+        "sizes": [output_size(path) for path in output_paths],
+        "vocabulary_version": load_vocabulary(Path(target_dir) / VOCABULARY_FILENAME)[
+            "version"
+        ],
+        "updated_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    state_path = Path(target_dir) / WATERMARK_FILENAME
+    tmp_path = state_path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, state_path)
+    print(f"  Watermark saved: {raw_rows} raw rows processed")
+
+
+def transform(
+    df: pd.DataFrame,
+    vocabulary_path: str = VOCABULARY_PATH,
+    stats: Optional[dict] = None,
+) -> pd.DataFrame:
+    """Run all preprocessing steps on raw rows (timestamp, model, sales).
+
+    The running sales statistics `stats` (see src/sales_stats.py) are updated
+    with the rows in place, None checks the rows on their own.
+    """
+    # Validate required columns exist before processing
+    print("  Validating input data columns...")
+    validate_required_columns(df)
+    print("  Input validation passed: all required columns present")
+
+    # Perform data quality checks
+    print("  Performing data quality checks...")
+    check_data_quality(df, stats)
+
+    # register all models of the input up front, like the streaming mode does
+    update_vocabulary(df["model"], vocabulary_path)
+
+    print("  Running preprocessing pipeline...")
+    pipeline = build_pipeline(vocabulary_path)
+    df = pipeline.run(df)
+    pipeline.report()
+
+    vocabulary = load_vocabulary(vocabulary_path)
+    print(f"    Model encoding (v{vocabulary['version']}): {vocabulary['codes']}")
+    return df
+
+
+def scan_raw_chunks(
+    file_path: Path, chunksize: int, offset: int, vocabulary_path: str, stats: dict
+) -> tuple[int, Optional[float], dict]:
+    """First streaming pass over model and sales only.
+
+    Adds the rows to the running sales statistics in place (needed before
+    outliers can be counted) and registers all models at once, so the
+    vocabulary codes are the same as in the in-memory mode.
+
+    Returns:
+        Tuple of (number of raw rows, maximum sales, extreme-value thresholds
+        per card model)
+    """
+    rows = 0
+    max_sales = None
+    models = set()
+    # card models with enough history are checked against the rows processed before
+    history = extreme_thresholds(stats["models"], MIN_REFERENCE_ROWS)
+    for chunk in iter_data_chunks(
+        file_path, chunksize, offset, usecols=["model", "sales"]
+    ):
+        rows += len(chunk)
+        update_sales_stats(stats, chunk["model"], chunk["sales"])
+        if chunk["sales"].count():
+            max_sales = float(
+                np.nanmax(
+                    [
+                        max_sales if max_sales is not None else np.nan,
+                        chunk["sales"].max(),
+                    ]
+                )
+            )
+        models.update(chunk["model"].unique())
+
+    update_vocabulary(sorted(models), vocabulary_path)
+    return rows, max_sales, {**extreme_thresholds(stats["models"]), **history}
+
+
+def transform_chunks(
+    chunks: Iterable[pd.DataFrame],
+    pipeline: Pipeline,
+    thresholds: dict,
+    extremes: dict,
+) -> Iterator[pd.DataFrame]:
+    """Generator running the preprocessing pipeline chunk by chunk.
+
+    One line per chunk reports rows in and out; the stage timings accumulate
+    in the pipeline. Extreme sales are counted per card model in `extremes`.
+    """
+    for i, chunk in enumerate(chunks, start=1):
+        rows_in = len(chunk)
+        for model, count in count_extremes(
+            chunk["model"], chunk["sales"], thresholds
+        ).items():
+            extremes[model] = extremes.get(model, 0) + count
+
+        chunk = pipeline.run(chunk)
+
+        print(f"    Chunk {i}: {rows_in} rows in, {len(chunk)} rows out")
+        yield chunk
+
+
+def stream_processed_data(
+    latest_file: Path,
+    offset: int,
+    processed_dir: str,
+    output_paths: list[Path],
+    append: bool,
+    chunksize: int,
+    stats: Optional[dict] = None,
+) -> tuple[int, int]:
+    """Preprocess raw rows after an offset in chunks and write them incrementally.
+
+    Peak memory is bounded by the chunk size; the output is identical to the
+    in-memory mode. The running sales statistics `stats` are updated in place.
+
+    Returns:
+        Tuple of (raw rows read, processed rows written)
+    """
+    print(f"  Streaming in chunks of {chunksize} rows...")
+    vocabulary_path = Path(processed_dir) / VOCABULARY_FILENAME
+
+    print("  Validating input data columns...")
+    validate_required_columns(pd.read_csv(latest_file, nrows=0))
+    print("  Input validation passed: all required columns present")
+
+    stats = stats if stats is not None else empty_sales_stats()
+    rows, max_sales, thresholds = scan_raw_chunks(
+        latest_file, chunksize, offset, vocabulary_path, stats
+    )
+
+    extremes = {}
+    pipeline = build_pipeline(vocabulary_path)
+    chunks = transform_chunks(
+        iter_data_chunks(latest_file, chunksize, offset), pipeline, thresholds, extremes
+    )
+    written = write_processed_chunks(chunks, output_paths, append)
+    pipeline.report()
+
+    print("  Performing data quality checks...")
+    report_data_quality(rows, max_sales, extremes, thresholds)
+    record_metrics(extreme_sales=sum(extremes.values()))
+    return rows, written
+
+
+def run_full(
+    raw_dir: str,
+    processed_dir: str,
+    formats: list[str] = DEFAULT_FORMATS,
+    chunksize: Optional[int] = None,
+) -> PreprocessResult:
+    """Preprocess the whole raw dataset and start a new watermark"""
+    print("  Mode: full rebuild")
+    latest_file = find_latest_csv_file(raw_dir)
+    stats = empty_sales_stats()
+
+    if chunksize:
+        output_paths = get_output_paths(processed_dir, latest_file, formats)
+        initial_rows, final_rows = stream_processed_data(
+            latest_file,
+            0,
+            processed_dir,
+            output_paths,
+            append=False,
+            chunksize=chunksize,
+            stats=stats,
+        )
+        for output_path in output_paths:
+            register_snapshot(Path(processed_dir), output_path, final_rows)
+            print(f"  Preprocessed data saved to {output_path}")
+        columns = len(OUTPUT_COLUMNS)
+        print(f"  Final preprocessed data: {final_rows} rows, {columns} columns")
+        print(f"  Rows removed: {initial_rows - final_rows}")
+        save_watermark(processed_dir, initial_rows, output_paths, stats)
+        record_metrics(mode="full", rows_in=initial_rows, rows_out=final_rows)
+        return PreprocessResult(output_paths, None, full=True)
+
+    df = load_data(latest_file)
+    initial_rows = len(df)
+
+    df = transform(df, Path(processed_dir) / VOCABULARY_FILENAME, stats)
+
+    output_paths = save_processed_data(
+        processed_dir, df, initial_rows, latest_file, formats
+    )
+    save_watermark(processed_dir, initial_rows, output_paths, stats)
+    record_metrics(mode="full", rows_in=initial_rows, rows_out=len(df))
+    return PreprocessResult(output_paths, df, full=True)
+
+
+def run_incremental(
+    raw_dir: str,
+    processed_dir: str,
+    formats: list[str] = DEFAULT_FORMATS,
+    chunksize: Optional[int] = None,
+    new_rows: Optional[pd.DataFrame] = None,
+) -> PreprocessResult:
+    """Preprocess only the raw rows added since the last watermark.
+
+    Falls back to a full rebuild when there is no usable state (or it was
+    written for other output formats) or the raw store shrank. Unseen models
+    get new codes from the vocabulary without renumbering existing rows.
+
+    Args:
+        raw_dir: Directory of the append-only raw store
+        processed_dir: Directory of the processed dataset
+        formats: Output formats
+        chunksize: Stream the new rows in chunks of this many rows
+        new_rows: Raw rows already in memory (e.g. just collected); used
+            instead of reading them back if they are exactly the rows
+            after the watermark
+    """
+    state = load_watermark(processed_dir)
+    previous_paths = (
+        [Path(processed_dir) / name for name in state.get("outputs", [])]
+        if state
+        else []
+    )
+    expected_suffixes = [PROCESSED_FORMATS[fmt] for fmt in formats]
+    if (
+        not previous_paths
+        or [path.suffix for path in previous_paths] != expected_suffixes
+        or not all(path.exists() for path in previous_paths)
+    ):
+        print("  No usable watermark found, falling back to full rebuild")
+        return run_full(raw_dir, processed_dir, formats, chunksize)
+
+    print(f"  Mode: incremental (watermark: {state['raw_rows']} raw rows)")
+    if "sizes" in state:
+        truncate_outputs(previous_paths, state["sizes"])
+    latest_file = find_latest_csv_file(raw_dir)
+
+    if chunksize:
+        total_rows = count_logical_rows(latest_file)
+        df = None
+    elif new_rows is not None and state["raw_rows"] + len(
+        new_rows
+    ) == count_logical_rows(latest_file):
+        print(f"  Using {len(new_rows)} new raw rows from memory")
+        df, total_rows = new_rows.reset_index(drop=True), state["raw_rows"] + len(
+            new_rows
+        )
+    else:
+        df, total_rows = load_data_since(latest_file, state["raw_rows"])
+
+    if total_rows < state["raw_rows"]:
         print(
-            f"  ERROR: Unexpected error during preprocessing. "
-            f"Operation: preprocessing sales data from {raw_dir}. "
-            f"Error type: {type(e).__name__}. "
-            f"Details: {str(e)}"
+            "  Raw dataset is smaller than the watermark, falling back to full rebuild"
+        )
+        return run_full(raw_dir, processed_dir, formats, chunksize)
+
+    if total_rows == state["raw_rows"]:
+        print("  No new raw rows since last run, nothing to do")
+        stats = load_running_stats(
+            processed_dir, latest_file, state["raw_rows"], chunksize
+        )
+        if stats["updated_at"] is None:
+            save_sales_stats(stats, Path(processed_dir) / SALES_STATS_FILENAME)
+        record_metrics(mode="incremental", rows_in=0, rows_out=0)
+        return PreprocessResult(
+            previous_paths,
+            pd.DataFrame(columns=OUTPUT_COLUMNS, dtype="int64"),
+            full=False,
+        )
+
+    stats = load_running_stats(processed_dir, latest_file, state["raw_rows"], chunksize)
+    if chunksize:
+        initial_rows, final_rows = stream_processed_data(
+            latest_file,
+            state["raw_rows"],
+            processed_dir,
+            previous_paths,
+            append=True,
+            chunksize=chunksize,
+            stats=stats,
         )
-        raise
+        output_paths = rename_processed_outputs(
+            processed_dir, previous_paths, latest_file
+        )
+        print(f"  Appended {final_rows} rows ({initial_rows - final_rows} removed)")
+        for output_path in output_paths:
+            print(f"  Preprocessed data saved to {output_path}")
+        save_watermark(processed_dir, total_rows, output_paths, stats)
+        record_metrics(mode="incremental", rows_in=initial_rows, rows_out=final_rows)
+        return PreprocessResult(output_paths, None, full=False)
+
+    initial_rows = len(df)
+    df = transform(df, Path(processed_dir) / VOCABULARY_FILENAME, stats)
+
+    output_paths = append_processed_data(
+        processed_dir, df, initial_rows, previous_paths, latest_file
+    )
+    save_watermark(processed_dir, total_rows, output_paths, stats)
+    record_metrics(mode="incremental", rows_in=initial_rows, rows_out=len(df))
+    return PreprocessResult(output_paths, df, full=False)
+
+
+def run_preprocessing(
+    raw_dir: str,
+    processed_dir: str,
+    formats: list[str] = DEFAULT_FORMATS,
+    chunksize: Optional[int] = None,
+    full: bool = False,
+    new_rows: Optional[pd.DataFrame] = None,
+) -> PreprocessResult:
+    """Run the preprocessing stage unless its inputs are unchanged.
+
+    The stage is skipped if the raw data, the output formats and the
+    preprocessing code hash to the same values as in the stamp of the last
+    run (see src/stage_cache.py). Changed code or formats rebuild the whole
+    processed dataset, new raw data is processed incrementally.
+
+    Args:
+        raw_dir: Directory of the append-only raw store
+        processed_dir: Directory of the processed dataset
+        formats: Output formats
+        chunksize: Stream the raw data in chunks of this many rows
+        full: Rebuild from the whole raw history, even on a cache hit
+        new_rows: Raw rows already in memory (see run_incremental)
+    """
+    stamp = load_stamp(processed_dir)
+    data_hash, segments = hash_raw_data(
+        raw_dir, stamp.get("segments") if stamp else None
+    )
+    hashes = {
+        "data": data_hash,
+        "config": hash_json({"formats": formats}),
+        "code": hash_code(PREPROCESS_MODULES),
+    }
+
+    # the running statistics are rebuilt from the raw store if they went missing
+    stats_exist = (Path(processed_dir) / SALES_STATS_FILENAME).exists()
+    if not full and stats_exist and is_cache_hit(stamp, hashes):
+        print(
+            "  Stage cache hit: raw data, formats and code unchanged, "
+            "skipping preprocessing"
+        )
+        record_metrics(cache_hit=True, rows_in=0, rows_out=0)
+        empty = pd.DataFrame(columns=OUTPUT_COLUMNS, dtype="int64")
+        return PreprocessResult(
+            [Path(path) for path in stamp["outputs"]], empty, full=False
+        )
+
+    changed = [name for name in changed_hashes(stamp, hashes) if name != "data"]
+    if full:
+        result = run_full(raw_dir, processed_dir, formats, chunksize)
+    elif stamp is not None and changed:
+        print(
+            f"  Stage cache: preprocessing {' and '.join(changed)} changed, rebuilding"
+        )
+        result = run_full(raw_dir, processed_dir, formats, chunksize)
+    else:
+        result = run_incremental(raw_dir, processed_dir, formats, chunksize, new_rows)
+
+    save_stamp(
+        processed_dir, "preprocess", hashes, result.output_paths, segments=segments
+    )
+    return result
+
+
+if __name__ == "__main__":
+    raw_dir = "data/raw"
+    processed_dir = "data/processed"
+
+    parser = argparse.ArgumentParser(description="Preprocess the collected sales data.")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="rebuild the processed dataset from the whole raw history",
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=None,
+        help="stream the raw data in chunks of this many rows (bounded memory)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["csv", "columnar", "both"],
+        default="both",
+        help="output format: CSV export, binary columnar dataset, or both (default)",
+    )
+    parser.add_argument(
+        "--log-file",
+        default=None,
+        help="write the output to this log file instead of stdout (see src/runlog.py)",
+    )
+    args = parser.parse_args()
+    formats = DEFAULT_FORMATS if args.format == "both" else [args.format]
+
+    with stage_run("preprocess", "data preprocessing", args.log_file):
+        try:
+            run_preprocessing(
+                raw_dir, processed_dir, formats, args.chunksize, full=args.full
+            )
+
+        except FileNotFoundError as e:
+            print(f"  ERROR: File not found - {str(e)}")
+            raise
+        except ValueError as e:
+            print(f"  ERROR: Validation error in preprocessing - {str(e)}")
+            raise
+        except Exception as e:
+            print(
+                f"  ERROR: Unexpected error during preprocessing. "
+                f"Operation: preprocessing sales data from {raw_dir}. "
+                f"Error type: {type(e).__name__}. "
+                f"Details: {str(e)}"
+            )
+            raise
@@ -0,0 +1,147 @@
+"""
+-------------------------------------------------------------------------------
+Model registry.
+
+Every trained model is stored as an XGBoost booster in the native binary JSON
+format ('model/booster_vN_YYYYMMDD_HHMM.ubj'), which loads much faster than
+a pickle and stays readable across library versions. A single index
+'model/registry.json' lists all versions with timestamp, data fingerprint,
+best parameters and the RMSE/MAE/R² from evaluate_model, and points to the
+champion, so finding the best or latest model never loads a booster.
+
+Boosters are loaded lazily on first use and kept in an in-process cache.
+-------------------------------------------------------------------------------
+"""
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import xgboost as xgb
+
+REGISTRY_DIR = "model"
+REGISTRY_FILENAME = "registry.json"
+REGISTRY_PATH = f"{REGISTRY_DIR}/{REGISTRY_FILENAME}"
+
+# in-process cache of loaded models: path -> (mtime, model)
+_loaded_models: dict[str, tuple[float, xgb.XGBRegressor]] = {}
+
+
+def load_registry(index_path: str = REGISTRY_PATH) -> dict:
+    """Load the registry index, an empty one if none exists.
+
+    Returns:
+        Dict with keys champion (version or None) and versions (oldest first)
+    """
+    if not os.path.exists(index_path):
+        return {"champion": None, "versions": []}
+    with open(index_path) as f:
+        return json.load(f)
+
+
+def save_registry(registry: dict, index_path: str = REGISTRY_PATH) -> None:
+    """Write the registry index atomically."""
+    Path(index_path).parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = f"{index_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(registry, f, indent=2)
+    os.replace(tmp_path, index_path)
+
+
+def register_model(
+    model: xgb.XGBRegressor,
+    metrics: dict,
+    params: dict,
+    fingerprint: dict,
+    promote: bool = True,
+    index_path: str = REGISTRY_PATH,
+    **info,
+) -> dict:
+    """Store a model as a native booster and add it to the index.
+
+    Args:
+        model: Trained model
+        metrics: rmse, mae and r2 of the model
+        params: Hyperparameters of the model
+        fingerprint: Fingerprint of the training data
+            (see search_cache.fingerprint_data)
+        promote: Make the new version the champion
+        index_path: Path to registry.json
+        **info: Additional metadata stored with the version (e.g. trained_rows)
+
+    Returns:
+        The index entry of the new version
+    """
+    registry = load_registry(index_path)
+    version = registry["versions"][-1]["version"] + 1 if registry["versions"] else 1
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M")
+    path = Path(index_path).parent / f"booster_v{version}_{timestamp}.ubj"
+    model.save_model(path)
+
+    entry = {
+        "version": version,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "path": str(path),
+        "fingerprint": fingerprint,
+        "params": params,
+        "metrics": {name: float(value) for name, value in metrics.items()},
+        **info,
+    }
+    registry["versions"].append(entry)
+    if promote:
+        registry["champion"] = version
+    save_registry(registry, index_path)
+    print(
+        f"    Model registered as version {version} ({path})"
+        + (", champion" if promote else "")
+    )
+    return entry
+
+
+def get_version(version: int, index_path: str = REGISTRY_PATH) -> Optional[dict]:
+    """Index entry of a version, None if it is not registered."""
+    for entry in load_registry(index_path)["versions"]:
+        if entry["version"] == version:
+            return entry
+    return None
+
+
+def get_champion(index_path: str = REGISTRY_PATH) -> Optional[dict]:
+    """Index entry of the champion, None if there is none."""
+    registry = load_registry(index_path)
+    if registry["champion"] is None:
+        return None
+    return get_version(registry["champion"], index_path)
+
+
+def get_best(metric: str = "rmse", index_path: str = REGISTRY_PATH) -> Optional[dict]:
+    """Index entry with the lowest value of a metric (highest for r2)."""
+    versions = load_registry(index_path)["versions"]
+    if not versions:
+        return None
+    if metric == "r2":
+        return max(versions, key=lambda entry: entry["metrics"][metric])
+    return min(versions, key=lambda entry: entry["metrics"][metric])
+
+
+def load_model(entry: dict) -> xgb.XGBRegressor:
+    """Load the model of an index entry, from the in-process cache if possible.
+
+    Args:
+        entry: Index entry (e.g. from get_champion)
+
+    Returns:
+        XGBRegressor with the stored booster
+    """
+    path = entry["path"]
+    mtime = os.path.getmtime(path)
+    cached = _loaded_models.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    model = xgb.XGBRegressor()
+    model.load_model(path)
+    _loaded_models[path] = (mtime, model)
+    return model
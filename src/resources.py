@@ -0,0 +1,118 @@
+"""
+-------------------------------------------------------------------------------
+Resource-aware parallelism for training.
+
+GridSearchCV(n_jobs=-1) around an XGBRegressor with its default thread pool
+starts one thread per core in every one of one process per core, which
+oversubscribes a shared machine. Instead, the usable cores are detected once
+(CPU affinity and cgroup v1/v2 CPU quotas) and split between
+
+- search_jobs: hyperparameter fits running at the same time;
+- fit_threads: XGBoost threads (n_jobs/nthread) of every fit;
+
+so that search_jobs x fit_threads never exceeds the cores. Small datasets
+favour many concurrent single-threaded fits, large ones fewer fits with more
+threads each. Fits use the histogram tree method, whose memory is bounded by
+max_bin instead of the number of distinct values.
+
+Every decision can be overridden (see train.py --search-jobs/--fit-threads).
+-------------------------------------------------------------------------------
+"""
+
+import math
+import os
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Optional
+
+TREE_METHOD = "hist"
+MAX_BIN = 256  # Histogram bins per feature (XGBoost default)
+ROWS_PER_THREAD = 50_000  # Rows per fit before another XGBoost thread pays off
+
+CGROUP_V2_CPU_MAX = Path("/sys/fs/cgroup/cpu.max")
+CGROUP_V1_QUOTA = Path("/sys/fs/cgroup/cpu/cpu.cfs_quota_us")
+CGROUP_V1_PERIOD = Path("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+
+
+@dataclass
+class ParallelPlan:
+    """How the cores are split for a training run."""
+
+    cores: int
+    search_jobs: int
+    fit_threads: int
+    tree_method: str = TREE_METHOD
+    max_bin: int = MAX_BIN
+
+    def xgb_params(self) -> dict:
+        """Parameters for every XGBRegressor of the run"""
+        return {
+            "n_jobs": self.fit_threads,
+            "tree_method": self.tree_method,
+            "max_bin": self.max_bin,
+        }
+
+
+def read_cgroup_quota() -> Optional[float]:
+    """CPU quota of the cgroup in cores, None if unlimited or unknown"""
+    try:
+        if CGROUP_V2_CPU_MAX.exists():
+            quota, period = CGROUP_V2_CPU_MAX.read_text().split()[:2]
+            if quota == "max":
+                return None
+            return int(quota) / int(period)
+        if CGROUP_V1_QUOTA.exists() and CGROUP_V1_PERIOD.exists():
+            quota = int(CGROUP_V1_QUOTA.read_text())
+            if quota <= 0:
+                return None
+            return quota / int(CGROUP_V1_PERIOD.read_text())
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def available_cores() -> int:
+    """Number of cores this process may use (affinity and cgroup quota)"""
+    if hasattr(os, "sched_getaffinity"):
+        cores = len(os.sched_getaffinity(0))
+    else:
+        cores = os.cpu_count() or 1
+
+    quota = read_cgroup_quota()
+    if quota is not None:
+        cores = min(cores, max(1, math.floor(quota)))
+    return max(1, cores)
+
+
+def plan_parallelism(
+    tasks: int,
+    rows: int,
+    cores: Optional[int] = None,
+    search_jobs: Optional[int] = None,
+    fit_threads: Optional[int] = None,
+) -> ParallelPlan:
+    """Split the cores between concurrent fits and threads per fit.
+
+    Args:
+        tasks: Number of independent fits of the search
+        rows: Training rows per fit
+        cores: Usable cores, detected if None
+        search_jobs: Fixed number of concurrent fits, derived if None
+        fit_threads: Fixed XGBoost threads per fit, derived if None
+
+    Returns:
+        ParallelPlan with search_jobs x fit_threads <= cores (unless both are fixed)
+    """
+    cores = cores or available_cores()
+    if fit_threads is None:
+        if search_jobs is not None:
+            fit_threads = max(1, cores // search_jobs)
+        else:
+            fit_threads = min(cores, max(1, rows // ROWS_PER_THREAD))
+    if search_jobs is None:
+        search_jobs = max(1, min(tasks, cores // fit_threads))
+    return ParallelPlan(cores=cores, search_jobs=search_jobs, fit_threads=fit_threads)
+
+
+def describe_plan(plan: ParallelPlan) -> str:
+    return ", ".join(f"{name}={value}" for name, value in asdict(plan).items())
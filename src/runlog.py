@@ -0,0 +1,239 @@
+"""
+-------------------------------------------------------------------------------
+Buffered, structured logging of pipeline stages.
+
+A stage runs inside `stage_run(stage, title, log_file)`. Its printed output is
+captured line by line into one buffer and written in blocks, so a verbose
+grid search no longer costs a `date` fork and a file reopen per line as in
+the `while read line` loop of the bash scripts:
+
+- the human-readable log ('logs/preprocessed.logs', 'logs/train.logs'), in the
+  '[YYYY-mm-dd HH:MM:SS] message' format of the bash scripts;
+- the event log 'logs/events.jsonl', one JSON object per line with time,
+  run id, stage, level (from the ERROR/WARNING prefixes) and message.
+
+Metrics reported by the stage with `record_metrics` (rows in and out, search
+fits...) are written at the end of every run, together with wall time,
+rows per second, fits per second and memory, as one line of the run
+history 'logs/runs.jsonl', to be trended and alerted on. The operating system
+only reports the peak RSS of the whole process, so an entry has the process
+peak ('process_peak_rss_mb') and how much the stage raised it
+('peak_rss_increase_mb'); in a resident process (src/pipeline.py) a stage
+below an earlier peak reports an increase of 0.
+-------------------------------------------------------------------------------
+"""
+
+import contextlib
+import io
+import json
+import sys
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Optional, TextIO
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+EVENTS_PATH = "logs/events.jsonl"
+RUN_HISTORY_PATH = "logs/runs.jsonl"
+FLUSH_LINES = 1000  # Buffered lines before they are written
+
+# run of the stage currently executing in this process
+_current: Optional["StageRun"] = None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB, None if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def get_level(message: str) -> str:
+    text = message.lstrip()
+    for level in ("ERROR", "WARNING"):
+        if text.startswith(level):
+            return level
+    return "INFO"
+
+
+class StageRun(io.TextIOBase):
+    """Captured output and metrics of one stage run (a file-like stdout replacement).
+
+    Args:
+        stage: Name of the stage, e.g. "preprocess"
+        log_file: Human-readable log file, None to echo the lines to `echo`
+        events_path: JSONL event log
+        echo: Stream the lines are echoed to without a log file
+    """
+
+    def __init__(
+        self,
+        stage: str,
+        log_file: Optional[str] = None,
+        events_path: str = EVENTS_PATH,
+        echo: Optional[TextIO] = None,
+    ):
+        self.stage = stage
+        self.run_id = uuid.uuid4().hex[:12]
+        self.log_file = log_file
+        self.events_path = events_path
+        self.echo = echo
+        self.metrics: dict = {}
+        self._partial = ""
+        self._lines: list[tuple[float, str]] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        lines = (self._partial + text).split("\n")
+        self._partial = lines.pop()
+        now = time.time()
+        self._lines.extend((now, line) for line in lines)
+        if self.echo is not None:
+            self.echo.write(text)
+        if len(self._lines) >= FLUSH_LINES:
+            self.flush()
+        return len(text)
+
+    def log(self, message: str) -> None:
+        self._lines.append((time.time(), message))
+
+    def flush(self) -> None:
+        if not self._lines:
+            return
+        human, events = [], []
+        stamp_second, stamp = None, ""
+        for created, line in self._lines:
+            second = int(created)
+            if second != stamp_second:
+                stamp_second = second
+                stamp = datetime.fromtimestamp(second).strftime("%Y-%m-%d %H:%M:%S")
+            human.append(f"[{stamp}] {line}\n")
+            events.append(
+                json.dumps(
+                    {
+                        "time": f"{stamp}.{int(created % 1 * 1000):03d}",
+                        "run_id": self.run_id,
+                        "stage": self.stage,
+                        "level": get_level(line),
+                        "message": line,
+                    }
+                )
+                + "\n"
+            )
+        self._lines = []
+
+        if self.log_file is not None:
+            Path(self.log_file).parent.mkdir(parents=True, exist_ok=True)
+            with open(self.log_file, "a") as f:
+                f.writelines(human)
+        Path(self.events_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(self.events_path, "a") as f:
+            f.writelines(events)
+
+    def close_lines(self) -> None:
+        if self._partial:
+            self.log(self._partial)
+            self._partial = ""
+        self.flush()
+
+
+def record_metrics(**metrics) -> None:
+    """Add metrics to the run history entry of the current stage run.
+
+    A no-op outside a run.
+    """
+    if _current is not None:
+        _current.metrics.update(metrics)
+
+
+def write_run_history(entry: dict, history_path: str = RUN_HISTORY_PATH) -> None:
+    Path(history_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(history_path, "a") as f:
+        f.write(json.dumps(entry, default=float) + "\n")
+
+
+@contextlib.contextmanager
+def stage_run(
+    stage: str,
+    title: str,
+    log_file: Optional[str] = None,
+    history_path: str = RUN_HISTORY_PATH,
+    events_path: str = EVENTS_PATH,
+) -> Iterator[StageRun]:
+    """Run a stage with buffered logging and a run history entry.
+
+    Args:
+        stage: Name of the stage in the event log and run history
+        title: Human-readable name for the log, e.g. "data preprocessing"
+        log_file: Human-readable log file, None to keep printing to stdout
+        history_path: JSONL run history
+        events_path: JSONL event log
+
+    Yields:
+        The StageRun, whose metrics can be extended with record_metrics
+    """
+    global _current
+    run = StageRun(stage, log_file, events_path, echo=None if log_file else sys.stdout)
+    previous, _current = _current, run
+    started_at = datetime.now().isoformat(timespec="seconds")
+    start = time.perf_counter()
+    start_peak = peak_rss_mb()
+    status = "success"
+
+    run.log("================================")
+    run.log(f"=== Starting {title} ===")
+    run.log("================================")
+    try:
+        with contextlib.redirect_stdout(run):
+            yield run
+    except BaseException as e:
+        status = "failed"
+        run.close_lines()
+        run.log(f"  ERROR  : {title.capitalize()} failed! {type(e).__name__}: {e}")
+        raise
+    finally:
+        _current = previous
+        wall = time.perf_counter() - start
+        run.close_lines()
+        if status == "success":
+            run.log(f"  SUCCESS: {title.capitalize()} completed!")
+        outcome = "completed" if status == "success" else "failed"
+        run.log(f"=== {title.capitalize()} {outcome} in {wall:.3f}s ===")
+        run.log("")
+        run.flush()
+
+        metrics = dict(run.metrics)
+        if metrics.get("rows_in"):
+            metrics["rows_per_second"] = round(metrics["rows_in"] / max(wall, 1e-9), 1)
+        if metrics.get("fits") and metrics.get("search_seconds"):
+            metrics["fits_per_second"] = round(
+                metrics["fits"] / max(metrics["search_seconds"], 1e-9), 3
+            )
+        # the process peak is only known as a whole, see the module docstring
+        process_peak = peak_rss_mb()
+        write_run_history(
+            {
+                "run_id": run.run_id,
+                "stage": stage,
+                "started_at": started_at,
+                "status": status,
+                "wall_seconds": round(wall, 4),
+                "process_peak_rss_mb": process_peak,
+                "peak_rss_increase_mb": (
+                    None
+                    if process_peak is None
+                    else round(process_peak - start_peak, 1)
+                ),
+                **metrics,
+            },
+            history_path,
+        )
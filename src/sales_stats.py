@@ -0,0 +1,380 @@
+"""
+-------------------------------------------------------------------------------
+Persisted running statistics of the sales per card model.
+
+'data/processed/sales_stats.json' holds for every card model the count, mean
+and sum of squared deviations (Welford, merged batch-wise with the parallel
+update of Chan et al.), min, max, the number of negative sales and a quantile
+sketch: a histogram over logarithmic buckets with a relative accuracy of
+SKETCH_ACCURACY, which merges and subtracts exactly. The statistics cover
+the first `raw_rows` raw rows, the same rows as the preprocessing watermark,
+and every run only adds its new rows, so the data quality checks cost
+O(new rows) instead of a pass over the full history.
+
+The training state keeps a copy of the statistics of the last full retrain.
+The statistics of the rows added since then are the difference of both, and
+compute_drift compares their distribution per card model with the one the
+champion was trained on (population stability index over quantile bins and
+the shift of the mean in standard deviations).
+
+    python3 src/sales_stats.py    # statistics and drift since the last full retrain
+-------------------------------------------------------------------------------
+"""
+
+import argparse
+import json
+import math
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+SALES_STATS_FILENAME = "sales_stats.json"
+SALES_STATS_PATH = f"data/processed/{SALES_STATS_FILENAME}"
+SKETCH_ACCURACY = 0.02  # Relative accuracy of the quantile sketch
+EXTREME_SIGMAS = 5  # Sales above mean + 5 std of their card model are extreme
+MIN_REFERENCE_ROWS = 30  # History rows of a card model before it is checked alone
+DRIFT_MIN_ROWS = 100  # New rows of a card model before its drift is assessed
+DRIFT_PSI = 0.25  # Population stability index above which a card model has drifted
+DRIFT_MEAN_SHIFT = 0.5  # Mean shift (in baseline std) above which a model drifted
+PSI_BINS = 10  # Quantile bins of the baseline for the population stability index
+
+_LOG_GAMMA = math.log((1 + SKETCH_ACCURACY) / (1 - SKETCH_ACCURACY))
+
+
+def empty_sales_stats() -> dict:
+    return {"raw_rows": 0, "models": {}, "updated_at": None}
+
+
+def load_sales_stats(path: str = SALES_STATS_PATH) -> dict:
+    """Load the running statistics, empty ones covering 0 raw rows if none exist."""
+    path = Path(path)
+    if not path.exists():
+        return empty_sales_stats()
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_sales_stats(stats: dict, path: str = SALES_STATS_PATH) -> None:
+    """Write the running statistics atomically."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    stats["updated_at"] = datetime.now().isoformat(timespec="seconds")
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(stats, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def summarize_batch(models: pd.Series, sales: pd.Series) -> dict:
+    """Statistics of one batch of raw rows per card model.
+
+    Rows without a model or with non-numeric sales are ignored, negative
+    sales are only counted.
+
+    Returns:
+        Dict model -> count, mean, m2, min, max, negative, zeros and buckets
+    """
+    frame = pd.DataFrame(
+        {
+            "model": models.to_numpy(),
+            "sales": pd.to_numeric(sales, errors="coerce").to_numpy(dtype=np.float64),
+        }
+    ).dropna()
+    negative = frame.loc[frame["sales"] < 0, "model"].value_counts()
+    valid = frame[frame["sales"] >= 0]
+    grouped = valid.groupby("model")["sales"]
+    summary = grouped.agg(["count", "mean", "min", "max"])
+    summary["m2"] = (
+        (valid["sales"] - valid["model"].map(summary["mean"]))
+        .pow(2)
+        .groupby(valid["model"])
+        .sum()
+    )
+    zeros = valid.loc[valid["sales"] == 0, "model"].value_counts()
+
+    positive = valid[valid["sales"] > 0]
+    bucket_index = np.ceil(np.log(positive["sales"].to_numpy()) / _LOG_GAMMA).astype(
+        np.int64
+    )
+    buckets: dict = {}
+    for (model, bucket), count in (
+        pd.Series(bucket_index)
+        .groupby(positive["model"].to_numpy())
+        .value_counts()
+        .items()
+    ):
+        buckets.setdefault(model, {})[str(bucket)] = int(count)
+
+    batch = {}
+    for model in sorted(set(summary.index) | set(negative.index)):
+        if model in summary.index:
+            row = summary.loc[model]
+            stats = {
+                "count": int(row["count"]),
+                "mean": float(row["mean"]),
+                "m2": float(row["m2"]),
+                "min": float(row["min"]),
+                "max": float(row["max"]),
+            }
+        else:
+            stats = {"count": 0, "mean": 0.0, "m2": 0.0, "min": None, "max": None}
+        stats["negative"] = int(negative.get(model, 0))
+        stats["zeros"] = int(zeros.get(model, 0))
+        stats["buckets"] = buckets.get(model, {})
+        batch[str(model)] = stats
+    return batch
+
+
+def merge_model_stats(a: Optional[dict], b: dict) -> dict:
+    """Combine the statistics of two disjoint sets of rows of one card model."""
+    if not a:
+        return {**b, "buckets": dict(b["buckets"])}
+    count = a["count"] + b["count"]
+    delta = b["mean"] - a["mean"]
+    buckets = dict(a["buckets"])
+    for bucket, n in b["buckets"].items():
+        buckets[bucket] = buckets.get(bucket, 0) + n
+    return {
+        "count": count,
+        "mean": a["mean"] + delta * b["count"] / count if count else 0.0,
+        "m2": (
+            a["m2"] + b["m2"] + delta**2 * a["count"] * b["count"] / count
+            if count
+            else 0.0
+        ),
+        "min": min((v for v in (a["min"], b["min"]) if v is not None), default=None),
+        "max": max((v for v in (a["max"], b["max"]) if v is not None), default=None),
+        "negative": a["negative"] + b["negative"],
+        "zeros": a["zeros"] + b["zeros"],
+        "buckets": buckets,
+    }
+
+
+def update_sales_stats(stats: dict, models: pd.Series, sales: pd.Series) -> dict:
+    """Add a batch of raw rows to the running statistics in place.
+
+    Returns:
+        The updated statistics
+    """
+    for model, batch in summarize_batch(models, sales).items():
+        stats["models"][model] = merge_model_stats(stats["models"].get(model), batch)
+    stats["raw_rows"] += len(models)
+    return stats
+
+
+def get_std(stats: dict) -> float:
+    return math.sqrt(stats["m2"] / (stats["count"] - 1)) if stats["count"] > 1 else 0.0
+
+
+def extreme_thresholds(models: dict, min_rows: int = 2) -> dict:
+    """Sales threshold above which a value is extreme.
+
+    Only card models with at least min_rows rows and std > 0 get one.
+    """
+    thresholds = {}
+    for model, stats in models.items():
+        std = get_std(stats)
+        if stats["count"] >= min_rows and std > 0:
+            thresholds[model] = stats["mean"] + EXTREME_SIGMAS * std
+    return thresholds
+
+
+def count_extremes(models: pd.Series, sales: pd.Series, thresholds: dict) -> dict:
+    """Number of extreme sales per card model"""
+    limits = models.map(thresholds).to_numpy(dtype=np.float64)
+    extreme = pd.to_numeric(sales, errors="coerce").to_numpy(dtype=np.float64) > limits
+    if not extreme.any():
+        return {}
+    return {
+        str(model): int(count)
+        for model, count in models[extreme].value_counts().items()
+    }
+
+
+def sketch_counts(stats: dict) -> dict:
+    """Mass of the sketch per ordered bucket key (zeros first)"""
+    counts = {-math.inf: stats["zeros"]} if stats["zeros"] else {}
+    counts.update((int(bucket), n) for bucket, n in stats["buckets"].items() if n > 0)
+    return counts
+
+
+def get_quantile(stats: dict, q: float) -> Optional[float]:
+    """Quantile estimate from the sketch (relative error below SKETCH_ACCURACY)"""
+    counts = sketch_counts(stats)
+    total = sum(counts.values())
+    if total == 0:
+        return None
+    rank = q * (total - 1)
+    cumulative = 0
+    for bucket in sorted(counts):
+        cumulative += counts[bucket]
+        if cumulative > rank:
+            if bucket == -math.inf:
+                return 0.0
+            return 2 * math.exp(bucket * _LOG_GAMMA) / (1 + math.exp(_LOG_GAMMA))
+    return stats["max"]
+
+
+def subtract_model_stats(total: dict, base: dict) -> dict:
+    """Statistics of the rows of `total` that are not in `base`.
+
+    Min and max cannot be recovered and are left out.
+    """
+    count = total["count"] - base["count"]
+    if count <= 0:
+        return {
+            "count": 0,
+            "mean": 0.0,
+            "m2": 0.0,
+            "negative": 0,
+            "zeros": 0,
+            "buckets": {},
+        }
+    mean = (total["count"] * total["mean"] - base["count"] * base["mean"]) / count
+    delta = mean - base["mean"]
+    m2 = total["m2"] - base["m2"] - delta**2 * base["count"] * count / total["count"]
+    buckets = {
+        bucket: n - base["buckets"].get(bucket, 0)
+        for bucket, n in total["buckets"].items()
+        if n > base["buckets"].get(bucket, 0)
+    }
+    return {
+        "count": count,
+        "mean": mean,
+        "m2": max(m2, 0.0),
+        "negative": max(total["negative"] - base["negative"], 0),
+        "zeros": max(total["zeros"] - base["zeros"], 0),
+        "buckets": buckets,
+    }
+
+
+def population_stability(base: dict, new: dict, bins: int = PSI_BINS) -> float:
+    """Population stability index of the new rows over quantile bins of the
+    baseline sketch"""
+    base_counts, new_counts = sketch_counts(base), sketch_counts(new)
+    base_total, new_total = sum(base_counts.values()), sum(new_counts.values())
+    if base_total == 0 or new_total == 0:
+        return 0.0
+
+    base_bins, new_bins = np.zeros(bins), np.zeros(bins)
+    cumulative = 0
+    for bucket in sorted(set(base_counts) | set(new_counts)):
+        position = min(int(cumulative / base_total * bins), bins - 1)
+        base_bins[position] += base_counts.get(bucket, 0)
+        new_bins[position] += new_counts.get(bucket, 0)
+        cumulative += base_counts.get(bucket, 0)
+
+    p = np.maximum(base_bins / base_total, 1e-4)
+    q = np.maximum(new_bins / new_total, 1e-4)
+    return float(np.sum((q - p) * np.log(q / p)))
+
+
+def compute_drift(current: dict, baseline: Optional[dict]) -> Optional[dict]:
+    """Drift of the rows added since a baseline, per card model.
+
+    Args:
+        current: Running statistics per card model (the "models" of sales_stats.json)
+        baseline: The same statistics at the last full retrain, None if unknown
+
+    Returns:
+        Dict with drifted (a card model drifted or appeared), stable (enough
+        new rows were assessed and none drifted), psi (maximum), reasons and
+        the per-model rows, psi and mean_shift; None without a baseline
+    """
+    if not baseline:
+        return None
+    models, reasons = {}, []
+    for model, total in sorted(current.items()):
+        base = baseline.get(model)
+        if not base or base["count"] == 0:
+            if total["count"] >= DRIFT_MIN_ROWS:
+                models[model] = {"rows": total["count"], "new_model": True}
+                reasons.append(f"new card model {model}")
+            continue
+        new = subtract_model_stats(total, base)
+        if new["count"] < DRIFT_MIN_ROWS:
+            continue
+        psi = population_stability(base, new)
+        mean_shift = abs(new["mean"] - base["mean"]) / (get_std(base) or 1.0)
+        models[model] = {
+            "rows": new["count"],
+            "psi": round(psi, 4),
+            "mean_shift": round(mean_shift, 3),
+        }
+        if psi > DRIFT_PSI or mean_shift > DRIFT_MEAN_SHIFT:
+            reasons.append(f"{model}: PSI {psi:.3f}, mean shift {mean_shift:.2f} std")
+
+    return {
+        "drifted": bool(reasons),
+        "stable": bool(models) and not reasons,
+        "psi": max((entry.get("psi", 0.0) for entry in models.values()), default=0.0),
+        "reasons": reasons,
+        "models": models,
+    }
+
+
+def describe_drift(drift: dict) -> str:
+    if drift["drifted"]:
+        return f"drift detected ({'; '.join(drift['reasons'])})"
+    if drift["stable"]:
+        models = len(drift["models"])
+        return f"no drift (max PSI {drift['psi']:.3f} over {models} card models)"
+    return f"not enough new rows to assess drift (need {DRIFT_MIN_ROWS} per card model)"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=(
+            "Show the running sales statistics and the drift since the last "
+            "full retrain."
+        )
+    )
+    parser.add_argument("--stats", default=SALES_STATS_PATH)
+    parser.add_argument(
+        "--state",
+        default="model/training_state.json",
+        help="training state with the baseline",
+    )
+    args = parser.parse_args()
+
+    stats = load_sales_stats(args.stats)
+    print(
+        f"  Running statistics of {stats['raw_rows']} raw rows "
+        f"(updated {stats['updated_at']})"
+    )
+    print(
+        f"  {'model':<12} {'rows':>9} {'mean':>9} {'std':>9} "
+        f"{'min':>7} {'p50':>7} {'p99':>7} {'max':>7} {'neg':>5}"
+    )
+    for model, model_stats in sorted(stats["models"].items()):
+        values = [
+            model_stats["min"],
+            get_quantile(model_stats, 0.5),
+            get_quantile(model_stats, 0.99),
+            model_stats["max"],
+        ]
+        low, p50, p99, high = (f"{v:.1f}" if v is not None else "-" for v in values)
+        print(
+            f"  {model:<12} {model_stats['count']:>9} {model_stats['mean']:>9.2f} "
+            f"{get_std(model_stats):>9.2f} {low:>7} {p50:>7} {p99:>7} {high:>7} "
+            f"{model_stats['negative']:>5}"
+        )
+
+    baseline = None
+    if os.path.exists(args.state):
+        with open(args.state) as f:
+            baseline = json.load(f).get("sales_stats")
+    drift = compute_drift(stats["models"], baseline)
+    if drift is None:
+        print(
+            "  No baseline in the training state, "
+            "drift is assessed after the next full retrain"
+        )
+    else:
+        print(f"  Since the last full retrain: {describe_drift(drift)}")
+        for model, entry in drift["models"].items():
+            print(f"    {model}: {entry}")
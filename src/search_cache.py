@@ -0,0 +1,188 @@
+"""
+-------------------------------------------------------------------------------
+Persistent cache of hyperparameter search results.
+
+'model/search_cache.json' stores the best parameters and CV scores of past
+searches. Every entry is keyed by
+
+- a hash of the search configuration (param_grid, CV folds, search mode...);
+- a fingerprint of the training data: row count, per-column summary
+  statistics and a hash of the card-model vocabulary.
+
+A search can be skipped if an entry has the same configuration and the data
+has not drifted past the thresholds below since the entry was written. The
+vocabulary hash has to match exactly, so a new card always triggers a search.
+
+Entries expire after MAX_AGE_HOURS; beyond MAX_ENTRIES the least recently
+used entries are evicted.
+-------------------------------------------------------------------------------
+"""
+
+import json
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from stage_cache import hash_json
+from vocabulary import VOCABULARY_PATH, load_vocabulary
+
+SEARCH_CACHE_PATH = "model/search_cache.json"
+MAX_ENTRIES = 20
+MAX_AGE_HOURS = 24 * 7
+MAX_ROW_GROWTH = 0.1  # Relative row count change since the cached search
+MAX_MEAN_SHIFT = 0.1  # Shift of any column mean, in standard deviations
+
+
+def fingerprint_data(
+    X: pd.DataFrame, y: pd.Series, vocabulary_path: str = VOCABULARY_PATH
+) -> dict:
+    """Summarize training data for drift comparison.
+
+    Args:
+        X: Training features
+        y: Training target
+        vocabulary_path: Path to vocabulary.json
+
+    Returns:
+        Dict with rows, per-column mean/std/min/max and vocabulary_hash
+    """
+    columns = {}
+    for name, values in [*X.items(), (y.name or "target", y)]:
+        values = np.asarray(values, dtype=np.float64)
+        columns[name] = {
+            "mean": float(values.mean()) if len(values) else 0.0,
+            "std": float(values.std()) if len(values) else 0.0,
+            "min": float(values.min()) if len(values) else 0.0,
+            "max": float(values.max()) if len(values) else 0.0,
+        }
+    return {
+        "rows": len(X),
+        "columns": columns,
+        "vocabulary_hash": hash_json(load_vocabulary(vocabulary_path)["codes"]),
+    }
+
+
+def get_drift(cached: dict, current: dict) -> Optional[str]:
+    """Compare two fingerprints.
+
+    Returns:
+        Description of the first drift found, None if within the thresholds
+    """
+    if cached["vocabulary_hash"] != current["vocabulary_hash"]:
+        return "vocabulary changed"
+    if set(cached["columns"]) != set(current["columns"]):
+        return "columns changed"
+    growth = abs(current["rows"] - cached["rows"]) / max(cached["rows"], 1)
+    if growth > MAX_ROW_GROWTH:
+        return f"row count changed by {growth:.1%}"
+    for name, stats in current["columns"].items():
+        before = cached["columns"][name]
+        scale = before["std"] or 1.0
+        shift = abs(stats["mean"] - before["mean"]) / scale
+        if shift > MAX_MEAN_SHIFT:
+            return f"mean of {name} shifted by {shift:.2f} std"
+    return None
+
+
+def load_search_cache(cache_path: str = SEARCH_CACHE_PATH) -> list[dict]:
+    """Load the cache entries without the expired ones"""
+    if not os.path.exists(cache_path):
+        return []
+    with open(cache_path) as f:
+        entries = json.load(f)
+    oldest = datetime.now() - timedelta(hours=MAX_AGE_HOURS)
+    return [
+        entry
+        for entry in entries
+        if datetime.fromisoformat(entry["created_at"]) >= oldest
+    ]
+
+
+def save_search_cache(entries: list[dict], cache_path: str = SEARCH_CACHE_PATH) -> None:
+    """Write the cache atomically, keeping the MAX_ENTRIES most recently used entries"""
+    entries = sorted(entries, key=lambda entry: entry["last_used_at"], reverse=True)[
+        :MAX_ENTRIES
+    ]
+    Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = f"{cache_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(entries, f, indent=2)
+    os.replace(tmp_path, cache_path)
+
+
+def lookup_search(
+    config: dict, fingerprint: dict, cache_path: str = SEARCH_CACHE_PATH
+) -> Optional[dict]:
+    """Find a cached search for the configuration whose data has not drifted.
+
+    Logs hits and misses; a hit refreshes the entry's last use.
+
+    Args:
+        config: Search configuration (param_grid, folds, mode...)
+        fingerprint: Fingerprint of the current training data
+        cache_path: Path to search_cache.json
+
+    Returns:
+        The cache entry with best_params and cv scores, None on a miss
+    """
+    entries = load_search_cache(cache_path)
+    config_hash = hash_json(config)
+    candidates = [entry for entry in entries if entry["config_hash"] == config_hash]
+    if not candidates:
+        print(f"    Search cache miss: no entry for search configuration {config_hash}")
+        return None
+
+    # the most recent search is the closest to the current data
+    entry = max(candidates, key=lambda entry: entry["created_at"])
+    drift = get_drift(entry["fingerprint"], fingerprint)
+    if drift is not None:
+        print(
+            f"    Search cache miss: {drift} since the search of {entry['created_at']}"
+        )
+        return None
+
+    entry["last_used_at"] = datetime.now().isoformat(timespec="seconds")
+    entry["hits"] += 1
+    save_search_cache(entries, cache_path)
+    print(
+        f"    Search cache hit: search of {entry['created_at']} "
+        f"on {entry['fingerprint']['rows']} rows ({entry['hits']} hits)"
+    )
+    return entry
+
+
+def store_search(
+    config: dict,
+    fingerprint: dict,
+    best_params: dict,
+    best_score: float,
+    cv_results: dict,
+    cache_path: str = SEARCH_CACHE_PATH,
+) -> None:
+    """Add the result of a search to the cache"""
+    now = datetime.now().isoformat(timespec="seconds")
+    entries = load_search_cache(cache_path)
+    entries.append(
+        {
+            "config_hash": hash_json(config),
+            "config": config,
+            "fingerprint": fingerprint,
+            "best_params": best_params,
+            "best_score": float(best_score),
+            "cv_scores": [
+                {"params": params, "mean_test_score": float(score)}
+                for params, score in zip(
+                    cv_results["params"], cv_results["mean_test_score"]
+                )
+            ],
+            "created_at": now,
+            "last_used_at": now,
+            "hits": 0,
+        }
+    )
+    save_search_cache(entries, cache_path)
+    print(f"    Search result stored in {cache_path}")
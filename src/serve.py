@@ -0,0 +1,322 @@
+"""
+-------------------------------------------------------------------------------
+This script `serve.py` is a local HTTP prediction server.
+
+    GET /predict?model=rtx3060&timestamp=2025-05-01T10:00:00Z
+        -> {"model": ..., "timestamp": ..., "prediction": 9.1, "version": 3}
+    GET /health
+        -> {"version": 3, "requests": ..., "batches": ..., "unknown_models": ...}
+
+1. Concurrent requests are coalesced into micro-batches: a batch is scored
+   when it reaches --max-batch queries or --max-delay-ms after its first
+   query, with one vectorized feature pass and one booster call. Every
+   timestamp is parsed on its own, so a malformed query only fails itself.
+
+2. The champion of the model registry is polled; a new champion is loaded
+   in the background and swapped in between two batches, so no request is
+   dropped or answered by a half-loaded model.
+
+3. Card models missing from the vocabulary are not scored; such queries are
+   answered with 400 and counted in /health.
+
+4. With --record, every query is appended to a JSONL request log that
+   benchmarks/replay.py can replay.
+
+    python3 src/serve.py --port 8000 --max-batch 256 --max-delay-ms 5
+-------------------------------------------------------------------------------
+"""
+
+import argparse
+import asyncio
+import json
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from preprocessed import build_feature_pipeline
+from registry import get_champion, load_model
+from vocabulary import UNKNOWN_CODE, VOCABULARY_PATH, load_vocabulary
+
+HOST = "0.0.0.0"
+PORT = 8000
+MAX_BATCH = 256  # Queries per micro-batch
+MAX_DELAY = 0.005  # Seconds a query waits for more queries to join its batch
+RELOAD_INTERVAL = 2.0  # Seconds between checks for a new champion
+
+STATUS_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    503: "Service Unavailable",
+}
+
+
+def respond(status: int, payload: dict) -> bytes:
+    """Build an HTTP/1.1 keep-alive JSON response."""
+    body = json.dumps(payload).encode()
+    return (
+        f"HTTP/1.1 {status} {STATUS_REASONS[status]}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: keep-alive\r\n\r\n"
+    ).encode() + body
+
+
+class PredictionServer:
+    """Micro-batching predictor with hot-swappable champion.
+
+    Args:
+        max_batch: Maximum queries per batch
+        max_delay: Maximum seconds the first query of a batch waits
+        vocabulary_path: Path to vocabulary.json
+        record_path: JSONL file to append every query to, None to disable
+    """
+
+    def __init__(
+        self,
+        max_batch: int = MAX_BATCH,
+        max_delay: float = MAX_DELAY,
+        vocabulary_path: str = VOCABULARY_PATH,
+        record_path: Optional[str] = None,
+    ):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.vocabulary_path = vocabulary_path
+        self.record_path = record_path
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.current = None  # (model, feature pipeline, version), swapped as a whole
+        self.requests = 0
+        self.batches = 0
+        self.unknown_models = 0  # queries of card models missing from the vocabulary
+        self.tasks: list[asyncio.Task] = []
+
+    def load_champion(self) -> tuple:
+        """Load the registry champion with a pipeline on the current vocabulary."""
+        entry = get_champion()
+        if entry is None:
+            raise FileNotFoundError(
+                "No champion in the model registry. Please run train.py first."
+            )
+        model = load_model(entry)
+        pipeline = build_feature_pipeline(
+            load_vocabulary(self.vocabulary_path)["codes"]
+        )
+        return model, pipeline, entry["version"]
+
+    async def watch_champion(self, interval: float = RELOAD_INTERVAL) -> None:
+        """Swap in a new champion as soon as it is registered."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                entry = get_champion()
+                if entry is None or entry["version"] == self.current[2]:
+                    continue
+                loaded = await loop.run_in_executor(None, self.load_champion)
+            except (OSError, ValueError) as e:
+                print(f"  WARNING: Could not load new champion: {e}")
+                continue
+            previous = self.current[2]
+            self.current = loaded
+            print(f"  Swapped champion version {previous} -> {loaded[2]}")
+
+    async def predict(self, model: str, timestamp: str) -> tuple[float, int, bool]:
+        """Queue one query and wait for its batch.
+
+        Returns:
+            Tuple of (prediction, model version, unknown model), the prediction
+            is NaN for an invalid timestamp or an unknown model
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((model, timestamp, future))
+        return await future
+
+    def score(
+        self, current: tuple, queries: pd.DataFrame
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Score a batch, NaN for queries with an invalid timestamp or unknown model.
+
+        Returns:
+            Tuple of (predictions, True for queries of unknown models)
+        """
+        model, pipeline, _ = current
+        features = pipeline.run(queries)
+        predictions = np.full(len(queries), np.nan)
+        unknown = np.zeros(len(queries), dtype=bool)
+        kept = np.arange(len(queries))
+        if pipeline.mask is not None:
+            kept = kept[pipeline.mask]
+        unknown[kept] = features["model_encoded"].to_numpy() == UNKNOWN_CODE
+        scored = ~unknown[kept]
+        if scored.any():
+            predictions[kept[scored]] = model.predict(
+                features if scored.all() else features[scored]
+            )
+        return predictions, unknown
+
+    async def run_batches(self) -> None:
+        """Collect queries into micro-batches and score them one batch at a time."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            current = self.current
+            queries = pd.DataFrame(
+                {
+                    "model": [item[0] for item in batch],
+                    "timestamp": [item[1] for item in batch],
+                }
+            )
+            try:
+                predictions, unknown = await loop.run_in_executor(
+                    None, self.score, current, queries
+                )
+            except Exception as e:
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.requests += len(batch)
+            self.unknown_models += int(unknown.sum())
+            for (*_, future), prediction, is_unknown in zip(
+                batch, predictions, unknown
+            ):
+                if not future.done():
+                    future.set_result((float(prediction), current[2], bool(is_unknown)))
+
+            if self.record_path is not None:
+                with open(self.record_path, "a") as f:
+                    f.writelines(
+                        json.dumps({"model": model, "timestamp": timestamp}) + "\n"
+                        for model, timestamp, _ in batch
+                    )
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                # skip headers, requests have no body
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+
+                parts = request_line.decode("latin-1").split()
+                url = urlsplit(parts[1] if len(parts) > 1 else "/")
+                writer.write(await self.route(url.path, parse_qs(url.query)))
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, path: str, query: dict) -> bytes:
+        if path == "/health":
+            return respond(
+                200,
+                {
+                    "version": self.current[2],
+                    "requests": self.requests,
+                    "batches": self.batches,
+                    "unknown_models": self.unknown_models,
+                },
+            )
+        if path != "/predict":
+            return respond(404, {"error": f"Unknown path: {path}"})
+
+        model = query.get("model", [None])[0]
+        timestamp = query.get("timestamp", [None])[0]
+        if model is None or timestamp is None:
+            return respond(
+                400, {"error": "Query parameters model and timestamp are required"}
+            )
+        try:
+            prediction, version, unknown = await self.predict(model, timestamp)
+        except Exception as e:
+            return respond(503, {"error": f"{type(e).__name__}: {e}"})
+        if unknown:
+            return respond(400, {"error": f"Unknown card model: '{model}'"})
+        if np.isnan(prediction):
+            return respond(400, {"error": f"Invalid timestamp: '{timestamp}'"})
+        return respond(
+            200,
+            {
+                "model": model,
+                "timestamp": timestamp,
+                "prediction": prediction,
+                "version": version,
+            },
+        )
+
+
+async def start_server(
+    server: PredictionServer,
+    host: str = HOST,
+    port: int = PORT,
+    reload_interval: float = RELOAD_INTERVAL,
+) -> asyncio.Server:
+    """Load the champion and start serving on the running event loop.
+
+    Returns:
+        The started asyncio server (batching and reload tasks run alongside it)
+    """
+    server.current = await asyncio.get_running_loop().run_in_executor(
+        None, server.load_champion
+    )
+    server.tasks = [
+        asyncio.create_task(server.run_batches()),
+        asyncio.create_task(server.watch_champion(reload_interval)),
+    ]
+    return await asyncio.start_server(server.handle, host, port)
+
+
+async def serve_forever(
+    server: PredictionServer, host: str, port: int, reload_interval: float
+) -> None:
+    http_server = await start_server(server, host, port, reload_interval)
+    print(
+        f"  Serving champion version {server.current[2]} on {host}:{port} "
+        f"(max batch {server.max_batch}, max delay {server.max_delay * 1000:.1f} ms)"
+    )
+    async with http_server:
+        await http_server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-batching prediction server.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--max-delay-ms", type=float, default=MAX_DELAY * 1000)
+    parser.add_argument("--reload-interval", type=float, default=RELOAD_INTERVAL)
+    parser.add_argument("--vocabulary", default=VOCABULARY_PATH)
+    parser.add_argument(
+        "--record", default=None, help="append every query to this JSONL file"
+    )
+    args = parser.parse_args()
+
+    server = PredictionServer(
+        max_batch=args.max_batch,
+        max_delay=args.max_delay_ms / 1000,
+        vocabulary_path=args.vocabulary,
+        record_path=args.record,
+    )
+    try:
+        asyncio.run(serve_forever(server, args.host, args.port, args.reload_interval))
+    except KeyboardInterrupt:
+        pass
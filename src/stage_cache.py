@@ -0,0 +1,162 @@
+"""
+-------------------------------------------------------------------------------
+Content-addressed stage cache.
+
+Every pipeline stage writes a stamp next to its outputs
+('data/processed/stage.json' for preprocessing, 'model/stage.json' for
+training) with the hashes of what produced them:
+
+- data: content of the inputs (raw segments for preprocessing, the
+  preprocessing stamp for training, so a changed upstream stage invalidates
+  everything downstream);
+- config: settings that change the outputs (output formats, param_grid...);
+- code: source of the modules the stage runs.
+
+If all hashes and the outputs are still there on the next run, the stage is
+skipped as a cache hit.
+-------------------------------------------------------------------------------
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from helper import find_latest_csv_file, read_manifest, resolve_segments
+
+STAGE_FILENAME = "stage.json"
+SOURCE_DIR = Path(__file__).resolve().parent
+
+
+def hash_json(value) -> str:
+    return hashlib.sha256(
+        json.dumps(value, sort_keys=True, default=str).encode()
+    ).hexdigest()[:16]
+
+
+def hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def hash_code(modules: list[str]) -> str:
+    """Hash of the source files of modules in src/"""
+    return hash_json({name: hash_file(SOURCE_DIR / f"{name}.py") for name in modules})
+
+
+def hash_raw_data(raw_dir: str, known: Optional[dict] = None) -> tuple[str, dict]:
+    """Hash of the content of the raw store.
+
+    Segments without rows (every API call failed) do not change the hash.
+    Segments are never rewritten, so the digest of a segment whose size is
+    unchanged is taken from `known` instead of reading it again.
+
+    Args:
+        raw_dir: Directory of the append-only raw store
+        known: Segment digests of the previous run (name -> [size, digest])
+
+    Returns:
+        Tuple of (hash, segment digests)
+    """
+    known = known or {}
+    rows = {path.name: count for path, count in read_manifest(raw_dir)}
+    digests = {}
+    for path in resolve_segments(find_latest_csv_file(raw_dir)):
+        if rows.get(path.name) == 0:
+            continue
+        size = path.stat().st_size
+        previous = known.get(path.name)
+        digests[path.name] = (
+            previous if previous and previous[0] == size else [size, hash_file(path)]
+        )
+    return hash_json([digest for _, digest in digests.values()]), digests
+
+
+def load_stamp(stage_dir: str) -> Optional[dict]:
+    stamp_path = Path(stage_dir) / STAGE_FILENAME
+    if not stamp_path.exists():
+        return None
+    with open(stamp_path) as f:
+        return json.load(f)
+
+
+def save_stamp(
+    stage_dir: str, stage: str, hashes: dict, outputs: list[str], **info
+) -> None:
+    """Write the stamp of a stage atomically.
+
+    Args:
+        stage_dir: Output directory of the stage
+        stage: Name of the stage
+        hashes: Hashes of data, config and code
+        outputs: Output files of the stage
+        **info: Additional state (e.g. segment digests, model version)
+    """
+    stamp = {
+        "stage": stage,
+        "key": hash_json(hashes),
+        "hashes": hashes,
+        "outputs": [str(path) for path in outputs],
+        "updated_at": datetime.now().isoformat(timespec="seconds"),
+        **info,
+    }
+    write_stamp(stage_dir, stamp)
+
+
+def write_stamp(stage_dir: str, stamp: dict) -> None:
+    stamp_path = Path(stage_dir) / STAGE_FILENAME
+    tmp_path = stamp_path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(stamp, f, indent=2)
+    os.replace(tmp_path, stamp_path)
+
+
+def rebase_stamp(
+    stage_dir: str, old_data_hash: str, new_data_hash: str, **info
+) -> bool:
+    """Point a stamp at rewritten inputs with unchanged content.
+
+    E.g. raw segments that were compacted.
+
+    The key is kept, so downstream stages, whose data hash is this key, stay
+    cache hits.
+
+    Args:
+        stage_dir: Output directory of the stage
+        old_data_hash: Data hash of the inputs before they were rewritten
+        new_data_hash: Data hash of the rewritten inputs
+        **info: Additional state to replace (e.g. segment digests)
+
+    Returns:
+        True if the stamp was current for old_data_hash and was updated
+    """
+    stamp = load_stamp(stage_dir)
+    if stamp is None or stamp["hashes"].get("data") != old_data_hash:
+        return False
+    stamp["hashes"] = {**stamp["hashes"], "data": new_data_hash}
+    stamp.update(info, updated_at=datetime.now().isoformat(timespec="seconds"))
+    write_stamp(stage_dir, stamp)
+    return True
+
+
+def is_cache_hit(stamp: Optional[dict], hashes: dict) -> bool:
+    """The stamp was written for the same hashes and its outputs still exist."""
+    return (
+        stamp is not None
+        and stamp["hashes"] == hashes
+        and all(Path(path).exists() for path in stamp["outputs"])
+    )
+
+
+def changed_hashes(stamp: Optional[dict], hashes: dict) -> list[str]:
+    """Names of the hashes that differ from the stamp (all if there is none)."""
+    if stamp is None:
+        return list(hashes)
+    return [
+        name for name, value in hashes.items() if stamp["hashes"].get(name) != value
+    ]
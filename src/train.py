@@ -1,293 +1,845 @@
-"""
--------------------------------------------------------------------------------
-This script runs the training of an XGBoost model to predict graphics card sales
-from the preprocessed data.
-
-1. It starts by searching for the latest preprocessed CSV file in the 'data/processed/' directory.
-2. If a standard model (model.pkl) does not exist, it loads the data, splits it into training and test sets, trains a model on this data, evaluates it, and then saves it as 'model/model.pkl'.
-3. If a standard model already exists, it trains a new model on the latest data, evaluates it, and saves the model in the 'model/' folder in the format: model_YYYYMMDD_HHMM.pkl.
-4. Performance metrics (RMSE, MAE, R²) are displayed and saved in the log file.
-5. Any errors are handled and reported in the logs.
-
-The models are saved in the 'model/' folder with the name 'model.pkl' for the standard model and with a timestamp for later versions.
-The model metrics are recorded in the script’s log files.
--------------------------------------------------------------------------------
-"""
-
-import os
-from typing import Tuple
-from helper import find_latest_csv_file, load_data
-from datetime import datetime
-import pickle
-import pandas as pd
-from sklearn.model_selection import train_test_split, GridSearchCV
-import xgboost as xgb
-from sklearn.metrics import root_mean_squared_error, mean_absolute_error, r2_score
-
-# Configuration constants
-TEST_SIZE = 0.2  # Proportion of data for testing (~80/20 train/test split)
-RANDOM_STATE = 42  # Random seed for reproducibility
-CV_FOLDS = 3  # Number of folds for cross-validation in grid search
-
-
-def check_model_exists(model_path: str) -> bool:
-    model_exists = os.path.exists(model_path)
-    if model_exists:
-        print("    Standard model available!")
-    else:
-        print("    Standard model not available!")
-    return model_exists
-
-
-def prepare_data(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
-    """Data splitting into features and target.
-    
-    Args:
-        df: Input dataframe with features and target column 'sales'
-        
-    Returns:
-        Tuple of (X, y) where X is features dataframe and y is target series
-    """
-    X = df.drop(columns=["sales"])
-    y = df["sales"]
-    return X, y
-
-
-def split_train_test(
-    X: pd.DataFrame,
-    y: pd.Series,
-    test_size: float = TEST_SIZE,
-    random_state: int = RANDOM_STATE,
-) -> Tuple[pd.DataFrame, pd.DataFrame, pd.Series, pd.Series]:
-    """Split data into training and test sets.
-    
-    Args:
-        X: Feature dataframe
-        y: Target series
-        test_size: Proportion of data to use for testing (default: 0.2 for ~80/20 split)
-        random_state: Random seed for reproducibility (default: 42)
-        
-    Returns:
-        Tuple of (X_train, X_test, y_train, y_test)
-    """
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=test_size, random_state=random_state
-    )
-    print(f"    Training set: {len(X_train)} samples")
-    print(f"    Test set: {len(X_test)} samples")
-
-    return X_train, X_test, y_train, y_test
-
-
-def train_model(
-    X_train: pd.DataFrame,
-    y_train: pd.Series,
-    random_state: int = RANDOM_STATE,
-    cv_folds: int = CV_FOLDS,
-) -> xgb.XGBRegressor:
-    """Train XGBoost model for sales prediction using grid search.
-    
-    Uses GridSearchCV to find optimal hyperparameters:
-    - n_estimators: Number of boosting rounds (tested: 50, 100, 150, 200, 250, 300)
-    - max_depth: Maximum tree depth (tested: 4, 6, 8)
-    - learning_rate: Step size shrinkage (tested: 0.01, 0.1, 0.3)
-    - random_state: Seed for reproducibility (default: 42)
-    
-    Args:
-        X_train: Training feature dataframe
-        y_train: Training target series
-        random_state: Random seed for reproducibility
-        cv_folds: Number of cross-validation folds
-        
-    Returns:
-        Best trained XGBoost regressor model from grid search
-    """
-    # Define parameter grid for grid search
-    param_grid = {
-        'n_estimators': [50, 100, 150, 200, 250, 300],
-        'max_depth': [4, 6, 8],
-        'learning_rate': [0.01, 0.1, 0.3]
-    }
-    
-    # Base model
-    base_model = xgb.XGBRegressor(random_state=random_state)
-    
-    # Grid search with cross-validation
-    grid_search = GridSearchCV(
-        estimator=base_model,
-        param_grid=param_grid,
-        cv=cv_folds,
-        scoring='neg_mean_squared_error',
-        n_jobs=-1,
-        verbose=1
-    )
-    
-    print(f"    Running grid search with {cv_folds}-fold CV...")
-    grid_search.fit(X_train, y_train)
-    
-    print(f"    Best parameters: {grid_search.best_params_}")
-    print(f"    Best CV score (neg MSE): {grid_search.best_score_:.4f}")
-    
-    return grid_search.best_estimator_
-
-
-def check_model_metrics_quality(rmse: float, mae: float, r2: float) -> None:
-    """Check model metrics for potential issues and warn if needed.
-    
-    Args:
-        rmse: Root Mean Squared Error
-        mae: Mean Absolute Error
-        r2: R-squared score
-    """
-    # Warn on very low R² (poor model fit)
-    if r2 < 0.0:
-        print(
-            f"  WARNING: Negative R² score ({r2:.4f}) indicates model performs worse "
-            f"than a simple mean baseline. Model may need retraining or feature engineering."
-        )
-    elif r2 < 0.3:
-        print(
-            f"  WARNING: Low R² score ({r2:.4f}) suggests weak model performance. "
-            f"Consider feature engineering or hyperparameter tuning."
-        )
-    
-    # Warn on very high RMSE relative to MAE (indicates high variance)
-    if mae > 0:
-        rmse_mae_ratio = rmse / mae
-        if rmse_mae_ratio > 2.0:
-            print(
-                f"  WARNING: High RMSE/MAE ratio ({rmse_mae_ratio:.2f}) suggests "
-                f"model has high prediction variance. Consider regularization."
-            )
-
-
-def evaluate_model(
-    model: xgb.XGBRegressor, X_test: pd.DataFrame, y_test: pd.Series
-) -> Tuple[float, float, float]:
-    """Evaluate model performance on test data.
-    
-    Args:
-        model: Trained XGBoost model
-        X_test: Test feature dataframe
-        y_test: Test target series
-        
-    Returns:
-        Tuple of (rmse, mae, r2) metrics
-    """
-    y_pred = model.predict(X_test)
-
-    rmse = root_mean_squared_error(y_test, y_pred)
-    mae = mean_absolute_error(y_test, y_pred)
-    r2 = r2_score(y_test, y_pred)
-    
-    # Check metrics quality
-    check_model_metrics_quality(rmse, mae, r2)
-    
-    return rmse, mae, r2
-
-
-def print_metrics(rmse: float, mae: float, r2: float) -> None:
-    """Print model performance metrics.
-    
-    Args:
-        rmse: Root Mean Squared Error
-        mae: Mean Absolute Error
-        r2: R-squared score
-    """
-    print("  Model Performance Metrics:")
-    print(f"    RMSE: {rmse:.4f}")
-    print(f"    MAE:  {mae:.4f}")
-    print(f"    R²:   {r2:.4f}")
-
-
-def get_model_filename(model_exists: bool) -> str:
-    """Generate model filename based on whether standard model exists.
-    
-    Args:
-        model_exists: Whether the standard model.pkl file exists
-        
-    Returns:
-        Filename path for the model
-    """
-    if not model_exists:
-        return "model/model.pkl"
-    else:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M")
-        return f"model/model_{timestamp}.pkl"
-
-
-def save_model(model: xgb.XGBRegressor, filepath: str) -> None:
-    """Save trained model to pickle file.
-    
-    Args:
-        model: Trained XGBoost model to save
-        filepath: Path where model should be saved
-    """
-    with open(filepath, "wb") as f:
-        pickle.dump(model, f)
-    print(f"    Model saved to {filepath}")
-
-
-if __name__ == "__main__":
-    processed_path = "data/processed"
-    standard_model_path = "model/model.pkl"
-
-    try:
-        # 1. Get latest preprocessed CSV file in the 'data/processed/' directory.
-        print("  Find latest processed CSV file...")
-        latest_file = find_latest_csv_file(processed_path)
-        if not latest_file:
-            raise ValueError(
-                f"No processed CSV files found in {processed_path}. "
-                f"Please ensure preprocessing has been run and files exist in the directory."
-            )
-        if not latest_file.exists():
-            raise FileNotFoundError(
-                f"Processed CSV file not found at {latest_file}. "
-                f"The file path was identified but does not exist on disk."
-            )
-        df = load_data(latest_file)
-        print(f"  Found and loaded latest file {latest_file=}")
-
-        # 2. Standard model (model.pkl) available?
-        print("  Check if standard model exists...")
-        model_exists = check_model_exists(standard_model_path)
-
-        # 3. Prep data - Feature & Target
-        print("  Seperate data into feature and target...")
-        X, y = prepare_data(df)
-
-        # 4. Split
-        print("  Split data into train & test...")
-        X_train, X_test, y_train, y_test = split_train_test(X, y)
-
-        # 5. Train Model
-        print("  Start training of the model...")
-        model = train_model(X_train, y_train)
-
-        # 6. Evaluate model
-        print("  Evaluating model...")
-        rmse, mae, r2 = evaluate_model(model, X_test, y_test)
-
-        # 8. Metrics
-        print_metrics(rmse, mae, r2)
-
-        # 9. Save model (logics)
-        print("  Saving model...")
-        model_filename = get_model_filename(model_exists)
-        save_model(model, model_filename)
-
-    except FileNotFoundError as e:
-        print(f"  ERROR: File not found during training - {str(e)}")
-        raise
-    except ValueError as e:
-        print(f"  ERROR: Validation error in training - {str(e)}")
-        raise
-    except Exception as e:
-        print(
-            f"  ERROR: Unexpected error during model training. "
-            f"Operation: training XGBoost model on data from {processed_path}. "
-            f"Error type: {type(e).__name__}. "
-            f"Details: {str(e)}"
-        )
-        raise
+"""
+-------------------------------------------------------------------------------
+This script runs the training of an XGBoost model to predict graphics card sales
+from the preprocessed data.
+
+1. It starts by searching for the latest preprocessed CSV file in the 'data/processed/' directory.
+2. If a standard model (model.pkl) does not exist, it loads the data, splits it into training and test sets, trains a model on this data, evaluates it, and then saves it as 'model/model.pkl'.
+3. If a standard model already exists, it trains a new model on the latest data, evaluates it, and saves the model in the 'model/' folder in the format: model_YYYYMMDD_HHMM.pkl.
+4. Performance metrics (RMSE, MAE, R²) are displayed and saved in the log file, and
+   with wall time, rows, search fits per second and peak memory in the run history
+   'logs/runs.jsonl' (see src/runlog.py).
+5. Any errors are handled and reported in the logs.
+
+Between full retrains, runs warm-start from the current champion: its booster is
+boosted for a few more rounds on the rows added since it was trained, with its stored
+hyperparameters ('model/training_state.json'). Like a full retrain, the update is
+evaluated on a test split of these rows; if it passes, the champion is boosted on all
+of them, so no row is skipped. A full grid search retrain runs on a schedule, when the
+champion's or the updated booster's error on the new rows degrades, when the rows it
+was trained on changed (e.g. duplicates dropped by a compaction), when the sales
+distribution drifted since the last full retrain (running statistics, see
+src/sales_stats.py), or with --full. Without drift the age-based retrain is skipped.
+
+The models are saved in the 'model/' folder with the name 'model.pkl' for the standard model and with a timestamp for later versions.
+Every model is also registered in the model registry (src/registry.py): a native
+XGBoost booster file plus an entry with parameters, data fingerprint and metrics in
+'model/registry.json', which points to the champion.
+Every new champion then scores all models for the next days into a forecast lookup
+table (src/forecast.py), which is rebuilt for a kept champion before its horizon
+runs out.
+A run is skipped when the processed data, the training configuration and the code are
+unchanged since the run that produced the champion (stage stamp 'model/stage.json',
+see src/stage_cache.py).
+The model metrics are recorded in the script’s log files.
+-------------------------------------------------------------------------------
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from typing import Optional, Tuple
+from forecast import (
+    FORECAST_DAYS,
+    build_forecast_table,
+    forecast_expires,
+    load_forecast_meta,
+)
+from helper import find_latest_csv_file, load_data
+from resources import describe_plan, plan_parallelism
+from runlog import record_metrics, stage_run
+from sales_stats import (
+    SALES_STATS_FILENAME,
+    compute_drift,
+    describe_drift,
+    load_sales_stats,
+)
+from search import NestedGridSearchCV, group_candidates
+from registry import REGISTRY_DIR, get_champion, get_version, load_model, register_model
+from search_cache import (
+    SEARCH_CACHE_PATH,
+    fingerprint_data,
+    lookup_search,
+    store_search,
+)
+from stage_cache import hash_code, hash_json, is_cache_hit, load_stamp, save_stamp
+from vocabulary import load_vocabulary
+from datetime import datetime, timedelta
+import pickle
+import time
+import pandas as pd
+from sklearn.model_selection import train_test_split, GridSearchCV, ParameterGrid
+import xgboost as xgb
+from sklearn.metrics import root_mean_squared_error, mean_absolute_error, r2_score
+
+# Configuration constants
+TEST_SIZE = 0.2  # Proportion of data for testing (~80/20 train/test split)
+RANDOM_STATE = 42  # Random seed for reproducibility
+CV_FOLDS = 3  # Number of folds for cross-validation in grid search
+SEARCH_MODE = "nested"  # "nested": one fit per n_estimators group, "grid": GridSearchCV
+PARAM_GRID = {
+    "n_estimators": [50, 100, 150, 200, 250, 300],
+    "max_depth": [4, 6, 8],
+    "learning_rate": [0.01, 0.1, 0.3],
+}
+PROCESSED_DIR = "data/processed"
+# modules whose code determines the trained model (see src/stage_cache.py)
+TRAIN_MODULES = [
+    "train",
+    "search",
+    "search_cache",
+    "resources",
+    "registry",
+    "forecast",
+    "sales_stats",
+]
+# warm-start training (see run_training)
+TRAINING_STATE_PATH = "model/training_state.json"
+WARM_START_ROUNDS = 10  # Boosting rounds added per warm-start update
+WARM_START_MIN_ROWS = 50  # New rows needed before the champion is updated
+FULL_RETRAIN_EVERY = 48  # Warm-start updates before a scheduled full retrain
+FULL_RETRAIN_MAX_AGE_HOURS = 24  # Maximum age of the last full retrain
+DEGRADATION_TOLERANCE = 1.25  # Full retrain if held-out RMSE > tolerance x last RMSE
+
+
+def check_model_exists(model_path: str) -> bool:
+    model_exists = os.path.exists(model_path)
+    if model_exists:
+        print("    Standard model available!")
+    else:
+        print("    Standard model not available!")
+    return model_exists
+
+
+def prepare_data(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
+    """Data splitting into features and target.
+
+    Args:
+        df: Input dataframe with features and target column 'sales'
+
+    Returns:
+        Tuple of (X, y) where X is features dataframe and y is target series
+    """
+    X = df.drop(columns=["sales"])
+    y = df["sales"]
+    return X, y
+
+
+def split_train_test(
+    X: pd.DataFrame,
+    y: pd.Series,
+    test_size: float = TEST_SIZE,
+    random_state: int = RANDOM_STATE,
+) -> Tuple[pd.DataFrame, pd.DataFrame, pd.Series, pd.Series]:
+    """Split data into training and test sets.
+
+    Args:
+        X: Feature dataframe
+        y: Target series
+        test_size: Proportion of data to use for testing (default: 0.2 for ~80/20 split)
+        random_state: Random seed for reproducibility (default: 42)
+
+    Returns:
+        Tuple of (X_train, X_test, y_train, y_test)
+    """
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=test_size, random_state=random_state
+    )
+    print(f"    Training set: {len(X_train)} samples")
+    print(f"    Test set: {len(X_test)} samples")
+
+    return X_train, X_test, y_train, y_test
+
+
+def train_model(
+    X_train: pd.DataFrame,
+    y_train: pd.Series,
+    random_state: int = RANDOM_STATE,
+    cv_folds: int = CV_FOLDS,
+    search: str = SEARCH_MODE,
+    early_stopping_rounds: Optional[int] = None,
+    cache_path: Optional[str] = SEARCH_CACHE_PATH,
+    search_jobs: Optional[int] = None,
+    fit_threads: Optional[int] = None,
+) -> xgb.XGBRegressor:
+    """Train XGBoost model for sales prediction using grid search.
+
+    Uses GridSearchCV (search="grid") or the equivalent NestedGridSearchCV
+    (search="nested", see src/search.py) to find optimal hyperparameters:
+    - n_estimators: Number of boosting rounds (tested: 50, 100, 150, 200, 250, 300)
+    - max_depth: Maximum tree depth (tested: 4, 6, 8)
+    - learning_rate: Step size shrinkage (tested: 0.01, 0.1, 0.3)
+    - random_state: Seed for reproducibility (default: 42)
+
+    Args:
+        X_train: Training feature dataframe
+        y_train: Training target series
+        random_state: Random seed for reproducibility
+        cv_folds: Number of cross-validation folds
+        search: Search mode, "nested" or "grid"
+        early_stopping_rounds: Native early stopping in the nested search
+            (not identical to the full grid anymore), None to disable
+        cache_path: Search cache (see src/search_cache.py); if the data has not
+            drifted since a cached search, its best parameters are fitted
+            directly. None to always search
+        search_jobs: Concurrent fits, derived from the available cores if None
+        fit_threads: XGBoost threads per fit, derived if None (see src/resources.py)
+
+    Returns:
+        Best trained XGBoost regressor model from grid search
+    """
+    # Define parameter grid for grid search
+    param_grid = PARAM_GRID
+
+    # Split the available cores between concurrent fits and XGBoost threads
+    if search == "nested":
+        tasks = len(group_candidates(param_grid)[1]) * cv_folds
+    else:
+        tasks = len(ParameterGrid(param_grid)) * cv_folds
+    plan = plan_parallelism(
+        tasks, len(X_train), search_jobs=search_jobs, fit_threads=fit_threads
+    )
+    print(f"    Parallelism: {describe_plan(plan)}")
+
+    # Skip the search if the data has not drifted since a cached one
+    config = {
+        "param_grid": param_grid,
+        "cv_folds": cv_folds,
+        "search": search,
+        "early_stopping_rounds": early_stopping_rounds,
+        "random_state": random_state,
+        "tree_method": plan.tree_method,
+        "max_bin": plan.max_bin,
+    }
+    if cache_path is not None:
+        fingerprint = fingerprint_data(X_train, y_train)
+        entry = lookup_search(config, fingerprint, cache_path)
+        if entry is not None:
+            print(f"    Fitting cached best parameters: {entry['best_params']}")
+            record_metrics(search_cache_hit=True)
+            print(f"    Cached CV score (neg MSE): {entry['best_score']:.4f}")
+            model = xgb.XGBRegressor(
+                random_state=random_state, **plan.xgb_params(), **entry["best_params"]
+            )
+            return model.fit(X_train, y_train)
+
+    # Base model
+    base_model = xgb.XGBRegressor(random_state=random_state, **plan.xgb_params())
+
+    # Grid search with cross-validation
+    if search == "nested":
+        grid_search = NestedGridSearchCV(
+            estimator=base_model,
+            param_grid=param_grid,
+            cv=cv_folds,
+            n_jobs=plan.search_jobs,
+            verbose=1,
+            early_stopping_rounds=early_stopping_rounds,
+        )
+    elif search == "grid":
+        grid_search = GridSearchCV(
+            estimator=base_model,
+            param_grid=param_grid,
+            cv=cv_folds,
+            scoring="neg_mean_squared_error",
+            n_jobs=plan.search_jobs,
+            verbose=1,
+        )
+    else:
+        raise ValueError(
+            f"Unknown search mode '{search}'. Expected 'nested' or 'grid'."
+        )
+
+    print(f"    Running {search} grid search with {cv_folds}-fold CV...")
+    search_start = time.perf_counter()
+    grid_search.fit(X_train, y_train)
+    record_metrics(
+        search=search,
+        fits=tasks,
+        search_seconds=round(time.perf_counter() - search_start, 4),
+    )
+
+    print(f"    Best parameters: {grid_search.best_params_}")
+    print(f"    Best CV score (neg MSE): {grid_search.best_score_:.4f}")
+
+    if cache_path is not None:
+        store_search(
+            config,
+            fingerprint,
+            grid_search.best_params_,
+            grid_search.best_score_,
+            grid_search.cv_results_,
+            cache_path,
+        )
+
+    return grid_search.best_estimator_
+
+
+def check_model_metrics_quality(rmse: float, mae: float, r2: float) -> None:
+    """Check model metrics for potential issues and warn if needed.
+
+    Args:
+        rmse: Root Mean Squared Error
+        mae: Mean Absolute Error
+        r2: R-squared score
+    """
+    # Warn on very low R² (poor model fit)
+    if r2 < 0.0:
+        print(
+            f"  WARNING: Negative R² score ({r2:.4f}) indicates model performs worse "
+            f"than a simple mean baseline. Model may need retraining or feature engineering."
+        )
+    elif r2 < 0.3:
+        print(
+            f"  WARNING: Low R² score ({r2:.4f}) suggests weak model performance. "
+            f"Consider feature engineering or hyperparameter tuning."
+        )
+
+    # Warn on very high RMSE relative to MAE (indicates high variance)
+    if mae > 0:
+        rmse_mae_ratio = rmse / mae
+        if rmse_mae_ratio > 2.0:
+            print(
+                f"  WARNING: High RMSE/MAE ratio ({rmse_mae_ratio:.2f}) suggests "
+                f"model has high prediction variance. Consider regularization."
+            )
+
+
+def evaluate_model(
+    model: xgb.XGBRegressor, X_test: pd.DataFrame, y_test: pd.Series
+) -> Tuple[float, float, float]:
+    """Evaluate model performance on test data.
+
+    Args:
+        model: Trained XGBoost model
+        X_test: Test feature dataframe
+        y_test: Test target series
+
+    Returns:
+        Tuple of (rmse, mae, r2) metrics
+    """
+    y_pred = model.predict(X_test)
+
+    rmse = root_mean_squared_error(y_test, y_pred)
+    mae = mean_absolute_error(y_test, y_pred)
+    r2 = r2_score(y_test, y_pred)
+
+    # Check metrics quality
+    check_model_metrics_quality(rmse, mae, r2)
+
+    return rmse, mae, r2
+
+
+def print_metrics(rmse: float, mae: float, r2: float) -> None:
+    """Print model performance metrics.
+
+    Args:
+        rmse: Root Mean Squared Error
+        mae: Mean Absolute Error
+        r2: R-squared score
+    """
+    print("  Model Performance Metrics:")
+    print(f"    RMSE: {rmse:.4f}")
+    print(f"    MAE:  {mae:.4f}")
+    print(f"    R²:   {r2:.4f}")
+
+
+def get_model_filename(model_exists: bool) -> str:
+    """Generate model filename based on whether standard model exists.
+
+    Args:
+        model_exists: Whether the standard model.pkl file exists
+
+    Returns:
+        Filename path for the model
+    """
+    if not model_exists:
+        return "model/model.pkl"
+    else:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M")
+        return f"model/model_{timestamp}.pkl"
+
+
+def save_model(model: xgb.XGBRegressor, filepath: str) -> None:
+    """Save trained model to pickle file.
+
+    Args:
+        model: Trained XGBoost model to save
+        filepath: Path where model should be saved
+    """
+    with open(filepath, "wb") as f:
+        pickle.dump(model, f)
+    print(f"    Model saved to {filepath}")
+
+
+def load_training_state(state_path: str = TRAINING_STATE_PATH) -> Optional[dict]:
+    """Load the state of the current champion, None if there is none"""
+    if not os.path.exists(state_path):
+        return None
+    with open(state_path) as f:
+        return json.load(f)
+
+
+def save_training_state(state: dict, state_path: str = TRAINING_STATE_PATH) -> None:
+    """Write the training state atomically"""
+    state = {**state, "updated_at": datetime.now().isoformat(timespec="seconds")}
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, state_path)
+
+
+def hash_rows(df: pd.DataFrame, rows: int) -> str:
+    """Order-sensitive hash of the first `rows` rows of the processed dataset"""
+    row_hashes = pd.util.hash_pandas_object(df.iloc[:rows], index=False)
+    return hashlib.sha256(row_hashes.to_numpy().tobytes()).hexdigest()
+
+
+def get_full_retrain_reason(
+    state: Optional[dict],
+    total_rows: int,
+    now: datetime,
+    drift: Optional[dict] = None,
+    trained_hash: Optional[str] = None,
+) -> Optional[str]:
+    """Decide whether the retrain policy requires a full grid search retrain.
+
+    Args:
+        state: Training state of the current champion
+        total_rows: Rows of the processed dataset
+        now: Current time
+        drift: Drift of the sales since the last full retrain
+            (see sales_stats.compute_drift)
+        trained_hash: Hash of the first trained rows of the processed dataset
+            (see hash_rows)
+
+    Returns:
+        Reason for a full retrain, None if a warm start is possible
+    """
+    if state is None:
+        return "no training state"
+    entry = get_version(state["version"]) if "version" in state else None
+    if entry is None or not os.path.exists(entry["path"]):
+        return (
+            f"champion version {state.get('version')} not found in the model registry"
+        )
+    if total_rows < state["trained_rows"]:
+        return "processed dataset is smaller than the trained rows"
+    # warm starts only read the rows after trained_rows, so the rows before must not
+    # have been reordered or removed (e.g. duplicates dropped by a compaction)
+    if trained_hash != state.get("trained_hash"):
+        return "rows the champion was trained on changed"
+    if drift is not None and drift["drifted"]:
+        reasons = "; ".join(drift["reasons"])
+        return f"sales distribution drifted since the last full retrain ({reasons})"
+    # bounds the trees added by warm starts, so it also applies without drift
+    if state["updates_since_full"] >= FULL_RETRAIN_EVERY:
+        return f"scheduled after {state['updates_since_full']} warm-start updates"
+    if now - datetime.fromisoformat(state["full_trained_at"]) > timedelta(
+        hours=FULL_RETRAIN_MAX_AGE_HOURS
+    ):
+        if drift is not None and drift["stable"]:
+            print(
+                f"  Full retrain after {FULL_RETRAIN_MAX_AGE_HOURS}h skipped: "
+                f"no drift since the last one"
+            )
+            return None
+        return f"last full retrain older than {FULL_RETRAIN_MAX_AGE_HOURS}h"
+    return None
+
+
+def warm_start_model(
+    previous: xgb.XGBRegressor,
+    X_new: pd.DataFrame,
+    y_new: pd.Series,
+    params: dict,
+    rounds: int = WARM_START_ROUNDS,
+) -> xgb.XGBRegressor:
+    """Continue boosting the previous booster on new rows only.
+
+    Args:
+        previous: Current champion
+        X_new: Features of the rows added since it was trained
+        y_new: Target of these rows
+        params: Stored hyperparameters of the champion
+        rounds: Boosting rounds to add
+
+    Returns:
+        New model with the trees of the previous one plus `rounds` new trees
+    """
+    plan = plan_parallelism(tasks=1, rows=len(X_new))
+    model = xgb.XGBRegressor(
+        random_state=RANDOM_STATE,
+        **plan.xgb_params(),
+        **{**params, "n_estimators": rounds},
+    )
+    model.fit(X_new, y_new, xgb_model=previous.get_booster())
+    return model
+
+
+def refresh_forecast_table(version: int, forecast_days: int) -> None:
+    """Rebuild the forecast table of a kept champion if its horizon runs out.
+
+    Args:
+        version: Registry version of the champion
+        forecast_days: Horizon of the forecast table, 0 to skip it
+    """
+    if forecast_days <= 0 or not forecast_expires(load_forecast_meta()):
+        return
+    print(f"  Forecast table expires, rebuilding it for version {version}...")
+    build_forecast_table(
+        load_model(get_version(version)),
+        load_vocabulary()["codes"],
+        version,
+        days=forecast_days,
+    )
+
+
+def run_training(
+    df: Optional[pd.DataFrame] = None,
+    processed_path: str = PROCESSED_DIR,
+    full: bool = False,
+    search: str = SEARCH_MODE,
+    early_stopping_rounds: Optional[int] = None,
+    search_jobs: Optional[int] = None,
+    fit_threads: Optional[int] = None,
+    use_cache: bool = True,
+    forecast_days: int = FORECAST_DAYS,
+) -> Optional[dict]:
+    """Warm-start or fully retrain the champion on the processed dataset.
+
+    Args:
+        df: Processed dataset already in memory, loaded from the latest file in
+            processed_path if None
+        processed_path: Directory of the processed dataset
+        full: Force a full grid search retrain
+        search: "nested" or "grid"
+        early_stopping_rounds: Native early stopping in the nested search
+        search_jobs: Concurrent fits in the search, derived if None
+        fit_threads: XGBoost threads per fit, derived if None
+        use_cache: Look up and store the search result in the search cache
+        forecast_days: Horizon of the forecast table of the new champion, 0 to skip it
+
+    Returns:
+        Registry entry of the new model, None if the champion was kept
+    """
+    standard_model_path = "model/model.pkl"
+
+    # 0. Skip the stage if the processed data (upstream stamp), configuration and
+    # code are unchanged
+    upstream = load_stamp(processed_path)
+    hashes = None
+    if upstream is not None:
+        config = {
+            "param_grid": PARAM_GRID,
+            "cv_folds": CV_FOLDS,
+            "test_size": TEST_SIZE,
+            "random_state": RANDOM_STATE,
+            "search": search,
+            "early_stopping_rounds": early_stopping_rounds,
+            "warm_start": [WARM_START_ROUNDS, WARM_START_MIN_ROWS],
+            "forecast_days": forecast_days,
+        }
+        hashes = {
+            "data": upstream["key"],
+            "config": hash_json(config),
+            "code": hash_code(TRAIN_MODULES),
+        }
+        stamp = load_stamp(REGISTRY_DIR)
+        champion = get_champion()
+        if (
+            not full
+            and is_cache_hit(stamp, hashes)
+            and champion is not None
+            and champion["version"] == stamp["version"]
+        ):
+            print(
+                "  Stage cache hit: processed data, configuration and code unchanged, "
+                f"keeping version {champion['version']}"
+            )
+            record_metrics(cache_hit=True, rows_in=0, version=champion["version"])
+            refresh_forecast_table(champion["version"], forecast_days)
+            return None
+
+    # 1. Get latest preprocessed CSV file in the 'data/processed/' directory.
+    if df is None:
+        print("  Find latest processed CSV file...")
+        latest_file = find_latest_csv_file(processed_path)
+        if not latest_file:
+            raise ValueError(
+                f"No processed CSV files found in {processed_path}. "
+                f"Please ensure preprocessing has been run and files exist in the directory."
+            )
+        if not latest_file.exists():
+            raise FileNotFoundError(
+                f"Processed CSV file not found at {latest_file}. "
+                f"The file path was identified but does not exist on disk."
+            )
+        df = load_data(latest_file)
+        print(f"  Found and loaded latest file {latest_file=}")
+    else:
+        print(f"  Using processed dataset from memory: {len(df)} rows")
+
+    # 2. Standard model (model.pkl) available?
+    print("  Check if standard model exists...")
+    model_exists = check_model_exists(standard_model_path)
+
+    # 3. Prep data - Feature & Target
+    print("  Seperate data into feature and target...")
+    X, y = prepare_data(df)
+    record_metrics(rows_in=len(df))
+
+    # 4. Warm start from the champion or full retrain (retrain policy, drift of the
+    # running sales statistics)
+    state = load_training_state()
+    sales_stats = load_sales_stats(os.path.join(processed_path, SALES_STATS_FILENAME))
+    drift = (
+        compute_drift(sales_stats["models"], state.get("sales_stats"))
+        if state
+        else None
+    )
+    if drift is not None:
+        print(f"  Sales since the last full retrain: {describe_drift(drift)}")
+        record_metrics(drift_psi=drift["psi"], drifted=drift["drifted"])
+    trained_hash = (
+        hash_rows(df, state["trained_rows"])
+        if state and not full and state["trained_rows"] <= len(df)
+        else None
+    )
+    reason = (
+        "forced with --full"
+        if full
+        else get_full_retrain_reason(
+            state, len(df), datetime.now(), drift, trained_hash
+        )
+    )
+    if reason is None:
+        new_rows = len(df) - state["trained_rows"]
+        if new_rows < WARM_START_MIN_ROWS:
+            print(
+                f"  Only {new_rows} new rows since the champion was trained "
+                f"(need {WARM_START_MIN_ROWS}), keeping version {state['version']}"
+            )
+            record_metrics(training="kept", rows_out=0, version=state["version"])
+            if hashes is not None:
+                champion = get_version(state["version"])
+                save_stamp(
+                    REGISTRY_DIR,
+                    "train",
+                    hashes,
+                    [champion["path"]],
+                    version=state["version"],
+                )
+            refresh_forecast_table(state["version"], forecast_days)
+            return None
+
+        # held-out error of the champion on the rows it has not seen yet
+        version = state["version"]
+        print(f"  Evaluating champion version {version} on {new_rows} new rows...")
+        previous = load_model(get_version(state["version"]))
+        X_new, y_new = X.iloc[state["trained_rows"] :], y.iloc[state["trained_rows"] :]
+        rmse, mae, r2 = evaluate_model(previous, X_new, y_new)
+        print_metrics(rmse, mae, r2)
+        if rmse > DEGRADATION_TOLERANCE * state["rmse"]:
+            reason = (
+                f"held-out RMSE {rmse:.4f} degraded beyond "
+                f"{DEGRADATION_TOLERANCE} x {state['rmse']:.4f}"
+            )
+
+    if reason is None:
+        # same holdout protocol as a full retrain, on the new rows
+        print("  Split new rows into train & test...")
+        X_train, X_test, y_train, y_test = split_train_test(X_new, y_new)
+        print(
+            f"  Warm start: {WARM_START_ROUNDS} rounds on {len(X_train)} new rows "
+            f"with {state['params']}"
+        )
+        model = warm_start_model(previous, X_train, y_train, state["params"])
+
+        print("  Evaluating warm-started model...")
+        rmse, mae, r2 = evaluate_model(model, X_test, y_test)
+        print_metrics(rmse, mae, r2)
+        if rmse > DEGRADATION_TOLERANCE * state["rmse"]:
+            reason = (
+                f"held-out RMSE {rmse:.4f} of the warm-started model degraded beyond "
+                f"{DEGRADATION_TOLERANCE} x {state['rmse']:.4f}"
+            )
+        else:
+            # the held-out rows are after trained_rows from now on, so they are
+            # only skipped if the champion is continued on all new rows
+            print(
+                f"  Warm start: {WARM_START_ROUNDS} rounds on all {new_rows} new rows"
+            )
+            model = warm_start_model(previous, X_new, y_new, state["params"])
+            state.update(
+                trained_rows=len(df),
+                trained_hash=hash_rows(df, len(df)),
+                updates_since_full=state["updates_since_full"] + 1,
+            )
+            training, evaluation = "warm_start", "test split of the new rows"
+
+    if reason is not None:
+        print(f"  Full retrain: {reason}")
+
+        # 5. Split
+        print("  Split data into train & test...")
+        X_train, X_test, y_train, y_test = split_train_test(X, y)
+
+        # 6. Train Model
+        print("  Start training of the model...")
+        model = train_model(
+            X_train,
+            y_train,
+            search=search,
+            early_stopping_rounds=early_stopping_rounds,
+            cache_path=SEARCH_CACHE_PATH if use_cache else None,
+            search_jobs=search_jobs,
+            fit_threads=fit_threads,
+        )
+
+        # 7. Evaluate model
+        print("  Evaluating model...")
+        rmse, mae, r2 = evaluate_model(model, X_test, y_test)
+
+        # 8. Metrics
+        print_metrics(rmse, mae, r2)
+
+        params = model.get_params()
+        state = {
+            "trained_rows": len(df),
+            "trained_hash": hash_rows(df, len(df)),
+            "params": {
+                name: params[name]
+                for name in ["n_estimators", "max_depth", "learning_rate"]
+            },
+            "rmse": rmse,
+            "full_trained_at": datetime.now().isoformat(timespec="seconds"),
+            "updates_since_full": 0,
+            # baseline of the drift signal
+            "sales_stats": sales_stats["models"],
+        }
+        training, evaluation = "full", "test split"
+
+    # 9. Save model (logics)
+    print("  Saving model...")
+    model_filename = get_model_filename(model_exists)
+    save_model(model, model_filename)
+    entry = register_model(
+        model,
+        {"rmse": rmse, "mae": mae, "r2": r2},
+        state["params"],
+        fingerprint_data(X, y),
+        trained_rows=len(df),
+        training=training,
+        evaluation=evaluation,
+        pickle=model_filename,
+    )
+    save_training_state({**state, "model": model_filename, "version": entry["version"]})
+    record_metrics(
+        training=training,
+        rows_out=state["trained_rows"],
+        version=entry["version"],
+        rmse=float(rmse),
+        mae=float(mae),
+        r2=float(r2),
+    )
+
+    # 10. Forecast lookup table of the new champion
+    if forecast_days > 0:
+        print("  Building forecast table...")
+        build_forecast_table(
+            model, load_vocabulary()["codes"], entry["version"], days=forecast_days
+        )
+
+    if hashes is not None:
+        save_stamp(
+            REGISTRY_DIR,
+            "train",
+            hashes,
+            [entry["path"], model_filename],
+            version=entry["version"],
+        )
+    return entry
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the sales prediction model.")
+    parser.add_argument(
+        "--search",
+        choices=["nested", "grid"],
+        default=SEARCH_MODE,
+        help=(
+            "nested: score all n_estimators from one booster (default), "
+            "grid: GridSearchCV"
+        ),
+    )
+    parser.add_argument(
+        "--early-stopping-rounds",
+        type=int,
+        default=None,
+        help="enable native early stopping in the nested search",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="force a full grid search retrain instead of a warm start",
+    )
+    parser.add_argument(
+        "--search-jobs",
+        type=int,
+        default=None,
+        help="concurrent fits in the search (default: derived from the cores)",
+    )
+    parser.add_argument(
+        "--fit-threads",
+        type=int,
+        default=None,
+        help="XGBoost threads per fit (default: derived from the available cores)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="always run the search, ignoring the search cache",
+    )
+    parser.add_argument(
+        "--forecast-days",
+        type=int,
+        default=FORECAST_DAYS,
+        help="horizon of the forecast table of the new champion, 0 to skip it",
+    )
+    parser.add_argument(
+        "--log-file",
+        default=None,
+        help="write the output to this log file instead of stdout (see src/runlog.py)",
+    )
+    args = parser.parse_args()
+    processed_path = PROCESSED_DIR
+
+    with stage_run("train", "model training", args.log_file):
+        try:
+            run_training(
+                processed_path=processed_path,
+                full=args.full,
+                search=args.search,
+                early_stopping_rounds=args.early_stopping_rounds,
+                search_jobs=args.search_jobs,
+                fit_threads=args.fit_threads,
+                use_cache=not args.no_cache,
+                forecast_days=args.forecast_days,
+            )
+
+        except FileNotFoundError as e:
+            print(f"  ERROR: File not found during training - {str(e)}")
+            raise
+        except ValueError as e:
+            print(f"  ERROR: Validation error in training - {str(e)}")
+            raise
+        except Exception as e:
+            print(
+                f"  ERROR: Unexpected error during model training. "
+                f"Operation: training XGBoost model on data from {processed_path}. "
+                f"Error type: {type(e).__name__}. "
+                f"Details: {str(e)}"
+            )
+            raise
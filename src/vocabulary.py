@@ -0,0 +1,101 @@
+"""
+-------------------------------------------------------------------------------
+Persistent vocabulary of graphics card models.
+
+The vocabulary maps every card model to a stable integer code and is stored
+in 'data/processed/vocabulary.json'. It is append-only: an unseen model gets
+the next free code, existing codes never change. Every change bumps the
+version and is recorded in the history.
+
+Stable codes keep already processed rows, trained models and cached
+predictions valid when a new card appears, so incremental preprocessing and
+warm-start training never need a full rebuild because of renumbering.
+-------------------------------------------------------------------------------
+"""
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+VOCABULARY_FILENAME = "vocabulary.json"
+VOCABULARY_PATH = f"data/processed/{VOCABULARY_FILENAME}"
+UNKNOWN_CODE = -1  # Code of models not in the vocabulary (see encode_models)
+
+
+def load_vocabulary(path: str = VOCABULARY_PATH) -> dict:
+    """Load the vocabulary, an empty version 0 vocabulary if none exists.
+
+    Args:
+        path: Path to vocabulary.json
+
+    Returns:
+        Dict with keys version, codes (model -> code) and history
+    """
+    path = Path(path)
+    if not path.exists():
+        return {"version": 0, "codes": {}, "history": []}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_vocabulary(vocabulary: dict, path: str = VOCABULARY_PATH) -> None:
+    """Write the vocabulary atomically."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(vocabulary, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def update_vocabulary(models, path: str = VOCABULARY_PATH) -> dict:
+    """Register unseen models and return the current vocabulary.
+
+    New models get the next free codes in sorted order, so the first
+    vocabulary matches the codes of sklearn's LabelEncoder.
+
+    Args:
+        models: Iterable of model names (duplicates allowed)
+        path: Path to vocabulary.json
+
+    Returns:
+        The (possibly updated) vocabulary
+    """
+    vocabulary = load_vocabulary(path)
+    codes = vocabulary["codes"]
+    unseen = sorted(set(pd.unique(pd.Series(models, dtype=object))) - set(codes))
+    if not unseen:
+        return vocabulary
+
+    for model in unseen:
+        codes[model] = len(codes)
+    vocabulary["version"] += 1
+    vocabulary["history"].append(
+        {
+            "version": vocabulary["version"],
+            "added": unseen,
+            "at": datetime.now().isoformat(timespec="seconds"),
+        }
+    )
+    save_vocabulary(vocabulary, path)
+    print(f"    Vocabulary v{vocabulary['version']}: added {unseen}")
+    return vocabulary
+
+
+def encode_models(models: pd.Series, codes: dict) -> np.ndarray:
+    """Encode model names with a vocabulary in one vectorized lookup.
+
+    Args:
+        models: Series of model names
+        codes: Mapping model -> code
+
+    Returns:
+        Integer codes, UNKNOWN_CODE for models not in the vocabulary
+    """
+    # categories in code order, so category positions are the codes
+    categories = sorted(codes, key=codes.get)
+    return pd.Categorical(models, categories=categories).codes.astype(np.int64)
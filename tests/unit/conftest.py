@@ -0,0 +1,37 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# the modules in src/ import each other as top-level modules
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src"))
+
+MODELS = ["rtx3060", "rtx3070", "rtx3080", "rtx3090", "rx6700"]
+
+
+@pytest.fixture
+def make_sales():
+    """Factory of raw rows (timestamp, model, sales), one per card model and minute."""
+
+    def make(rows: int, start: str = "2025-01-01T00:00:00Z", seed: int = 0):
+        timestamps = pd.date_range(start, periods=rows, freq="min")
+        sales = (pd.RangeIndex(rows) * 7 + seed) % 20
+        return pd.DataFrame(
+            {
+                "timestamp": timestamps.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "model": [MODELS[i % len(MODELS)] for i in range(rows)],
+                "sales": sales,
+            }
+        )
+
+    return make
+
+
+@pytest.fixture
+def raw_store(tmp_path, make_sales):
+    """Append-only raw store with a base file of 50 rows."""
+    raw_dir = tmp_path / "raw"
+    raw_dir.mkdir()
+    make_sales(50).to_csv(raw_dir / "sales_data.csv", index=False)
+    return raw_dir
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import run_backtest
+
+CANDIDATES = {
+    "small": {"n_estimators": 10, "max_depth": 3, "learning_rate": 0.3},
+    "large": {"n_estimators": 30, "max_depth": 3, "learning_rate": 0.3},
+    "deep": {"n_estimators": 10, "max_depth": 5, "learning_rate": 0.1},
+}
+
+
+@pytest.fixture
+def dataset():
+    hours = pd.date_range("2025-01-01", periods=600, freq="h")
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(
+        {
+            "model_encoded": np.arange(600) % 5,
+            "year": hours.year,
+            "month": hours.month,
+            "day_of_week": hours.dayofweek,
+            "day_of_month": hours.day,
+            "hour": hours.hour,
+        }
+    )
+    y = pd.Series(
+        X["model_encoded"] * 2 + X["hour"] % 6 + rng.integers(0, 3, 600), name="sales"
+    )
+    return X, y
+
+
+def test_backtest_in_worker_processes(dataset):
+    """Workers reading the shared matrix give the same metrics as one process."""
+    X, y = dataset
+    single = run_backtest(X, y, CANDIDATES, folds=3, jobs=1, fit_threads=1)
+    pooled = run_backtest(X, y, CANDIDATES, folds=3, jobs=2, fit_threads=1)
+
+    pd.testing.assert_frame_equal(
+        single.folds.drop(columns="fit_seconds"),
+        pooled.folds.drop(columns="fit_seconds"),
+    )
+    assert len(pooled.folds) == len(CANDIDATES) * 3
+    assert pooled.best == single.best
+    assert list(pooled.summary["folds"]) == [3] * len(CANDIDATES)
+
+
+def test_backtest_orders_rows_by_time(dataset):
+    """Origins follow the time order of the rows, not their order in the frame."""
+    X, y = dataset
+    shuffled = np.random.default_rng(1).permutation(len(X))
+    ordered = run_backtest(X, y, CANDIDATES, folds=3, jobs=1)
+    result = run_backtest(
+        X.iloc[shuffled], y.iloc[shuffled], CANDIDATES, folds=3, jobs=1
+    )
+
+    pd.testing.assert_frame_equal(
+        ordered.folds.drop(columns="fit_seconds"),
+        result.folds.drop(columns="fit_seconds"),
+    )
+    folds = result.folds[result.folds["candidate"] == "small"]
+    assert folds["origin"].is_monotonic_increasing
+    assert folds["train_rows"].is_monotonic_increasing
+
+
+def test_warm_refits_need_expanding_windows(dataset):
+    X, y = dataset
+    warm = run_backtest(X, y, CANDIDATES, folds=3, refit="warm", jobs=1)
+    assert len(warm.folds) == len(CANDIDATES) * 3
+    with pytest.raises(ValueError):
+        run_backtest(X, y, CANDIDATES, folds=3, refit="warm", window=200)
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from collect import ConnectionPool, collect, http_get, results_to_frame
+from mock_api import MockConfig, start_server
+
+RESPONSES = {
+    "/length": b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\n17",
+    "/chunked": (
+        b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n"
+        b"1;ext=1\r\n1\r\n2\r\n23\r\n0\r\nX-Trailer: 1\r\n\r\n"
+    ),
+    "/empty": b"HTTP/1.1 204 No Content\r\n\r\n",
+    "/close": b"HTTP/1.1 200 OK\r\nConnection: close\r\n\r\n42",
+    "/truncated": b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n5\r\n12",
+}
+
+
+async def scripted_server() -> asyncio.Server:
+    """Server answering every path of RESPONSES with its raw response."""
+
+    async def handle(reader, writer):
+        while request_line := await reader.readline():
+            while (await reader.readline()) not in (b"\r\n", b""):
+                pass
+            path = request_line.split()[1].decode()
+            writer.write(RESPONSES[path])
+            await writer.drain()
+            if path in ("/close", "/truncated"):
+                break
+        writer.close()
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+def fetch(paths: list[str]) -> list[tuple[int, str]]:
+    """GET the paths one after the other over a single pooled connection."""
+
+    async def main():
+        server = await scripted_server()
+        pool = ConnectionPool("127.0.0.1", server.sockets[0].getsockname()[1], 1)
+        try:
+            return [await asyncio.wait_for(http_get(pool, p), 2) for p in paths]
+        finally:
+            await pool.close()
+            server.close()
+
+    return asyncio.run(main())
+
+
+def test_http_get_body_framing():
+    # every framing leaves the keep-alive connection ready for the next request
+    assert fetch(["/length", "/chunked", "/empty", "/length", "/close"]) == [
+        (200, "17"),
+        (200, "123"),
+        (204, ""),
+        (200, "17"),
+        (200, "42"),
+    ]
+
+
+def test_http_get_after_close_opens_new_connection():
+    assert fetch(["/close", "/length"]) == [(200, "42"), (200, "17")]
+
+
+def test_http_get_truncated_chunk():
+    with pytest.raises(EOFError):
+        fetch(["/truncated"])
+
+
+def collect_from_mock(config: MockConfig, **kwargs):
+    async def main():
+        server = await start_server(config, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            return await collect(api_url=f"http://127.0.0.1:{port}/", **kwargs)
+        finally:
+            server.close()
+
+    return asyncio.run(main())
+
+
+def test_collect_all_models():
+    results = collect_from_mock(MockConfig(seed=0))
+    df = results_to_frame(results)
+    assert df["model"].tolist() == [r.model for r in results]
+    assert df["sales"].between(0, 30).all()
+    assert all(r.error is None and r.attempts == 1 for r in results)
+
+
+def test_hanging_api_times_out():
+    results = collect_from_mock(
+        MockConfig(hang_rate=1.0), timeout=0.1, max_retries=1, backoff=0.01
+    )
+    assert results_to_frame(results).empty
+    assert all(r.attempts == 2 and r.error.startswith("Timeout") for r in results)
+    assert max(r.latency for r in results) < 1
+
+
+def test_invalid_responses_are_not_retried():
+    results = collect_from_mock(MockConfig(invalid_rate=1.0, seed=0))
+    assert all(r.attempts == 1 and "not a number" in r.error for r in results)
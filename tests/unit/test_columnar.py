@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from columnar import append_columnar, load_columnar, read_schema, save_columnar
+
+
+def load(path):
+    """Columnar dataset as a regular int64 dataframe."""
+    return load_columnar(path).astype("int64")
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    path = tmp_path / "sales_processed_20250101_0000.cols"
+    df = pd.DataFrame({"sales": np.arange(10) % 20, "hour": np.arange(10) % 24})
+    save_columnar(df, path)
+    return path, df
+
+
+def test_save_uses_smallest_dtypes(dataset):
+    path, df = dataset
+    schema = read_schema(path)
+    assert [c["dtype"] for c in schema["columns"]] == ["|u1", "|u1"]
+    assert schema["rows"] == 10
+    pd.testing.assert_frame_equal(load(path), df)
+
+
+def test_append_extends_in_place(dataset):
+    path, df = dataset
+    new = pd.DataFrame({"sales": [3, 4], "hour": [5, 6]})
+    assert append_columnar(new, path) == 12
+
+    expected = pd.concat([df, new], ignore_index=True)
+    pd.testing.assert_frame_equal(load(path), expected)
+    assert (path / "sales.bin").stat().st_size == 12
+
+
+def test_append_widens_column_into_new_file(dataset):
+    path, df = dataset
+    view = load_columnar(path)
+    new = pd.DataFrame({"sales": [-1, 70_000], "hour": [1, 2]})
+    append_columnar(new, path)
+
+    schema = read_schema(path)
+    sales = schema["columns"][0]
+    assert sales["dtype"] == "<i4"
+    assert sales["file"] == "sales.int32.bin"
+    assert not (path / "sales.bin").exists()
+    # the narrow column stays appended in place
+    assert "file" not in schema["columns"][1]
+
+    expected = pd.concat([df, new], ignore_index=True)
+    pd.testing.assert_frame_equal(load(path), expected)
+    # readers mapping the old file still see the rows of their schema
+    pd.testing.assert_frame_equal(view.astype("int64"), df)
+
+
+def test_interrupted_widening_keeps_dataset(dataset, monkeypatch):
+    path, df = dataset
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr("columnar.write_schema", fail)
+    with pytest.raises(OSError):
+        append_columnar(pd.DataFrame({"sales": [300], "hour": [1]}), path)
+
+    pd.testing.assert_frame_equal(load(path), df)
+    monkeypatch.undo()
+    append_columnar(pd.DataFrame({"sales": [4], "hour": [1]}), path)
+    assert load(path)["sales"].tolist() == df["sales"].tolist() + [4]
+
+
+def test_append_rejects_other_columns(dataset):
+    path, _ = dataset
+    with pytest.raises(ValueError):
+        append_columnar(pd.DataFrame({"hour": [1], "sales": [2]}), path)
+
+
+def test_save_replaces_widened_dataset(dataset):
+    path, df = dataset
+    append_columnar(pd.DataFrame({"sales": [300], "hour": [1]}), path)
+    save_columnar(df, path)
+
+    assert "file" not in read_schema(path)["columns"][0]
+    assert not (path / "sales.uint16.bin").exists()
+    pd.testing.assert_frame_equal(load(path), df)
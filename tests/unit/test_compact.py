@@ -0,0 +1,92 @@
+import json
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from compact import RetentionPolicy, compact_raw, plan_compaction
+from helper import append_segment, find_latest_csv_file, load_data, read_manifest
+
+SEGMENTS = [
+    "sales_20250101_0100.csv",
+    "sales_20250101_0200.csv",
+    "sales_20250101_0300.csv",
+    "sales_20250102_0100.csv",
+    "sales_20250102_0200.csv",
+    "sales_20250102_0300.csv",
+]
+
+
+@pytest.fixture
+def store(raw_store, make_sales):
+    for i, name in enumerate(SEGMENTS):
+        append_segment(
+            raw_store, make_sales(5, start=f"2025-01-0{i + 1}T00:00:00Z"), name
+        )
+    return raw_store
+
+
+def names(raw_dir: Path) -> list[str]:
+    return [path.name for path, _ in read_manifest(raw_dir)]
+
+
+@pytest.mark.parametrize("keep_segments", [0, 2])
+def test_compaction_keeps_newest_delta(tmp_path, store, keep_segments):
+    expected = load_data(store / SEGMENTS[-1])
+    summary = compact_raw(str(store), str(tmp_path / "processed"), keep_segments)
+
+    # the newest sales_*.csv is never merged, so it stays the latest file
+    latest = find_latest_csv_file(str(store))
+    assert latest == store / SEGMENTS[-1]
+    # tests/test_collect.py reads the newest sales_*.csv by modification time
+    assert max(store.glob("sales_*.csv"), key=lambda f: f.stat().st_mtime) == latest
+    pd.testing.assert_frame_equal(load_data(latest), expected)
+    assert summary["duplicates_removed"] == 0
+    assert summary["bytes_freed"] > 0
+
+    if keep_segments == 2:
+        # a lone delta of the second day is left as it is
+        expected_names = ["sales_compacted_20250101_0300.csv.gz", *SEGMENTS[3:]]
+    else:
+        expected_names = [
+            "sales_compacted_20250101_0300.csv.gz",
+            "sales_compacted_20250102_0200.csv.gz",
+            SEGMENTS[-1],
+        ]
+    assert names(store) == ["sales_data.csv", *expected_names]
+    for name in set(SEGMENTS) - set(expected_names):
+        assert not (store / name).exists()
+
+
+def test_compaction_drops_duplicates_and_watermark(tmp_path, store, make_sales):
+    processed = tmp_path / "processed"
+    processed.mkdir()
+    (processed / "watermark.json").write_text(json.dumps({"raw_rows": 80}))
+    duplicate = make_sales(5, start="2025-01-04T00:00:00Z")  # as 20250102_0100
+    append_segment(store, duplicate, "sales_20250102_0400.csv")
+    append_segment(store, make_sales(5, seed=3), "sales_20250102_0500.csv")
+
+    summary = compact_raw(str(store), str(processed), keep_segments=1)
+
+    assert summary["duplicates_removed"] == 5
+    assert not (processed / "watermark.json").exists()
+    latest = find_latest_csv_file(str(store))
+    assert latest.name == "sales_20250102_0500.csv"
+    data = load_data(latest)
+    assert len(data) == 50 + 7 * 5 and not data.iloc[50:-5].duplicated().any()
+
+
+def test_plan_needs_two_segments_of_a_day(store):
+    manifest = read_manifest(store)
+    # one delta per day left after the kept segments: nothing to merge
+    assert plan_compaction(manifest[:2] + manifest[4:5], keep_segments=0) == []
+    assert plan_compaction(manifest, keep_segments=1) == [[1, 2, 3], [4, 5]]
+
+
+def test_retention_policy_keeps_newest_and_daily():
+    stamps = ["20250101_0100", "20250101_0200", "20250102_0100", "20250103_0100"]
+    assert RetentionPolicy(keep_last=1, keep_daily=2).select(stamps) == {
+        "20250102_0100",
+        "20250103_0100",
+    }
+    assert RetentionPolicy(keep_last=0, keep_daily=0).select(stamps) == set()
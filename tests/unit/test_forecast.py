@@ -0,0 +1,78 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+import xgboost as xgb
+
+from forecast import (
+    ForecastTable,
+    build_forecast_grid,
+    build_forecast_table,
+    forecast_expires,
+)
+from preprocessed import build_feature_pipeline
+
+START = pd.Timestamp("2025-06-01T00:00:00Z")
+
+
+@pytest.fixture
+def codes(make_sales):
+    return {model: code for code, model in enumerate(make_sales(5)["model"])}
+
+
+@pytest.fixture
+def model(make_sales, codes):
+    rows = make_sales(200)
+    features = build_feature_pipeline(codes).run(rows)
+    return xgb.XGBRegressor(n_estimators=5, n_jobs=1).fit(features, rows["sales"])
+
+
+@pytest.fixture
+def meta_path(tmp_path):
+    return str(tmp_path / "model" / "forecast.json")
+
+
+def test_lookup_matches_predict(model, codes, meta_path):
+    build_forecast_table(model, codes, 1, days=1, start=START, meta_path=meta_path)
+    table = ForecastTable(meta_path)
+
+    queries = pd.DataFrame(
+        {"model": list(codes), "timestamp": ["2025-06-01T05:30:00Z"] * len(codes)}
+    )
+    expected = model.predict(build_feature_pipeline(codes).run(queries))
+    for query, prediction in zip(queries.itertuples(), expected):
+        assert table.lookup(query.model, query.timestamp) == pytest.approx(prediction)
+    assert table.lookup("rtx5090", "2025-06-01T05:00:00Z") is None
+    assert table.lookup("rtx3060", "2025-06-02T00:00:00Z") is None
+
+
+def test_grid_is_model_major(codes):
+    grid = build_forecast_grid(codes, START, 3)
+    assert len(grid) == 3 * len(codes)
+    assert grid["model_encoded"].tolist() == np.repeat(list(codes.values()), 3).tolist()
+    assert grid["hour"].tolist() == [0, 1, 2] * len(codes)
+
+
+def test_previous_table_deleted_one_generation_late(model, codes, meta_path):
+    directory = Path(meta_path).parent
+    names = []
+    for hours in range(3):
+        start = START + pd.Timedelta(hours=hours)
+        meta = build_forecast_table(
+            model, codes, 1, days=1, start=start, meta_path=meta_path
+        )
+        names.append(meta["table"])
+
+    assert len(set(names)) == 3
+    # a reader that loaded the previous JSON can still open its table
+    assert sorted(path.name for path in directory.glob("*.npy")) == names[1:]
+
+
+def test_forecast_expires():
+    meta = {"start": "2025-06-01T00:00:00Z", "hours": 48}
+    assert forecast_expires(None)
+    assert not forecast_expires(meta, 24, now=START)
+    assert not forecast_expires(meta, 24, now=START + pd.Timedelta(hours=23))
+    assert forecast_expires(meta, 24, now=START + pd.Timedelta(hours=24))
+    assert forecast_expires(meta, 0, now=START + pd.Timedelta(days=3))
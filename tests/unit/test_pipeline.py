@@ -0,0 +1,60 @@
+import pytest
+
+import pipeline
+from pipeline import PipelineRunner
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(pipeline.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(pipeline.time, "sleep", clock.sleep)
+    return clock
+
+
+def test_interval_shorter_than_segment_resolution_rejected():
+    with pytest.raises(ValueError, match="too short"):
+        PipelineRunner().run_forever(interval=30, cycles=2)
+
+
+def test_slow_cycle_skips_missed_slots(clock, monkeypatch):
+    durations = iter([10, 150, 10, 10])
+    starts = []
+
+    def run_cycle():
+        starts.append(clock.now)
+        clock.now += next(durations)
+
+    runner = PipelineRunner()
+    monkeypatch.setattr(runner, "run_cycle", run_cycle)
+    runner.run_forever(interval=60, cycles=4)
+
+    # the cycle due at 120s is skipped instead of starting right after the slow one
+    assert starts == [0, 60, 240, 300]
+
+
+def test_failed_cycle_keeps_schedule(clock, monkeypatch, capsys):
+    starts = []
+
+    def run_cycle():
+        starts.append(clock.now)
+        clock.now += 5
+        raise RuntimeError("API down")
+
+    runner = PipelineRunner()
+    monkeypatch.setattr(runner, "run_cycle", run_cycle)
+    runner.run_forever(interval=60, cycles=3)
+
+    assert starts == [0, 60, 120]
+    assert capsys.readouterr().out.count("RuntimeError: API down") == 3
@@ -0,0 +1,130 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+import pytest
+import xgboost as xgb
+
+from predict import predict_batch
+from preprocessed import build_feature_pipeline
+from serve import PredictionServer
+
+
+@pytest.fixture
+def codes(make_sales):
+    return {model: code for code, model in enumerate(make_sales(5)["model"])}
+
+
+@pytest.fixture
+def model(make_sales, codes):
+    rows = make_sales(200)
+    features = build_feature_pipeline(codes).run(rows)
+    return xgb.XGBRegressor(n_estimators=5, n_jobs=1).fit(features, rows["sales"])
+
+
+@pytest.fixture
+def queries(make_sales):
+    queries = make_sales(20, start="2025-06-01T00:00:00Z")[["model", "timestamp"]]
+    queries.loc[[3, 12], "model"] = "rtx5090"
+    queries.loc[7, "timestamp"] = "invalid"
+    return queries
+
+
+def test_predict_batch_matches_single_queries(model, codes, queries):
+    pipeline = build_feature_pipeline(codes)
+    predictions = predict_batch(model, queries, pipeline)
+
+    valid = queries.drop(index=7)
+    assert predictions["model"].tolist() == valid["model"].tolist()
+    assert predictions["timestamp"].tolist() == valid["timestamp"].tolist()
+    for query, prediction in zip(valid.itertuples(), predictions["prediction"]):
+        if query.model == "rtx5090":
+            continue
+        single = predict_batch(model, pd.DataFrame([query._asdict()]), pipeline)
+        assert prediction == pytest.approx(single["prediction"].iloc[0])
+
+
+@pytest.mark.parametrize("first", ["invalid", "2025-06-01 05:00", "01/06/2025"])
+def test_malformed_first_query_does_not_drop_the_others(model, codes, queries, first):
+    pipeline = build_feature_pipeline(codes)
+    expected = predict_batch(model, queries, pipeline).set_index("timestamp")
+
+    queries.loc[0, "timestamp"] = first
+    predictions = predict_batch(model, queries, pipeline)
+
+    # every valid query of the API format is still scored, with the same result
+    api = predictions[predictions["timestamp"].str.endswith("Z")]
+    assert len(api) == len(expected) - 1
+    pd.testing.assert_frame_equal(
+        api.set_index("timestamp"), expected.loc[api["timestamp"]]
+    )
+    assert (predictions["timestamp"] == first).sum() == (first != "invalid")
+
+
+def test_predictions_do_not_depend_on_row_order(model, codes, queries):
+    queries.loc[[0, 5], "timestamp"] = ["2025-06-01 05:00", "2025-06-01T07:00:00+02:00"]
+    pipeline = build_feature_pipeline(codes)
+    predictions = predict_batch(model, queries, pipeline)
+    reversed_predictions = predict_batch(model, queries.iloc[::-1], pipeline)
+
+    pd.testing.assert_frame_equal(
+        reversed_predictions.iloc[::-1].reset_index(drop=True),
+        predictions.reset_index(drop=True),
+    )
+    # queries in other formats are parsed on their own, offsets converted to UTC
+    hours = pipeline.run(queries.loc[[0, 5]])["hour"].tolist()
+    assert hours == [5, 5]
+
+
+def test_unknown_models_are_not_scored(model, codes, queries):
+    predictions = predict_batch(model, queries, build_feature_pipeline(codes))
+
+    unknown = predictions["model"] == "rtx5090"
+    assert predictions["unknown_model"].tolist() == unknown.tolist()
+    assert predictions.loc[unknown, "prediction"].isna().all()
+    assert predictions.loc[~unknown, "prediction"].notna().all()
+
+
+def test_only_unknown_models(model, codes, queries):
+    queries["model"] = "rtx5090"
+    predictions = predict_batch(model, queries, build_feature_pipeline(codes))
+    assert predictions["unknown_model"].all()
+    assert predictions["prediction"].isna().all()
+
+
+def test_server_flags_unknown_models(model, codes, queries):
+    pipeline = build_feature_pipeline(codes)
+    predictions, unknown = PredictionServer().score((model, pipeline, 1), queries)
+
+    assert np.flatnonzero(unknown).tolist() == [3, 12]
+    assert np.flatnonzero(np.isnan(predictions)).tolist() == [3, 7, 12]
+    expected = predict_batch(model, queries, pipeline)["prediction"].to_numpy()
+    np.testing.assert_allclose(np.delete(predictions, 7), expected)
+
+
+async def route_batch(server: PredictionServer, queries: pd.DataFrame) -> list[int]:
+    """Status codes of concurrent /predict requests scored as one micro-batch."""
+    worker = asyncio.create_task(server.run_batches())
+    try:
+        responses = await asyncio.gather(
+            *(
+                server.route("/predict", {"model": [model], "timestamp": [timestamp]})
+                for model, timestamp in queries.itertuples(index=False)
+            )
+        )
+    finally:
+        worker.cancel()
+    return [int(response.split()[1]) for response in responses]
+
+
+def test_malformed_query_does_not_fail_the_batch(model, codes, queries):
+    server = PredictionServer(max_batch=len(queries), max_delay=1.0)
+    server.current = (model, build_feature_pipeline(codes), 1)
+    queries.loc[0, "timestamp"] = "2025-06-01 05:00"
+    queries.loc[7, "timestamp"] = "2025-06-01T07:00:00Z"
+
+    statuses = asyncio.run(route_batch(server, queries))
+
+    assert server.batches == 1
+    # only the queries of unknown models are rejected
+    assert [i for i, status in enumerate(statuses) if status != 200] == [3, 12]
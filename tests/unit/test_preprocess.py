@@ -0,0 +1,128 @@
+import json
+
+import pandas as pd
+import pytest
+
+import preprocessed
+from columnar import load_columnar
+from helper import append_segment
+from preprocessed import OUTPUT_COLUMNS, run_full, run_incremental
+
+
+@pytest.fixture
+def raw_dir(raw_store, make_sales):
+    """Raw store with invalid timestamps and negative sales in every segment."""
+    for i, name in enumerate(["sales_20250101_0100.csv", "sales_20250101_0200.csv"]):
+        delta = make_sales(23, start=f"2025-01-01T0{i + 1}:00:00Z", seed=i)
+        delta.loc[[3, 17], "timestamp"] = ["invalid", "2025-01-01 10:00"]
+        delta.loc[[5, 11], "sales"] = -1
+        delta.loc[8, "model"] = f"new{i}"
+        append_segment(raw_store, delta, name)
+    return str(raw_store)
+
+
+def outputs(processed_dir) -> dict:
+    """Processed CSV, columnar dataset and vocabulary of a run."""
+    state = json.loads((processed_dir / "watermark.json").read_text())
+    csv_name, cols_name = state["outputs"]
+    vocabulary = json.loads((processed_dir / "vocabulary.json").read_text())
+    stats = json.loads((processed_dir / "sales_stats.json").read_text())
+    return {
+        "names": state["outputs"],
+        "raw_rows": state["raw_rows"],
+        "csv": pd.read_csv(processed_dir / csv_name),
+        "columnar": load_columnar(processed_dir / cols_name).astype("int64"),
+        "codes": vocabulary["codes"],
+        "stats": stats["models"],
+    }
+
+
+def assert_same_outputs(streamed: dict, in_memory: dict):
+    assert streamed["names"] == in_memory["names"]
+    assert streamed["raw_rows"] == in_memory["raw_rows"]
+    assert streamed["codes"] == in_memory["codes"]
+    pd.testing.assert_frame_equal(streamed["csv"], in_memory["csv"])
+    pd.testing.assert_frame_equal(streamed["columnar"], in_memory["columnar"])
+    assert streamed["stats"].keys() == in_memory["stats"].keys()
+    for model, expected in in_memory["stats"].items():
+        buckets = streamed["stats"][model].pop("buckets")
+        assert buckets == expected.pop("buckets")
+        assert streamed["stats"][model] == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("chunksize", [1, 7, 1000])
+def test_streaming_full_matches_in_memory(tmp_path, raw_dir, chunksize):
+    in_memory, streamed = tmp_path / "in_memory", tmp_path / "streamed"
+    in_memory.mkdir()
+    streamed.mkdir()
+
+    result = run_full(raw_dir, str(in_memory))
+    run_full(raw_dir, str(streamed), chunksize=chunksize)
+
+    expected = outputs(in_memory)
+    assert list(expected["csv"].columns) == OUTPUT_COLUMNS
+    assert len(expected["csv"]) == len(result.rows) == 50 + 2 * 19
+    pd.testing.assert_frame_equal(expected["csv"], result.rows.reset_index(drop=True))
+    assert_same_outputs(outputs(streamed), expected)
+
+
+def test_streaming_incremental_matches_in_memory(tmp_path, raw_store, raw_dir):
+    in_memory, streamed = tmp_path / "in_memory", tmp_path / "streamed"
+    in_memory.mkdir()
+    streamed.mkdir()
+    run_full(raw_dir, str(in_memory))
+    run_full(raw_dir, str(streamed), chunksize=7)
+
+    delta = pd.read_csv(raw_store / "sales_20250101_0200.csv")
+    delta["model"] = delta["model"].replace("new1", "new2")
+    append_segment(raw_store, delta, "sales_20250101_0300.csv")
+    run_incremental(raw_dir, str(in_memory))
+    run_incremental(raw_dir, str(streamed), chunksize=7)
+
+    expected = outputs(in_memory)
+    assert expected["raw_rows"] == 50 + 3 * 23
+    assert "new2" in expected["codes"]
+    assert_same_outputs(outputs(streamed), expected)
+
+
+@pytest.mark.parametrize("first", ["2025-01-01 10:00", "", "invalid"])
+def test_streaming_infers_format_from_first_row(tmp_path, raw_store, raw_dir, first):
+    # the format is inferred from the first raw row, not from every chunk
+    base = pd.read_csv(raw_store / "sales_data.csv")
+    base.loc[0, "timestamp"] = first
+    base.to_csv(raw_store / "sales_data.csv", index=False)
+    in_memory, streamed = tmp_path / "in_memory", tmp_path / "streamed"
+    in_memory.mkdir()
+    streamed.mkdir()
+
+    run_full(raw_dir, str(in_memory))
+    run_full(raw_dir, str(streamed), chunksize=1)
+
+    assert_same_outputs(outputs(streamed), outputs(in_memory))
+
+
+@pytest.mark.parametrize("chunksize", [None, 7])
+def test_interrupted_incremental_run_does_not_duplicate_rows(
+    tmp_path, raw_store, raw_dir, monkeypatch, chunksize
+):
+    clean, interrupted = tmp_path / "clean", tmp_path / "interrupted"
+    clean.mkdir()
+    interrupted.mkdir()
+    run_full(raw_dir, str(clean), chunksize=chunksize)
+    run_full(raw_dir, str(interrupted), chunksize=chunksize)
+
+    delta = pd.read_csv(raw_store / "sales_20250101_0200.csv")
+    append_segment(raw_store, delta, "sales_20250101_0300.csv")
+    run_incremental(raw_dir, str(clean), chunksize=chunksize)
+
+    # crash after the outputs were extended, before the rename and the watermark
+    def crash(*args):
+        raise KeyboardInterrupt
+
+    with monkeypatch.context() as patch:
+        patch.setattr(preprocessed, "rename_processed_outputs", crash)
+        with pytest.raises(KeyboardInterrupt):
+            run_incremental(raw_dir, str(interrupted), chunksize=chunksize)
+    run_incremental(raw_dir, str(interrupted), chunksize=chunksize)
+
+    assert_same_outputs(outputs(interrupted), outputs(clean))
@@ -0,0 +1,38 @@
+import json
+
+from runlog import record_metrics, stage_run
+
+
+def run_history(path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_stage_reports_its_own_peak_increase(tmp_path, monkeypatch):
+    history, events = tmp_path / "runs.jsonl", tmp_path / "events.jsonl"
+    # process peak at the start and the end of every stage
+    peaks = iter([100.0, 300.0, 300.0, 300.0])
+    monkeypatch.setattr("runlog.peak_rss_mb", lambda: next(peaks))
+
+    with stage_run("large", "large stage", history_path=history, events_path=events):
+        record_metrics(rows_in=10)
+    with stage_run("small", "small stage", history_path=history, events_path=events):
+        print("  below the peak of the large stage")
+
+    large, small = run_history(history)
+    assert large["process_peak_rss_mb"] == small["process_peak_rss_mb"] == 300.0
+    assert large["peak_rss_increase_mb"] == 200.0
+    assert small["peak_rss_increase_mb"] == 0.0
+    assert large["rows_in"] == 10
+    assert "peak_rss_mb" not in small
+
+
+def test_unknown_peak(tmp_path, monkeypatch):
+    history = tmp_path / "runs.jsonl"
+    monkeypatch.setattr("runlog.peak_rss_mb", lambda: None)
+
+    with stage_run("stage", "stage", history_path=history, events_path=tmp_path / "e"):
+        pass
+
+    (entry,) = run_history(history)
+    assert entry["process_peak_rss_mb"] is None
+    assert entry["peak_rss_increase_mb"] is None
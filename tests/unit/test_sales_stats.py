@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sales_stats import (
+    SKETCH_ACCURACY,
+    compute_drift,
+    empty_sales_stats,
+    get_quantile,
+    get_std,
+    merge_model_stats,
+    subtract_model_stats,
+    summarize_batch,
+    update_sales_stats,
+)
+
+
+def batch(sales, model="rtx3060"):
+    return pd.Series([model] * len(sales)), pd.Series(sales)
+
+
+@pytest.fixture
+def sales():
+    rng = np.random.default_rng(0)
+    values = rng.poisson(8, 1000).astype(float)
+    values[::97] = -1
+    return values
+
+
+def assert_same_stats(result: dict, expected: dict):
+    assert result["count"] == expected["count"]
+    assert result["mean"] == pytest.approx(expected["mean"])
+    assert result["m2"] == pytest.approx(expected["m2"])
+    for key in ["negative", "zeros", "buckets"]:
+        assert result[key] == expected[key]
+
+
+def test_merge_matches_single_pass(sales):
+    whole = summarize_batch(*batch(sales))["rtx3060"]
+    a = summarize_batch(*batch(sales[:300]))["rtx3060"]
+    b = summarize_batch(*batch(sales[300:]))["rtx3060"]
+
+    merged = merge_model_stats(a, b)
+    assert_same_stats(merged, whole)
+    assert (merged["min"], merged["max"]) == (whole["min"], whole["max"])
+    valid = sales[sales >= 0]
+    assert merged["mean"] == pytest.approx(valid.mean())
+    assert get_std(merged) == pytest.approx(valid.std(ddof=1))
+
+
+def test_running_stats_are_chunk_independent(sales):
+    models = pd.Series(np.resize(["rtx3060", "rtx3070", "rx6700"], len(sales)))
+    whole = update_sales_stats(empty_sales_stats(), models, pd.Series(sales))
+    chunked = empty_sales_stats()
+    for start in range(0, len(sales), 70):
+        chunk = slice(start, start + 70)
+        update_sales_stats(chunked, models[chunk], pd.Series(sales[chunk]))
+
+    assert chunked["raw_rows"] == whole["raw_rows"] == len(sales)
+    for model, expected in whole["models"].items():
+        assert_same_stats(chunked["models"][model], expected)
+
+
+def test_subtract_recovers_new_rows(sales):
+    base = summarize_batch(*batch(sales[:600]))["rtx3060"]
+    new = summarize_batch(*batch(sales[600:]))["rtx3060"]
+
+    assert_same_stats(subtract_model_stats(merge_model_stats(base, new), base), new)
+    assert subtract_model_stats(base, base)["count"] == 0
+
+
+def test_quantiles_within_sketch_accuracy():
+    sales = np.random.default_rng(1).lognormal(3, 1, 5000).round()
+    stats = summarize_batch(*batch(sales))["rtx3060"]
+    ordered = np.sort(sales)
+    for q in [0.01, 0.25, 0.5, 0.9, 0.99]:
+        expected = ordered[int(q * (len(sales) - 1))]
+        assert get_quantile(stats, q) == pytest.approx(expected, rel=SKETCH_ACCURACY)
+
+
+def test_drift_of_new_rows(sales):
+    base = {"rtx3060": summarize_batch(*batch(sales[:500]))["rtx3060"]}
+    same = update_sales_stats(
+        {"raw_rows": 0, "models": {k: dict(v) for k, v in base.items()}},
+        *batch(sales[500:]),
+    )
+    drift = compute_drift(same["models"], base)
+    assert drift["stable"] and not drift["drifted"]
+
+    shifted = update_sales_stats(
+        {"raw_rows": 0, "models": {k: dict(v) for k, v in base.items()}},
+        *batch(sales[500:] * 3),
+    )
+    drift = compute_drift(shifted["models"], base)
+    assert drift["drifted"]
+    assert drift["models"]["rtx3060"]["rows"] == 500 - (sales[500:] < 0).sum()
+
+    assert compute_drift(same["models"], None) is None
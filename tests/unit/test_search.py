@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xgboost as xgb
+from sklearn.model_selection import GridSearchCV
+
+from search import NestedGridSearchCV
+
+PARAM_GRID = {
+    "n_estimators": [5, 10, 20],
+    "max_depth": [2, 4],
+    "learning_rate": [0.1, 0.3],
+}
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.integers(0, 24, (300, 4)), columns=list("abcd"))
+    y = pd.Series(X["a"] % 7 + X["b"] * 0.5 + rng.normal(0, 1, 300))
+    return X, y
+
+
+def base_model():
+    return xgb.XGBRegressor(random_state=42, tree_method="hist", n_jobs=1)
+
+
+def test_nested_search_matches_grid_search(data):
+    X, y = data
+    grid = GridSearchCV(
+        base_model(), PARAM_GRID, cv=3, scoring="neg_mean_squared_error"
+    ).fit(X, y)
+    nested = NestedGridSearchCV(base_model(), PARAM_GRID, cv=3, n_jobs=2).fit(X, y)
+
+    assert nested.cv_results_["params"] == grid.cv_results_["params"]
+    for key in ["mean_test_score", "split0_test_score", "split2_test_score"]:
+        np.testing.assert_allclose(
+            nested.cv_results_[key], grid.cv_results_[key], rtol=1e-6
+        )
+    np.testing.assert_array_equal(
+        nested.cv_results_["rank_test_score"], grid.cv_results_["rank_test_score"]
+    )
+    assert nested.best_params_ == grid.best_params_
+    assert nested.best_score_ == pytest.approx(grid.best_score_, rel=1e-6)
+    np.testing.assert_allclose(
+        nested.best_estimator_.predict(X), grid.best_estimator_.predict(X), rtol=1e-6
+    )
+
+
+def test_early_stopping_scores_best_iteration(data):
+    X, y = data
+    grid = {**PARAM_GRID, "n_estimators": [5, 10, 200], "learning_rate": [0.3]}
+    full = NestedGridSearchCV(base_model(), grid, cv=3).fit(X, y)
+    stopped = NestedGridSearchCV(base_model(), grid, cv=3, early_stopping_rounds=2)
+    stopped.fit(X, y)
+
+    # rounds before the stop score the same, the largest never scores worse
+    scores, stopped_scores = (
+        search.cv_results_["mean_test_score"] for search in (full, stopped)
+    )
+    np.testing.assert_allclose(stopped_scores[::3], scores[::3], rtol=1e-6)
+    assert (stopped_scores[2::3] >= scores[2::3] - 1e-9).all()
+
+
+def test_grid_without_n_estimators_is_rejected():
+    with pytest.raises(ValueError):
+        NestedGridSearchCV(base_model(), {"max_depth": [2, 4]})
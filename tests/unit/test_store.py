@@ -0,0 +1,77 @@
+import pandas as pd
+import pytest
+
+from helper import (
+    INDEX_FILENAME,
+    append_segment,
+    count_logical_rows,
+    find_latest_csv_file,
+    find_snapshots_since,
+    load_data,
+    load_data_since,
+    read_manifest,
+    resolve_segments,
+)
+
+
+def test_append_segment_registers_manifest_and_index(raw_store, make_sales):
+    """Segments are listed in the manifest after the base file and indexed."""
+    first = append_segment(raw_store, make_sales(5, seed=1), "sales_20250101_0100.csv")
+    second = append_segment(raw_store, make_sales(3, seed=2), "sales_20250101_0200.csv")
+
+    manifest = read_manifest(raw_store)
+    assert [(path.name, rows) for path, rows in manifest] == [
+        ("sales_data.csv", 50),
+        ("sales_20250101_0100.csv", 5),
+        ("sales_20250101_0200.csv", 3),
+    ]
+    assert resolve_segments(first) == [manifest[0][0], first]
+    assert count_logical_rows(second) == 58
+    assert [ts for ts, _, _ in find_snapshots_since(raw_store)] == [
+        "20250101_0100",
+        "20250101_0200",
+    ]
+
+
+def test_append_segment_never_rewrites(raw_store, make_sales):
+    append_segment(raw_store, make_sales(5), "sales_20250101_0100.csv")
+    with pytest.raises(FileExistsError):
+        append_segment(raw_store, make_sales(5), "sales_20250101_0100.csv")
+
+
+def test_load_data_concatenates_segments(raw_store, make_sales):
+    """Loading a segment returns the logical dataset up to that segment."""
+    base = pd.read_csv(raw_store / "sales_data.csv")
+    deltas = [make_sales(5, seed=1), make_sales(4, seed=2)]
+    first = append_segment(raw_store, deltas[0], "sales_20250101_0100.csv")
+    second = append_segment(raw_store, deltas[1], "sales_20250101_0200.csv")
+
+    expected = pd.concat([base, *deltas], ignore_index=True)
+    pd.testing.assert_frame_equal(load_data(second), expected)
+    assert len(load_data(first)) == 55
+
+    new_rows, total = load_data_since(second, 52)
+    assert total == 59
+    pd.testing.assert_frame_equal(new_rows, expected.iloc[52:].reset_index(drop=True))
+
+
+def test_find_latest_csv_file_uses_index(raw_store, make_sales):
+    """The last index entry wins over file names, a stale index is rebuilt."""
+    append_segment(raw_store, make_sales(5), "sales_20250101_0200.csv")
+    latest = append_segment(raw_store, make_sales(5), "sales_20250101_0300.csv")
+    assert find_latest_csv_file(raw_store) == latest
+
+    # a file the index does not know yet is only found by the rebuild
+    latest.unlink()
+    assert find_latest_csv_file(raw_store) == raw_store / "sales_20250101_0200.csv"
+    assert "sales_20250101_0300.csv" not in (raw_store / INDEX_FILENAME).read_text()
+
+
+def test_find_snapshots_since_is_exclusive(raw_store, make_sales):
+    for hour in range(1, 4):
+        append_segment(raw_store, make_sales(2), f"sales_20250101_0{hour}00.csv")
+    since = find_snapshots_since(raw_store, "20250101_0100")
+    assert [path.name for _, _, path in since] == [
+        "sales_20250101_0200.csv",
+        "sales_20250101_0300.csv",
+    ]
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from preprocessed import parse_timestamps, temporal_features
+
+MALFORMED = [
+    "2025-01-01 10:00",
+    "01/02/2025",
+    "2025-13-01T00:00:00Z",
+    "2025-02-30T10:00:00Z",
+    "2025-01-01T10:00:00.5Z",
+    "2025-01-01T10:00:00+0000",
+    "2025-1-1T10:00:00Z",
+    "",
+    "invalid",
+    None,
+]
+
+
+def convert_timestamps(df: pd.DataFrame) -> pd.DataFrame:
+    """Original convert_timestamps (without the logging)."""
+    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+    return df.dropna(subset=["timestamp"]).reset_index(drop=True)
+
+
+def extract_temporal_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Original extract_temporal_features (without the logging)."""
+    df["year"] = df["timestamp"].dt.year.astype(int)
+    df["hour"] = df["timestamp"].dt.hour.astype(int)
+    df["day_of_week"] = df["timestamp"].dt.dayofweek.astype(int)
+    df["day_of_month"] = df["timestamp"].dt.day.astype(int)
+    df["month"] = df["timestamp"].dt.month.astype(int)
+    return df
+
+
+def process(df: pd.DataFrame) -> pd.DataFrame:
+    df["timestamp"] = parse_timestamps(df["timestamp"])
+    df = df.dropna(subset=["timestamp"]).reset_index(drop=True)
+    for name, values in temporal_features(df["timestamp"]).items():
+        df[name] = values
+    return df
+
+
+def assert_matches_original(df: pd.DataFrame):
+    expected = extract_temporal_features(convert_timestamps(df.copy()))
+    result = process(df.copy())
+
+    # the original column is naive when the inferred format has no offset
+    wall_time = expected["timestamp"]
+    if wall_time.dt.tz is None:
+        wall_time = wall_time.dt.tz_localize("UTC")
+    pd.testing.assert_series_equal(result["timestamp"], wall_time)
+    pd.testing.assert_frame_equal(
+        result.drop(columns="timestamp"),
+        expected.drop(columns="timestamp"),
+        check_dtype=False,
+    )
+
+
+@pytest.fixture
+def raw(make_sales):
+    df = make_sales(500)
+    rng = np.random.default_rng(0)
+    rows = rng.choice(np.arange(1, len(df)), 60, replace=False)
+    df.loc[rows, "timestamp"] = np.resize(np.array(MALFORMED, dtype=object), 60)
+    return df
+
+
+def test_malformed_timestamps_match_original(raw):
+    assert_matches_original(raw)
+
+
+def test_unordered_timestamps_match_original(raw):
+    assert_matches_original(raw.sample(frac=1, random_state=0))
+
+
+@pytest.mark.parametrize("first", ["2025-01-01 10:00", "01/02/2025"])
+def test_format_inferred_from_malformed_first_value(raw, first):
+    # the original inferred another format and dropped the API timestamps
+    raw.loc[0, "timestamp"] = first
+    assert_matches_original(raw)
+    assert len(process(raw)) < 10
+
+
+def test_uninferable_first_value(make_sales):
+    # no format inferred: the original parsed every value on its own
+    df = make_sales(100)
+    df.loc[[0, 40], "timestamp"] = ["invalid", "2025-02-30T10:00:00Z"]
+    assert_matches_original(df)
+    assert len(process(df)) == 98
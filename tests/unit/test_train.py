@@ -0,0 +1,111 @@
+from datetime import datetime
+
+import pytest
+
+import train
+from helper import append_segment
+from preprocessed import build_feature_pipeline, run_full, run_incremental
+from train import get_full_retrain_reason, hash_rows
+
+
+@pytest.fixture
+def processed(make_sales):
+    rows = make_sales(100)
+    codes = {model: code for code, model in enumerate(rows["model"].unique())}
+    df = build_feature_pipeline(codes).run(rows)
+    df["sales"] = rows["sales"]
+    return df
+
+
+@pytest.fixture
+def state(processed, tmp_path, monkeypatch):
+    booster = tmp_path / "booster_v1.ubj"
+    booster.touch()
+    monkeypatch.setattr(train, "get_version", lambda version: {"path": str(booster)})
+    return {
+        "version": 1,
+        "trained_rows": 80,
+        "trained_hash": hash_rows(processed, 80),
+        "updates_since_full": 0,
+        "full_trained_at": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def test_hash_rows_ignores_dtypes_and_later_rows(processed):
+    assert hash_rows(processed.astype("uint16"), 80) == hash_rows(processed, 80)
+    extended = processed.copy()
+    extended.loc[99, "sales"] += 1
+    assert hash_rows(extended, 80) == hash_rows(processed, 80)
+
+
+def test_warm_start_when_trained_rows_unchanged(processed, state):
+    trained_hash = hash_rows(processed, state["trained_rows"])
+    reason = get_full_retrain_reason(
+        state, len(processed), datetime.now(), trained_hash=trained_hash
+    )
+    assert reason is None
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        lambda df: df.sample(frac=1, random_state=0),
+        lambda df: df.drop(index=[10, 11]),
+    ],
+    ids=["reordered", "removed"],
+)
+def test_full_retrain_when_trained_rows_changed(processed, state, change):
+    changed = change(processed).reset_index(drop=True)
+    trained_hash = hash_rows(changed, state["trained_rows"])
+    reason = get_full_retrain_reason(
+        state, len(changed), datetime.now(), trained_hash=trained_hash
+    )
+    assert reason == "rows the champion was trained on changed"
+
+
+def test_full_retrain_without_trained_hash(processed, state):
+    del state["trained_hash"]
+    trained_hash = hash_rows(processed, state["trained_rows"])
+    reason = get_full_retrain_reason(
+        state, len(processed), datetime.now(), trained_hash=trained_hash
+    )
+    assert reason == "rows the champion was trained on changed"
+
+
+def test_warm_start_trains_on_the_held_out_rows(
+    tmp_path, monkeypatch, raw_store, make_sales
+):
+    monkeypatch.chdir(tmp_path)
+    for directory in ["data/processed", "model", "logs"]:
+        (tmp_path / directory).mkdir(parents=True)
+    monkeypatch.setattr(train, "PARAM_GRID", {**train.PARAM_GRID, "n_estimators": [50]})
+    fits = []
+    warm_start_model = train.warm_start_model
+
+    def record_fit(previous, X_new, y_new, params):
+        fits.append(X_new.index.tolist())
+        return warm_start_model(previous, X_new, y_new, params)
+
+    monkeypatch.setattr(train, "warm_start_model", record_fit)
+
+    append_segment(
+        raw_store,
+        make_sales(50, start="2025-01-15T00:00:00Z"),
+        "sales_20250115_0000.csv",
+    )
+    run_full(str(raw_store), "data/processed")
+    train.run_training(processed_path="data/processed", forecast_days=0)
+    append_segment(
+        raw_store,
+        make_sales(100, start="2025-02-01T00:00:00Z"),
+        "sales_20250201_0000.csv",
+    )
+    run_incremental(str(raw_store), "data/processed")
+    entry = train.run_training(processed_path="data/processed", forecast_days=0)
+
+    assert entry["training"] == "warm_start"
+    # evaluated on a holdout first, then continued on every new row
+    holdout_fit, final_fit = fits
+    assert len(holdout_fit) == 80
+    assert sorted(final_fit) == list(range(100, 200))
+    assert train.load_training_state()["trained_rows"] == 200